@@ -1,24 +1,56 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from typing import Optional, List
 import uvicorn
+import asyncio
 import os
+import time
+from contextlib import asynccontextmanager
+from functools import partial
 from dotenv import load_dotenv
 
-from models.request_models import QuestionRequest
+from models.request_models import QuestionRequest, SearchOptions
 from models.response_models import AnswerResponse, LinkResponse
 from services.question_processor import QuestionProcessor
-from services.answer_generator import AnswerGenerator
+from services.answer_generator import AnswerGenerator, publish_knowledge_base
+from services.pipeline import AnswerPipeline, init_worker_pipeline, answer_in_worker, answer_ingested_in_worker
+from services.executor import BoundedExecutor, QueueFullError
+from services.timing import TimingStats, server_timing_header
+from services.kb_manager import KnowledgeBaseManager
+from services.image_ingest import (InvalidImageError, ImageTooLargeError, MULTIPART_OVERHEAD_BYTES, ingest_stream,
+                                   max_image_bytes, spool_chunks)
 
 # Load environment variables
 load_dotenv()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the knowledge base in the background: /health and predefined answers are
+    # served immediately, and the first search waits only for whatever is left
+    if os.getenv('KB_WARMUP', 'true').lower() == 'true':
+        asyncio.get_running_loop().run_in_executor(None, answer_generator.warm_up)
+    # Pick up re-scraped data without a restart
+    if os.getenv('KB_WATCH', 'true').lower() == 'true':
+        kb_manager.start()
+    yield
+    kb_manager.stop()
+    # Stop worker pools when the app shuts down
+    text_executor.shutdown()
+    image_executor.shutdown()
+    pipeline.ocr_stage.shutdown()
+    pipeline.synthesis_stage.shutdown()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="TDS Virtual TA",
     description="A virtual Teaching Assistant API for Tools in Data Science course",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -33,6 +65,14 @@ app.add_middleware(
 # Initialize services
 question_processor = QuestionProcessor()
 answer_generator = AnswerGenerator()
+pipeline = AnswerPipeline(question_processor, answer_generator)
+kb_manager = KnowledgeBaseManager(answer_generator)
+timing_stats = TimingStats()
+
+# Processing and retrieval run off the event loop; image requests get their own
+# pool so large uploads never queue ahead of text-only questions
+text_executor = BoundedExecutor('text', initializer=init_worker_pipeline)
+image_executor = BoundedExecutor('image', initializer=init_worker_pipeline)
 
 
 @app.get("/")
@@ -44,6 +84,7 @@ async def root():
         "message": "TDS Virtual TA API",
         "endpoints": {
             "POST /api/": "Submit a question to get an answer",
+            "POST /api/upload": "Submit a question with a binary image (multipart or octet-stream)",
         }
     }
 
@@ -56,8 +97,35 @@ async def health_check():
     return {"status": "healthy", "service": "TDS Virtual TA"}
 
 
+async def run_answer(executor: BoundedExecutor, answer, *args) -> dict:
+    """Run the answer pipeline on an executor, mapping pool and image errors to HTTP errors"""
+    try:
+        return await executor.run(answer, *args)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except InvalidImageError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def build_response(answer_data: dict, response: Response) -> AnswerResponse:
+    # Expose per-stage timings
+    timing_stats.add(answer_data.get('timings'))
+    response.headers['Server-Timing'] = server_timing_header(answer_data.get('timings', {}))
+    
+    # Format response
+    return AnswerResponse(
+        answer=answer_data['answer'],
+        links=[
+            LinkResponse(url=link['url'], text=link.get('text', link.get('title', 'Link')))
+            for link in answer_data['links']
+        ]
+    )
+
+
 @app.post("/api/", response_model=AnswerResponse)
-async def answer_question(request: QuestionRequest):
+async def answer_question(request: QuestionRequest, response: Response):
     """
     Main API endpoint to answer student questions
     
@@ -72,27 +140,125 @@ async def answer_question(request: QuestionRequest):
         if not request.question or len(request.question.strip()) == 0:
             raise HTTPException(status_code=400, detail="Question cannot be empty")
         
-        # Process the question
-        processed_question = question_processor.process_question(
-            request.question, 
-            request.image
-        )
-        
-        # Generate answer
-        answer_data = answer_generator.generate_answer(processed_question)
+        # Process the question and generate the answer (served from cache when possible)
+        search_options = request.search.model_dump(exclude_none=True) if request.search else None
+        executor = image_executor if request.image else text_executor
+        answer = answer_in_worker if executor.mode == 'process' else partial(pipeline.answer, defer_synthesis=True)
+        answer_data = await run_answer(executor, answer, request.question, request.image, search_options)
+        # LLM synthesis is awaited here, so a worker is not held while the provider answers
+        answer_data = await pipeline.finish_synthesis(answer_data)
+        return build_response(answer_data, response)
         
-        # Format response
-        response = AnswerResponse(
-            answer=answer_data['answer'],
-            links=[
-                LinkResponse(url=link['url'], text=link.get('text', link.get('title', 'Link')))
-                for link in answer_data['links']
-            ]
-        )
-        
-        return response
+    except StarletteHTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+def read_spool(image_file) -> bytes:
+    image_file.seek(0)
+    return image_file.read()
+
+
+def capped_request(http_request: Request, max_bytes: int) -> Request:
+    """
+    The request with a body that raises ImageTooLargeError once more than
+    max_bytes have arrived, whatever Content-Length says (or if it is absent)
+    """
+    if (http_request.headers.get('content-length') or '').isdigit() and \
+            int(http_request.headers['content-length']) > max_bytes:
+        raise ImageTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+    receive = http_request.receive
+    received = 0
+
+    async def capped_receive():
+        nonlocal received
+        message = await receive()
+        if message['type'] == 'http.request':
+            received += len(message.get('body', b''))
+            if received > max_bytes:
+                raise ImageTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+        return message
+
+    return Request(http_request.scope, capped_receive)
+
+
+@app.post("/api/upload", response_model=AnswerResponse)
+async def answer_question_upload(http_request: Request, response: Response,
+                                 question: Optional[str] = None, search: Optional[str] = None):
+    """
+    Answer a question sent with a raw binary image instead of base64 JSON
+    
+    Accepts either multipart/form-data with `question`, `image` (file) and
+    optional `search` (JSON) fields, or an application/octet-stream body holding
+    the image with `question` and `search` as query parameters. The image is
+    spooled to a temporary buffer and never base64 encoded.
+    
+    Returns:
+        AnswerResponse: same contract as POST /api/
+    """
+    try:
+        started = time.perf_counter()
+        content_type = http_request.headers.get('content-type', '')
+        limit = max_image_bytes()
+        image_file = None
+        form = None
+        try:
+            if content_type.startswith(('multipart/form-data', 'application/x-www-form-urlencoded')):
+                # Starlette caps only the non-file parts, so the whole body is capped as it streams in
+                form = await capped_request(http_request, limit + MULTIPART_OVERHEAD_BYTES).form(max_files=1)
+                question = form.get('question', question)
+                search = form.get('search', search)
+                upload = form.get('image')
+                if upload is not None and not isinstance(upload, str):
+                    image_file = upload.file
+            else:
+                content_length = http_request.headers.get('content-length')
+                if content_length and content_length.isdigit() and int(content_length) > limit:
+                    raise HTTPException(status_code=413, detail=f"Image exceeds the {limit} byte limit")
+                image_file = await spool_chunks(http_request.stream(), limit)
+            upload_ms = (time.perf_counter() - started) * 1000
+            
+            if not question or not question.strip():
+                raise HTTPException(status_code=400, detail="Question cannot be empty")
+            try:
+                search_options = SearchOptions.model_validate_json(search).model_dump(exclude_none=True) if search else None
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail=f"Invalid search options: {e}")
+            
+            # Hash, size-check and sniff the spooled image off the event loop
+            image_info = None
+            if image_file is not None:
+                started = time.perf_counter()
+                image_info = (await run_in_threadpool(ingest_stream, image_file, limit)).to_dict()
+                image_ms = (time.perf_counter() - started) * 1000
+                if image_info['size_bytes'] == 0:
+                    image_info = None
+            
+            # The spool stays open until the answer is ready; it is only re-read on an OCR cache miss
+            executor = image_executor if image_info else text_executor
+            if executor.mode == 'process':
+                image_bytes = read_spool(image_file) if image_info and pipeline.ocr_stage.enabled else None
+                args = (answer_ingested_in_worker, question, image_info, search_options, image_bytes)
+            else:
+                load_image = (lambda: read_spool(image_file)) if image_info else None
+                args = (partial(pipeline.answer_ingested, defer_synthesis=True), question, image_info, search_options,
+                        None, load_image)
+            answer_data = await pipeline.finish_synthesis(await run_answer(executor, *args))
+        except ImageTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        finally:
+            if form is not None:
+                await form.close()
+            elif image_file is not None:
+                image_file.close()
         
-    except HTTPException:
+        stages = {'upload': upload_ms, **({'image': image_ms} if image_info else {})}
+        answer_data = {**answer_data, 'timings': {**stages, **answer_data.get('timings', {})}}
+        return build_response(answer_data, response)
+    
+    # Starlette's own HTTPException (e.g. 400 from form parsing) is the base of FastAPI's
+    except StarletteHTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
@@ -103,13 +269,23 @@ async def get_stats():
     """
     Get API statistics and available data
     """
-    discourse_count = len(answer_generator.enhanced_discourse_posts)
-    course_content_count = len(answer_generator.enhanced_course_content)
+    # Never force a load from the event loop; report counts once the knowledge base is in
+    snapshot = answer_generator.current_snapshot
     
     return {
-        "discourse_topics": discourse_count,
-        "course_content_sections": course_content_count,
-        "predefined_answer_categories": len(answer_generator.predefined_answers)
+        "discourse_topics": len(snapshot.discourse_posts) if snapshot else None,
+        "course_content_sections": len(snapshot.course_content) if snapshot else None,
+        "predefined_answer_categories": len(answer_generator.predefined_answers),
+        "ranker": snapshot.ranker.name if snapshot else None,
+        "knowledge_base": {
+            "loaded": snapshot is not None,
+            **(snapshot.stats() if snapshot else {}),
+            "watcher": kb_manager.stats(),
+        },
+        "stage_timings_ms": timing_stats.snapshot(),
+        # Process-pool workers answer with their own caches, OCR and synthesis stages; this process's are unused
+        **({} if text_executor.mode == image_executor.mode == 'process' else pipeline.stats()),
+        "executors": {"text": text_executor.stats(), "image": image_executor.stats()}
     }
 
 
@@ -118,14 +294,20 @@ if __name__ == "__main__":
     host = os.getenv("APP_HOST", "127.0.0.1")
     port = int(os.getenv("APP_PORT", 8000))
     debug = os.getenv("DEBUG", "False").lower() == "true"
+    workers = int(os.getenv("APP_WORKERS", 1))
     
     print(f"Starting TDS Virtual TA API on {host}:{port}")
     print(f"Debug mode: {debug}")
     
+    if answer_generator.kb_shared and answer_generator.kb_path:
+        # Build the index once here; the workers then only map the compiled file
+        publish_knowledge_base(answer_generator.kb_path)
+    
     uvicorn.run(
         "app:app",
         host=host,
         port=port,
         reload=debug,
+        workers=None if debug else workers,
         log_level="info"
     )
\ No newline at end of file
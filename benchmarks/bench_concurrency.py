@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Latency of small text questions while large image uploads are in flight,
+for each executor mode (inline = old on-event-loop behaviour, thread, process).
+
+Usage:
+    python -m benchmarks.bench_concurrency [--image-mb 5] [--image-clients 4] [--text-clients 4] [--seconds 10]
+"""
+import argparse
+import base64
+import os
+import statistics
+import threading
+import time
+
+import requests
+
+from benchmarks.server import running_server
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_mode(mode: str, args) -> dict:
+    env = {
+        'TA_EXECUTOR': mode,
+        'ANSWER_CACHE_SIZE': '0',
+        'SEMANTIC_CACHE_SIZE': '0',
+        'TA_TEXT_WORKERS': str(args.workers),
+        'TA_IMAGE_WORKERS': str(args.workers),
+    }
+    images = [base64.b64encode(os.urandom(args.image_mb * 1024 * 1024)).decode('ascii') for _ in range(2)]
+    results = {'text': [], 'image': [], 'rejected': 0}
+    lock = threading.Lock()
+
+    with running_server(env) as (base_url, _):
+        stop_at = time.monotonic() + args.seconds
+
+        def client(kind: str, client_id: int):
+            session = requests.Session()
+            count = 0
+            while time.monotonic() < stop_at:
+                payload = {'question': f"How do I deploy a FastAPI app on Vercel? ({client_id}-{count})"}
+                if kind == 'image':
+                    payload['image'] = images[count % len(images)]
+                started = time.perf_counter()
+                response = session.post(f"{base_url}/api/", json=payload, timeout=120)
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    if response.status_code == 503:
+                        results['rejected'] += 1
+                    else:
+                        results[kind].append(elapsed)
+                count += 1
+
+        threads = [threading.Thread(target=client, args=('image', i)) for i in range(args.image_clients)]
+        threads += [threading.Thread(target=client, args=('text', i)) for i in range(args.text_clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--image-mb', type=int, default=5)
+    parser.add_argument('--image-clients', type=int, default=4)
+    parser.add_argument('--text-clients', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--modes', default='inline,thread,process')
+    args = parser.parse_args()
+
+    print(f"{'mode':>8} {'text p50':>9} {'text p95':>9} {'text max':>9} {'text n':>7} {'image p50':>10} {'image n':>8} {'503s':>5}")
+    for mode in args.modes.split(','):
+        results = run_mode(mode, args)
+        text, image = results['text'], results['image']
+        print(f"{mode:>8} {statistics.median(text) if text else float('nan'):9.1f} {percentile(text, 0.95):9.1f} "
+              f"{max(text) if text else float('nan'):9.1f} {len(text):7d} "
+              f"{statistics.median(image) if image else float('nan'):10.1f} {len(image):8d} {results['rejected']:5d}")
+
+
+if __name__ == '__main__':
+    main()
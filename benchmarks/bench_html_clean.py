@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Cooked HTML -> text throughput for each installed parser backend and
+process-pool size (scraper/html_text.py), on a fixture of realistic
+Discourse posts (quotes, code blocks, lightboxed images, oneboxes, emoji).
+
+Posts are converted the way the scraper does it: one convert_async call
+per topic (about 12 posts), 8 topics in flight. Alongside posts/sec the
+benchmark reports the longest event-loop stall, i.e. how long fetching
+would be held up, and the share of posts whose text is identical to
+html.parser's.
+
+Usage:
+    python -m benchmarks.bench_html_clean [--posts 20000] [--workers 0 1 2 4] [--backends selectolax lxml html.parser]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.discourse_stub import realistic_cooked
+from scraper.html_text import BACKEND_PREFERENCE, HtmlCleaner, available_backends, html_batch_to_text
+
+POSTS_PER_TOPIC = 12
+TOPICS_IN_FLIGHT = 8
+
+
+async def convert_topics(cleaner: HtmlCleaner, htmls: list) -> dict:
+    topics = [htmls[start:start + POSTS_PER_TOPIC] for start in range(0, len(htmls), POSTS_PER_TOPIC)]
+    semaphore = asyncio.Semaphore(TOPICS_IN_FLIGHT)
+    results = [None] * len(topics)
+    max_stall = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal max_stall
+        while not done:
+            before = time.perf_counter()
+            await asyncio.sleep(0.001)
+            max_stall = max(max_stall, time.perf_counter() - before - 0.001)
+
+    async def convert(position: int):
+        async with semaphore:
+            # Stands in for the topic's fetch, which yields to the loop before the posts are converted
+            await asyncio.sleep(0)
+            results[position] = await cleaner.convert_async(topics[position])
+
+    ticking = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(convert(position) for position in range(len(topics))))
+    elapsed = time.perf_counter() - started
+    done = True
+    await ticking
+    return {'seconds': elapsed, 'max_stall_ms': max_stall * 1000,
+            'texts': [text for topic in results for text in topic]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--backends', nargs='+', default=list(BACKEND_PREFERENCE))
+    parser.add_argument('--batch-size', type=int, default=64)
+    args = parser.parse_args()
+
+    rng = random.Random(17)
+    htmls = [realistic_cooked(rng) for _ in range(args.posts)]
+    installed = available_backends()
+    backends = [backend for backend in args.backends if backend in installed]
+    skipped = [backend for backend in args.backends if backend not in installed]
+    reference = html_batch_to_text(htmls, 'html.parser')
+
+    print(f"{args.posts} posts ({sum(map(len, htmls)) / 2**20:.1f} MB of HTML), {POSTS_PER_TOPIC} posts per call, "
+          f"{TOPICS_IN_FLIGHT} calls in flight" + (f"; not installed: {', '.join(skipped)}" if skipped else ""))
+    print(f"{'backend':<12} {'workers':>7} {'posts/s':>9} {'speedup':>8} {'max stall':>10} {'same text':>10}")
+    rows = []
+    for backend in backends:
+        for workers in args.workers:
+            with HtmlCleaner(workers, backend, batch_size=args.batch_size) as cleaner:
+                # Start the worker processes before timing
+                cleaner.convert(htmls[:workers])
+                result = asyncio.run(convert_topics(cleaner, htmls))
+            same = sum(text == expected for text, expected in zip(result['texts'], reference)) / len(reference)
+            rows.append((backend, workers, args.posts / result['seconds'], result['max_stall_ms'], same))
+    # Speedups are against the original: html.parser on the event-loop thread
+    baseline = next((rate for backend, workers, rate, _, _ in rows if backend == 'html.parser' and workers == 0),
+                    rows[0][2])
+    for backend, workers, rate, max_stall_ms, same in rows:
+        print(f"{backend:<12} {workers:>7} {rate:>9.0f} {rate / baseline:>7.1f}x {max_stall_ms:>8.1f}ms {same * 100:>9.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Scraper CSVs -> knowledge base: the streaming pipeline in services/ingest.py
+versus the same stages run load-everything-at-once (lists in memory, one
+json.dump and one write_knowledge_base call).
+
+Synthetic CSVs in the scrapers' formats are written to a temporary
+directory: long lecture pages and a Discourse export whose posts carry
+leftover HTML and duplicates, with a batch of incremental-scrape rows
+appended out of topic order. Each mode runs in a fresh interpreter; peak
+RSS is the child's ru_maxrss (Linux). Both modes must write identical JSON
+and equivalent knowledge bases.
+
+Usage:
+    python -m benchmarks.bench_ingest [--posts 100000] [--lectures 200] [--shard-documents 5000]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmarks.corpus import REPO_ROOT
+
+# Runs inside the child interpreter: one ingest mode, then report time and peak RSS
+CHILD = r'''
+import json, os, resource, sys, time
+from services import ingest
+from services.kb_store import write_knowledge_base
+
+mode, lectures_csv, discourse_csv, output_dir, shard_documents = sys.argv[1:6]
+kb_path = os.path.join(output_dir, 'knowledge_base.bin')
+started = time.perf_counter()
+if mode == 'streaming':
+    ingest.ingest(lectures_csv, discourse_csv, output_dir, kb_path, shard_documents=int(shard_documents))
+else:
+    course = [record['data'] for record in ingest.enhance(list(ingest.read_lectures(lectures_csv)))]
+    topics = [record['data'] for record in ingest.enhance(list(ingest.read_discourse_topics(discourse_csv)))]
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, ingest.COURSE_CONTENT_JSON), os.path.join(output_dir, ingest.DISCOURSE_POSTS_JSON)]
+    for path, documents in zip(paths, (course, topics)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(documents, f, ensure_ascii=False)
+    write_knowledge_base(course, topics, kb_path, sources=paths)
+print(json.dumps({'seconds': time.perf_counter() - started,
+                  'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+'''
+
+WORDS = ("docker", "fastapi", "vercel", "embedding", "prompt", "token", "dataset", "notebook", "pandas", "deadline",
+         "assignment", "score", "github", "submission", "model", "api", "proxy", "error", "python", "json", "regex",
+         "scrape", "deploy", "container", "request", "response", "llm", "portal", "exam", "project")
+
+
+def sentence(rng: random.Random) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + '.'
+
+
+def write_csvs(workdir: str, num_posts: int, num_lectures: int, seed: int = 3):
+    rng = random.Random(seed)
+    lectures_csv = os.path.join(workdir, 'tds_lectures_content.csv')
+    with open(lectures_csv, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Lecture Title", "Content"])
+        for number in range(num_lectures):
+            paragraphs = ['  '.join(sentence(rng) for _ in range(rng.randint(2, 8))) for _ in range(rng.randint(5, 60))]
+            writer.writerow([f"Lecture {number}: {rng.choice(WORDS)} {rng.choice(WORDS)}", '\n\n'.join(paragraphs)])
+
+    discourse_csv = os.path.join(workdir, 'tds_discourse_posts.csv')
+    topics, posts_written, appended = [], 0, []
+    with open(discourse_csv, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Topic ID", "Topic Title", "Post ID", "Author", "Created At", "Content"])
+        while posts_written < num_posts:
+            topic_id = 160000 + len(topics)
+            title = f"{sentence(rng)[:-1]}?"
+            topics.append(topic_id)
+            for post_number in range(1, rng.randint(2, 20) + 1):
+                text = ' '.join(sentence(rng) for _ in range(rng.randint(1, 6)))
+                if rng.random() < 0.1:
+                    text = f"<p>{text} <code>GA{rng.randint(1, 7)}</code> &amp; more</p>"
+                row = [topic_id, title, topic_id * 100 + post_number, rng.choice(('s.anand', 'carlton', 'student'))
+                       if post_number > 1 else f"student{rng.randint(1, 900)}",
+                       f"2025-03-01T10:{post_number:02d}:00.000Z", text]
+                posts_written += 1
+                # A tenth of the replies arrive in a later incremental scrape, appended after everything else
+                if post_number > 1 and rng.random() < 0.1:
+                    appended.append(row)
+                    continue
+                writer.writerow(row)
+                if rng.random() < 0.02:
+                    writer.writerow(row)
+        writer.writerows(appended)
+    return lectures_csv, discourse_csv
+
+
+def run(mode: str, lectures_csv: str, discourse_csv: str, output_dir: str, shard_documents: int) -> dict:
+    env = {**os.environ, 'PYTHONPATH': REPO_ROOT}
+    output = subprocess.run([sys.executable, '-c', CHILD, mode, lectures_csv, discourse_csv, output_dir,
+                             str(shard_documents)], cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def assert_same_knowledge_base(path_a: str, path_b: str):
+    from services.kb_store import KnowledgeBaseFile
+    a, b = KnowledgeBaseFile(path_a), KnowledgeBaseFile(path_b)
+    assert a.header['num_course_content'] == b.header['num_course_content']
+    for name in a.sections:
+        if name not in ('records', 'keywords', 'vocabulary', 'string_offsets', 'string_data'):
+            assert np.array_equal(a.sections[name], b.sections[name]), name
+    assert a.strings(a.sections['vocabulary']) == b.strings(b.sections['vocabulary'])
+    assert all(dict(a.documents[i]['data']) == dict(b.documents[i]['data']) for i in range(len(a.records)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--lectures', type=int, default=200)
+    parser.add_argument('--shard-documents', type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        lectures_csv, discourse_csv = write_csvs(workdir, args.posts, args.lectures)
+        csv_mb = (os.path.getsize(lectures_csv) + os.path.getsize(discourse_csv)) / 2**20
+        print(f"{args.posts} posts, {args.lectures} lectures ({csv_mb:.1f} MB of CSV); "
+              f"{args.shard_documents} documents per shard")
+        print(f"{'mode':<10} {'seconds':>8} {'peak RSS':>10}")
+        outputs = {}
+        for mode in ('eager', 'streaming'):
+            outputs[mode] = os.path.join(workdir, mode)
+            result = run(mode, lectures_csv, discourse_csv, outputs[mode], args.shard_documents)
+            print(f"{mode:<10} {result['seconds']:>8.1f} {result['peak_rss_mb']:>8.0f}MB")
+
+        for name in ('enhanced_course_content.json', 'enhanced_discourse_posts.json'):
+            with open(os.path.join(outputs['eager'], name), encoding='utf-8') as eager, \
+                    open(os.path.join(outputs['streaming'], name), encoding='utf-8') as streaming:
+                assert json.load(eager) == json.load(streaming), name
+        assert_same_knowledge_base(os.path.join(outputs['eager'], 'knowledge_base.bin'),
+                                   os.path.join(outputs['streaming'], 'knowledge_base.bin'))
+        with open(os.path.join(outputs['streaming'], 'enhanced_discourse_posts.json'), encoding='utf-8') as f:
+            topics = json.load(f)
+        print(f"{len(topics)} topics, {sum(len(topic['posts']) for topic in topics)} posts after dedup; "
+              f"JSON and knowledge base identical in both modes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Cold-start time and RSS of AnswerGenerator with the JSON knowledge base
+versus the compiled, memory-mapped binary file (build_index.py kb).
+
+A synthetic scraped_data/ is written to a temporary directory and each
+measurement runs in a fresh interpreter. Linux only for RSS.
+
+Usage:
+    python -m benchmarks.bench_kb_load [--topics 20000] [--sections 500] [--ranker legacy] [--runs 3]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from benchmarks.corpus import REPO_ROOT, scraped_data_workdir, synthetic_corpus
+
+# Runs inside the child interpreter: time the knowledge-base load and one answer
+CHILD = r'''
+import json, sys, time
+
+def rss_mb():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+from services.answer_generator import AnswerGenerator
+from services.question_processor import QuestionProcessor
+processor = QuestionProcessor()
+baseline = rss_mb()
+started = time.perf_counter()
+generator = AnswerGenerator(ranker=sys.argv[1], kb_path=sys.argv[2])
+generator.warm_up()
+loaded = time.perf_counter()
+generator.generate_answer(processor.process_question("How do I deploy a FastAPI app on Vercel?"))
+answered = time.perf_counter()
+print(json.dumps({'load_ms': (loaded - started) * 1000, 'first_answer_ms': (answered - loaded) * 1000,
+                  'rss_mb': rss_mb() - baseline, 'binary': generator.kb_file is not None}))
+'''
+
+
+def measure(workdir: str, ranker: str, kb_path: str) -> dict:
+    env = {**os.environ, 'PYTHONPATH': REPO_ROOT}
+    output = subprocess.run([sys.executable, '-c', CHILD, ranker, kb_path], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--topics', type=int, default=20000)
+    parser.add_argument('--sections', type=int, default=500)
+    parser.add_argument('--ranker', default='legacy')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    course_content, discourse_posts = synthetic_corpus(args.topics, args.sections)
+    with scraped_data_workdir(course_content, discourse_posts, compile_kb=True) as workdir:
+        json_size = sum(os.path.getsize(os.path.join(workdir, 'scraped_data', name))
+                        for name in ('enhanced_course_content.json', 'enhanced_discourse_posts.json'))
+        kb_path = os.path.join('scraped_data', 'knowledge_base.bin')
+        kb_size = os.path.getsize(os.path.join(workdir, kb_path))
+
+        print(f"{len(course_content) + len(discourse_posts)} documents; JSON {json_size / 2**20:.1f} MB, "
+              f"binary {kb_size / 2**20:.1f} MB; ranker={args.ranker}; median of {args.runs} runs")
+        print(f"{'format':<8} {'load':>10} {'first answer':>13} {'RSS +':>9}")
+        for label, path in (('json', ''), ('binary', kb_path)):
+            runs = [measure(workdir, args.ranker, path) for _ in range(args.runs)]
+            assert all(run['binary'] == bool(path) for run in runs)
+            print(f"{label:<8} {statistics.median(r['load_ms'] for r in runs):>8.1f}ms "
+                  f"{statistics.median(r['first_answer_ms'] for r in runs):>11.1f}ms "
+                  f"{statistics.median(r['rss_mb'] for r in runs):>7.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Cost of applying a small batch of new or re-scraped Discourse topics:
+a full knowledge-base rebuild versus AnswerGenerator.upsert_topics(), plus
+query latency with delta segments and the cost of compacting them.
+
+Usage:
+    python -m benchmarks.bench_kb_update [--topics 20000] [--batch 50] [--batches 5] [--ranker bm25f]
+"""
+import argparse
+import copy
+import os
+import statistics
+import time
+
+from benchmarks.corpus import scraped_data_workdir, synthetic_corpus, sample_questions
+from services.answer_generator import AnswerGenerator
+from services.question_processor import QuestionProcessor
+
+
+def query_ms(generator: AnswerGenerator, questions) -> float:
+    started = time.perf_counter()
+    for question in questions:
+        generator.search_enhanced_content(question)
+    return (time.perf_counter() - started) * 1000 / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--topics', type=int, default=20000)
+    parser.add_argument('--sections', type=int, default=500)
+    parser.add_argument('--batch', type=int, default=50, help='topics per update (half new, half re-scraped)')
+    parser.add_argument('--batches', type=int, default=5)
+    parser.add_argument('--ranker', default='bm25f')
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    course_content, discourse_posts = synthetic_corpus(args.topics, args.sections)
+    processor = QuestionProcessor()
+    questions = [processor.process_question(q) for q in sample_questions(args.queries)]
+
+    with scraped_data_workdir(course_content, discourse_posts) as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            generator = AnswerGenerator(ranker=args.ranker, kb_path='')
+            generator.warm_up()
+            rebuilds = [generator.reload().build_ms for _ in range(3)]
+            base_query = query_ms(generator, questions)
+
+            upserts = []
+            next_id = max(topic['id'] for topic in discourse_posts) + 1
+            for batch in range(args.batches):
+                rescraped = [dict(copy.deepcopy(topic), title=topic['title'] + ' (edited)')
+                             for topic in discourse_posts[batch * args.batch:batch * args.batch + args.batch // 2]]
+                new = [dict(copy.deepcopy(topic), id=next_id + i)
+                       for i, topic in enumerate(discourse_posts[-(args.batch - len(rescraped)):])]
+                next_id += len(new)
+                upserts.append(generator.upsert_topics(rescraped + new).build_ms)
+            segments = generator.current_snapshot.stats()
+            segmented_query = query_ms(generator, questions)
+            compact_ms = generator.compact().build_ms
+        finally:
+            os.chdir(cwd)
+
+    print(f"{len(course_content) + len(discourse_posts)} documents; ranker={args.ranker}; "
+          f"{args.batches} batches of {args.batch} topics")
+    print(f"full rebuild          {statistics.median(rebuilds):>9.1f} ms")
+    print(f"upsert batch          {statistics.median(upserts):>9.1f} ms")
+    print(f"full compaction       {compact_ms:>9.1f} ms")
+    print(f"query, one segment    {base_query:>9.2f} ms")
+    print(f"query, {segments['segments']} segments    {segmented_query:>9.2f} ms  ({segments['deleted']} tombstones)")
+
+
+if __name__ == '__main__':
+    main()
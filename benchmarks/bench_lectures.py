@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Lecture scraping against a local static copy of the course site: the
+original loop (one page, networkidle plus fixed 5s/4s waits and a 1s sleep
+per lecture) versus the context pool in scraper/lectures.py, which waits
+for the content element and blocks images, fonts and analytics. Reports
+wall time and what the stub served per run; every run must scrape the same
+rows. Needs Playwright with Chromium (`playwright install chromium`).
+
+Usage:
+    python -m benchmarks.bench_lectures [--lectures 30] [--contexts 1 4 8] [--legacy-wait-scale 1.0]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import tempfile
+import time
+
+from playwright.async_api import async_playwright
+
+from benchmarks.course_site_stub import StubCourseSite, write_course_site
+from scraper.lectures import CSV_HEADER, lecture_links, scrape_lectures_async
+
+
+async def sequential_scrape(base_url: str, output: str, wait_scale: float = 1.0) -> dict:
+    """The loop from the original scraper/scraper.py, pointed at base_url"""
+    started = time.perf_counter()
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        page = await browser.new_page()
+        await page.goto(base_url + "/", wait_until="networkidle")
+        await page.wait_for_timeout(5000 * wait_scale)
+        anchors = await page.eval_on_selector_all(
+            "a", "anchors => anchors.map(a => [a.getAttribute('href'), a.innerText])")
+        links = lecture_links([(href, text or '') for href, text in anchors], base_url)
+        with open(output, mode="w", encoding="utf-8", newline="") as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(CSV_HEADER)
+            for title, url in links:
+                await page.goto(url, wait_until="networkidle")
+                await page.wait_for_timeout(4000 * wait_scale)
+                content_element = (await page.query_selector("article") or await page.query_selector("main") or
+                                   await page.query_selector("div.course-content") or
+                                   await page.query_selector("section.lecture-body"))
+                content_text = (await content_element.inner_text()).strip() if content_element else ""
+                writer.writerow([title, content_text])
+                await asyncio.sleep(1 * wait_scale)
+        await browser.close()
+    return {'seconds': time.perf_counter() - started, 'blocked_requests': 0}
+
+
+def csv_rows(path: str) -> set:
+    with open(path, encoding="utf-8", newline="") as f:
+        return {tuple(row) for row in csv.reader(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lectures', type=int, default=30)
+    parser.add_argument('--render-delay', type=int, default=300, help='ms before a page fills its article')
+    parser.add_argument('--latency', type=float, default=0.02, help='stub server seconds per request')
+    parser.add_argument('--contexts', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--legacy-wait-scale', type=float, default=1.0,
+                        help='scale the fixed waits and sleep of the original loop')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        site = os.path.join(workdir, 'site')
+        write_course_site(site, args.lectures, args.render_delay)
+        print(f"{args.lectures} lectures, stub latency {args.latency * 1000:.0f} ms/request, "
+              f"content rendered after {args.render_delay} ms")
+        print(f"{'engine':<28} {'seconds':>8} {'documents':>10} {'images':>7} {'fonts':>6} {'analytics':>10} "
+              f"{'KB served':>10} {'blocked':>8}")
+        runs = [('sequential (networkidle)', None, True)]
+        runs += [(f"pool, {c} contexts", c, True) for c in args.contexts]
+        runs += [(f"pool, {max(args.contexts)} contexts, no block", max(args.contexts), False)]
+        expected = None
+        with StubCourseSite(site, latency=args.latency) as stub:
+            for number, (label, contexts, block) in enumerate(runs):
+                output = os.path.join(workdir, f"{number}.csv")
+                stub.reset_counts()
+                if contexts is None:
+                    result = asyncio.run(sequential_scrape(stub.base_url, output, args.legacy_wait_scale))
+                else:
+                    result = asyncio.run(scrape_lectures_async(
+                        output, dashboard_url=stub.base_url + "/", site_url=stub.base_url, contexts=contexts,
+                        block_resources=block))
+                rows = csv_rows(output)
+                expected = expected if expected is not None else rows
+                assert rows == expected, f"{label}: scraped rows differ from the sequential run"
+                served = stub.requests
+                print(f"{label:<28} {result['seconds']:>8.2f} {served.get('document', 0):>10} "
+                      f"{served.get('image', 0):>7} {served.get('font', 0):>6} {served.get('analytics', 0):>10} "
+                      f"{sum(stub.bytes_sent.values()) / 1024:>10.0f} {result['blocked_requests']:>8}")
+        print(f"{len(expected) - 1} lecture rows, identical in every run")
+
+
+if __name__ == '__main__':
+    main()
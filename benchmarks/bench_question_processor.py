@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Per-question cost of QuestionProcessor before and after the single-pass
+rewrite. "Before" is the original implementation (phrase lists scanned one
+by one, regexes compiled per call, dict output) plus the lowercasing and
+splitting retrieval then did again; "after" is the current processor, whose
+ProcessedQuestion already carries the terms and tokens retrieval uses.
+
+Usage:
+    python -m benchmarks.bench_question_processor [--questions 2000] [--repeat 5]
+"""
+import argparse
+import re
+import time
+
+from benchmarks.corpus import sample_questions
+from services.question_processor import QuestionProcessor
+
+
+class LegacyQuestionProcessor:
+    """The pre-rewrite processor, kept verbatim for comparison"""
+
+    def __init__(self):
+        self.common_tds_keywords = [
+            'gpt', 'openai', 'ai-proxy', 'docker', 'podman', 'ga4', 'ga5',
+            'graded assignment', 'dashboard', 'bonus', 'end-term', 'exam',
+            'discourse', 'tds', 'tools in data science', 'anand', 'professor'
+        ]
+
+    def process_question(self, question, image_b64=None):
+        return {
+            'original_question': question,
+            'cleaned_question': self.clean_question(question),
+            'keywords': self.extract_keywords(question),
+            'question_type': self.classify_question(question),
+            'has_image': image_b64 is not None,
+            'image_info': None
+        }
+
+    def clean_question(self, question):
+        cleaned = re.sub(r'\s+', ' ', question.strip())
+        cleaned = re.sub(r'gpt-?3\.?5-?turbo-?0125', 'gpt-3.5-turbo-0125', cleaned, flags=re.IGNORECASE)
+        cleaned = re.sub(r'gpt-?4o-?mini', 'gpt-4o-mini', cleaned, flags=re.IGNORECASE)
+        return cleaned
+
+    def extract_keywords(self, question):
+        keywords = []
+        question_lower = question.lower()
+        for keyword in self.common_tds_keywords:
+            if keyword.lower() in question_lower:
+                keywords.append(keyword)
+        for pattern in [r'gpt-?3\.?5-?turbo-?0125', r'gpt-?4o-?mini', r'gpt-?4', r'gpt-?3\.?5']:
+            keywords.extend(re.findall(pattern, question, flags=re.IGNORECASE))
+        keywords.extend(re.findall(r'ga\d+', question, flags=re.IGNORECASE))
+        return list(set(keywords))
+
+    def classify_question(self, question):
+        question_lower = question.lower()
+        if any(phrase in question_lower for phrase in ['what is tds', 'tds full form', 'stands for', 'about tds', 'tools in data science']):
+            return 'course_info'
+        elif any(word in question_lower for word in ['grade', 'grading', 'deadline', 'due date', 'project 01', 'project 1', 's grade']):
+            return 'grading_system'
+        elif any(word in question_lower for word in ['gpt', 'model', 'ai-proxy', 'openai']):
+            return 'model_usage'
+        elif any(word in question_lower for word in ['docker', 'podman', 'container']):
+            return 'environment_setup'
+        elif any(word in question_lower for word in ['ga4', 'ga5', 'graded assignment', 'assignment']):
+            return 'assignment_help'
+        elif any(word in question_lower for word in ['dashboard', 'score', 'marks', 'bonus']):
+            return 'grading_system'
+        elif any(word in question_lower for word in ['exam', 'end-term', 'when is']):
+            return 'schedule_inquiry'
+        return 'general'
+
+
+def legacy_pipeline(processor, question):
+    processed = processor.process_question(question)
+    # Retrieval used to lowercase and split the question again
+    question_lower = processed['cleaned_question'].lower()
+    question_lower.split()
+    re.findall(r'[a-z0-9]+', question_lower)
+    # ...and get_predefined_answer lowercased the original once more
+    processed['original_question'].lower()
+    return processed
+
+
+def time_per_question(function, questions, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for question in questions:
+            function(question)
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6 / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--questions', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    questions = sample_questions(args.questions)
+    legacy = LegacyQuestionProcessor()
+    current = QuestionProcessor()
+
+    before = time_per_question(lambda q: legacy_pipeline(legacy, q), questions, args.repeat)
+    after = time_per_question(current.process_question, questions, args.repeat)
+    print(f"before: {before:7.2f} us/question")
+    print(f" after: {after:7.2f} us/question ({before / after:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Compare ranking engines on quality (overlap with the legacy top-k) and
+per-query cost.
+
+Usage:
+    python -m benchmarks.bench_ranking [--topics 5000] [--queries 200]
+"""
+import argparse
+import time
+
+from benchmarks.corpus import synthetic_corpus, sample_questions, load_seed_documents
+from services.question_processor import QuestionProcessor
+from services.search_index import SearchIndex
+from services.ranking import RANKERS, create_ranker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topics', type=int, default=5000, help='synthetic discourse topics (0 = shipped data only)')
+    parser.add_argument('--sections', type=int, default=200, help='synthetic course sections')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    if args.topics:
+        course_content, discourse_posts = synthetic_corpus(args.topics, args.sections)
+    else:
+        course_content, discourse_posts = load_seed_documents()
+
+    started = time.perf_counter()
+    index = SearchIndex(course_content, discourse_posts)
+    print(f"Indexed {len(index)} documents in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    processor = QuestionProcessor()
+    questions = [processor.process_question(q) for q in sample_questions(args.queries)]
+
+    results = {}
+    for name in RANKERS:
+        started = time.perf_counter()
+        ranker = create_ranker(index, name)
+        setup_ms = (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        results[name] = [[doc_id for doc_id, _ in ranker.rank(q, args.k)] for q in questions]
+        per_query_ms = (time.perf_counter() - started) * 1000 / len(questions)
+        print(f"{name:>8}: setup {setup_ms:8.1f} ms, {per_query_ms:7.3f} ms/query")
+
+    baseline = results['legacy']
+    for name, ranked in results.items():
+        if name == 'legacy':
+            continue
+        overlap = sum(len(set(a) & set(b)) for a, b in zip(baseline, ranked))
+        total = sum(len(a) for a in baseline) or 1
+        print(f"{name:>8}: top-{args.k} overlap with legacy {overlap / total:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Incremental Discourse scraping against the local stub server: a full scrape,
+then incremental runs after a few topics gain replies and new topics appear,
+after no change at all, and after an interrupted run. After every run the
+CSV must hold exactly the posts a fresh full scrape would, with no duplicates.
+
+Usage:
+    python -m benchmarks.bench_scrape_incremental [--topics 1000] [--latency 0.02] [--changed 20] [--new 5]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import tempfile
+
+from benchmarks.discourse_stub import StubDiscourse, synthetic_forum
+from scraper.discourse import scrape_discourse_posts_async
+
+
+def csv_rows(path: str) -> list:
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+async def interrupted_run(output: str, base_url: str, concurrency: int, after: float):
+    """Start an incremental run and kill it part way through"""
+    task = asyncio.ensure_future(scrape_discourse_posts_async(
+        output, base_url=base_url, concurrency=concurrency, rate=0, incremental=True))
+    await asyncio.sleep(after)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--topics', type=int, default=1000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--changed', type=int, default=20, help='topics that gain replies between runs')
+    parser.add_argument('--new', type=int, default=5, help='topics created between runs')
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    forum = synthetic_forum(args.topics, max_posts=30)
+    with tempfile.TemporaryDirectory() as workdir, StubDiscourse(forum, latency=args.latency) as stub:
+        output = os.path.join(workdir, 'posts.csv')
+        reference = os.path.join(workdir, 'reference.csv')
+
+        def scrape(path: str, incremental: bool) -> dict:
+            return asyncio.run(scrape_discourse_posts_async(path, base_url=stub.base_url,
+                                                            concurrency=args.concurrency, rate=0,
+                                                            incremental=incremental))
+
+        def change_forum(changed: int, new: int):
+            listed = [topic['id'] for topic in forum[:args.topics * 3 // 4]]
+            for topic_id in rng.sample(listed, changed):
+                stub.add_posts(topic_id, rng.randint(1, 25))
+            for _ in range(new):
+                stub.add_topic(rng.randint(1, 30))
+
+        def check(label: str, summary: dict):
+            rows = csv_rows(output)
+            assert len(rows) == len({row[2] for row in rows}), f"{label}: duplicate posts"
+            scrape(reference, incremental=False)
+            assert sorted(rows) == sorted(csv_rows(reference)), f"{label}: CSV differs from a full scrape"
+            print(f"{label:<28} {summary['seconds']:>8.2f} {summary['requests']:>9} {summary['not_modified']:>6} "
+                  f"{summary['bytes_received'] / 1024:>9.0f} {summary['topics']:>8} {summary['posts']:>6}")
+
+        print(f"{args.topics} topics, stub latency {args.latency * 1000:.0f} ms/request, "
+              f"{args.concurrency} requests in flight")
+        print(f"{'run':<28} {'seconds':>8} {'requests':>9} {'304s':>6} {'KB':>9} {'fetched':>8} {'posts':>6}")
+        check('full', scrape(output, incremental=False))
+
+        change_forum(args.changed, args.new)
+        check(f"+{args.changed} replied, +{args.new} new", scrape(output, incremental=True))
+
+        check('no changes', scrape(output, incremental=True))
+
+        change_forum(args.topics // 4, args.new)
+        asyncio.run(interrupted_run(output, stub.base_url, args.concurrency, after=1.5))
+        interrupted = csv_rows(output)
+        summary = scrape(output, incremental=True)
+        print(f"(interrupted run had written {len(interrupted) - len(csv_rows(reference))} of the new posts)")
+        check('resumed after interruption', summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Discourse scraping against a local stub server: the original sequential
+loop (a new `requests.get` connection per call) versus the async engine in
+scraper/discourse.py at several concurrency limits, plus a run with injected
+429/503 responses to exercise the retries. Every run must produce the same
+set of CSV rows.
+
+The original scraper also sleeps 1s per topic and per category page; that
+is left out of the sequential baseline here (add it back with --legacy-sleep).
+
+Usage:
+    python -m benchmarks.bench_scraper [--topics 300] [--latency 0.05] [--concurrency 1 8 32]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import tempfile
+import time
+
+import requests
+from bs4 import BeautifulSoup
+
+from benchmarks.discourse_stub import StubDiscourse, synthetic_forum
+from scraper.discourse import CATEGORY_PATH, CSV_HEADER, END_DATE, START_DATE, parse_date, \
+    scrape_discourse_posts_async
+
+
+def sequential_scrape(base_url: str, output: str, sleep: float = 0.0) -> dict:
+    """The loop from scraper/scraper.py, pointed at base_url"""
+    started = time.perf_counter()
+    topics, page, done = [], 0, False
+    while not done:
+        current_topics = requests.get(f"{base_url}{CATEGORY_PATH}?page={page}").json()["topic_list"]["topics"]
+        if not current_topics:
+            break
+        for topic in current_topics:
+            created_at = parse_date(topic["created_at"])
+            if created_at < START_DATE:
+                done = True
+                break
+            if created_at <= END_DATE:
+                topics.append(topic)
+        page += 1
+        time.sleep(sleep)
+    with open(output, "w", encoding="utf-8", newline="") as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_HEADER)
+        for topic in topics:
+            posts = requests.get(f"{base_url}/t/{topic['id']}.json").json()["post_stream"]["posts"]
+            for post in posts:
+                text_content = BeautifulSoup(post["cooked"], "html.parser").get_text(separator="\n").strip()
+                writer.writerow([topic["id"], topic["title"], post["id"], post["username"], post["created_at"],
+                                 text_content])
+            time.sleep(sleep)
+    return {'seconds': time.perf_counter() - started, 'retries': 0}
+
+
+def csv_rows(path: str) -> set:
+    with open(path, encoding="utf-8", newline="") as f:
+        return {tuple(row) for row in csv.reader(f)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--topics', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05, help='stub server seconds per request')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--legacy-sleep', type=float, default=0.0, help='per-request sleep of the original loop')
+    args = parser.parse_args()
+
+    forum = synthetic_forum(args.topics)
+    with tempfile.TemporaryDirectory() as workdir:
+        print(f"{args.topics} topics listed, stub latency {args.latency * 1000:.0f} ms/request")
+        print(f"{'engine':<26} {'seconds':>8} {'requests':>9} {'connections':>12} {'retries':>8}")
+        expected = None
+        runs = [('sequential (requests)', 'sequential', None, {})]
+        runs += [(f"async, concurrency {c}", 'async', c, {}) for c in args.concurrency]
+        runs += [(f"async, {max(args.concurrency)} + faults", 'faults', max(args.concurrency),
+                  {'fail_every': 10, 'rate_limit_every': 25, 'retry_after': 0.1})]
+        for label, mode, concurrency, faults in runs:
+            output = os.path.join(workdir, f"{mode}-{concurrency or 1}.csv")
+            with StubDiscourse(forum, latency=args.latency, **faults) as stub:
+                if concurrency is None:
+                    result = sequential_scrape(stub.base_url, output, args.legacy_sleep)
+                else:
+                    result = asyncio.run(scrape_discourse_posts_async(
+                        output, base_url=stub.base_url, concurrency=concurrency, rate=0))
+                requests_made, connections = stub.requests, stub.connections
+            rows = csv_rows(output)
+            expected = expected if expected is not None else rows
+            assert rows == expected, f"{label}: scraped rows differ from the sequential run"
+            print(f"{label:<26} {result['seconds']:>8.2f} {requests_made:>9} {connections:>12} {result['retries']:>8}")
+        print(f"{len(expected) - 1} post rows, identical in every run")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Answer text from the top hits, three ways:
+
+    truncate   the original: answer texts of the first two hits joined and
+               cut at 500 characters
+    document   best sentences within the budget, scoring every sentence of
+               the retrieved documents
+    passages   best sentences of the best passages (services/snippets.py),
+               found through the passage posting lists
+
+The corpus is synthetic discourse topics plus long lecture pages (20-60
+paragraphs). Reported per query: time to build the answer text, sentences
+scored, answers ending mid-sentence, and coverage: the IDF-weighted share
+of the question tokens found in the retrieved answer texts that the answer
+quotes.
+
+Usage:
+    python -m benchmarks.bench_snippets [--topics 2000] [--lectures 200] [--queries 300]
+"""
+import argparse
+import random
+import time
+
+from benchmarks.bench_ingest import sentence
+from benchmarks.corpus import sample_questions, synthetic_corpus
+from services.answer_generator import ANSWER_CHARS, ANSWER_PREFIX
+from services.question_processor import QuestionProcessor
+from services.ranking import create_ranker
+from services.search_index import SearchIndex, answer_text, sentence_spans, tokenize
+from services.snippets import best_passages, compose_snippet, query_weights, scored_sentences, token_in
+
+
+def long_lectures(count: int, seed: int = 5) -> list:
+    rng = random.Random(seed)
+    return [{'title': f"Lecture {number}", 'url': 'https://tds.s-anand.net/', 'keywords': [],
+             'content': '\n\n'.join('  '.join(sentence(rng) for _ in range(rng.randint(2, 8)))
+                                    for _ in range(rng.randint(20, 60)))}
+            for number in range(count)]
+
+
+def truncated(texts: list) -> str:
+    answer = ANSWER_PREFIX + ' '.join(texts[:2])
+    return answer[:ANSWER_CHARS] + '...' if len(answer) > ANSWER_CHARS else answer
+
+
+def whole_document(index: SearchIndex, hits: list, tokens) -> tuple:
+    weights = query_weights(index, tokens)
+    documents, scored = [], 0
+    for doc_id, text in hits:
+        sentences = []
+        for start, end in sentence_spans(text):
+            present = set(tokenize(text[start:end]))
+            sentences.append((start, end, sum(weight for token, weight in weights.items() if token_in(token, present))))
+        scored += len(sentences)
+        documents.append((text, sentences))
+    return ANSWER_PREFIX + compose_snippet(documents[:2], ANSWER_CHARS - len(ANSWER_PREFIX)), scored
+
+
+def passage_sentences(index: SearchIndex, hits: list, tokens) -> tuple:
+    weights = query_weights(index, tokens)
+    documents = [(text, scored_sentences(text, best_passages(index, doc_id, weights), weights)) for doc_id, text in hits]
+    scored = sum(len(sentences) for _, sentences in documents)
+    return ANSWER_PREFIX + compose_snippet(documents[:2], ANSWER_CHARS - len(ANSWER_PREFIX)), scored
+
+
+def coverage(answer: str, texts: list, weights: dict) -> float:
+    words = set(tokenize(answer))
+    available = set(tokenize(' '.join(texts[:2])))
+    reachable = {token: weight for token, weight in weights.items() if token_in(token, available)}
+    if not reachable:
+        return 1.0
+    return sum(weight for token, weight in reachable.items() if token_in(token, words)) / sum(reachable.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--topics', type=int, default=2000)
+    parser.add_argument('--lectures', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    course_content, discourse_posts = synthetic_corpus(args.topics, 0)
+    course_content = course_content + long_lectures(args.lectures)
+    index = SearchIndex(course_content, discourse_posts)
+    ranker = create_ranker(index, 'bm25')
+    processor = QuestionProcessor()
+    # Half the questions are lecture sentences, so long pages make it into the top hits
+    rng = random.Random(11)
+    questions = sample_questions(args.queries // 2) + [
+        ' '.join(tokenize(sentence(rng))[:rng.randint(2, 5)]) for _ in range(args.queries - args.queries // 2)]
+    processed = [processor.process_question(question) for question in questions]
+    queries = []
+    for question in processed:
+        hits = [(doc_id, answer_text(index.documents[doc_id])) for doc_id, _ in ranker.rank(question, args.k)]
+        hits = [(doc_id, text) for doc_id, text in hits if text]
+        if hits:
+            queries.append((question, hits))
+    print(f"{len(index)} documents, {len(index.passage_lengths)} passages; {len(queries)} queries with answer text")
+
+    print(f"{'method':<10} {'us/query':>9} {'sentences':>10} {'mid-sentence':>13} {'coverage':>9}")
+    for name in ('truncate', 'document', 'passages'):
+        elapsed, scored, cut, covered = 0.0, 0, 0, 0.0
+        for question, hits in queries:
+            texts = [text for _, text in hits]
+            started = time.perf_counter()
+            if name == 'truncate':
+                answer, count = truncated(texts), 0
+            elif name == 'document':
+                answer, count = whole_document(index, hits, question.tokens)
+            else:
+                answer, count = passage_sentences(index, hits, question.tokens)
+            elapsed += time.perf_counter() - started
+            scored += count
+            cut += answer.endswith('...')
+            covered += coverage(answer, texts, query_weights(index, question.tokens))
+        print(f"{name:<10} {elapsed / len(queries) * 1e6:>9.0f} {scored / len(queries):>10.1f} "
+              f"{cut / len(queries) * 100:>12.1f}% {covered / len(queries) * 100:>8.1f}%")
+
+
+if __name__ == '__main__':
+    main()
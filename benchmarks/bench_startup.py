@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Time from process start to the first /health response and to the first
+/api/ answers (one predefined, one that needs search), for:
+
+    eager      knowledge base loaded before serving (the old import-time behaviour)
+    lazy       loaded by the first search request (KB_WARMUP=false)
+    warm-up    loaded by a background task started with the app (default)
+
+Usage:
+    python -m benchmarks.bench_startup [--topics 20000] [--sections 500] [--binary] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+from benchmarks.corpus import REPO_ROOT, scraped_data_workdir, synthetic_corpus
+from benchmarks.server import free_port
+
+PREDEFINED_QUESTION = "What is TDS?"
+SEARCH_QUESTION = "How do I deploy a FastAPI app on Vercel?"
+
+# Serves the app with the knowledge base loaded before the first request is accepted
+EAGER_SERVER = r'''
+import sys, uvicorn
+import app
+app.answer_generator.warm_up()
+uvicorn.run(app.app, host='127.0.0.1', port=int(sys.argv[1]), log_level='warning')
+'''
+
+
+def first_response_ms(session: requests.Session, started: float, method: str, url: str, **kwargs) -> float:
+    """Poll until the request succeeds; milliseconds since the process was spawned"""
+    while True:
+        try:
+            if session.request(method, url, timeout=60, **kwargs).status_code == 200:
+                return (time.perf_counter() - started) * 1000
+        except requests.ConnectionError:
+            time.sleep(0.005)
+
+
+def measure(mode: str, workdir: str) -> dict:
+    port = free_port()
+    env = {**os.environ, 'PYTHONPATH': REPO_ROOT, 'KB_WARMUP': 'false' if mode == 'lazy' else 'true'}
+    if mode == 'eager':
+        command = [sys.executable, '-c', EAGER_SERVER, str(port)]
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1', '--port', str(port),
+                   '--log-level', 'warning']
+    base_url = f"http://127.0.0.1:{port}"
+    session = requests.Session()
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=workdir, env=env)
+    try:
+        health = first_response_ms(session, started, 'GET', f"{base_url}/health")
+        predefined = first_response_ms(session, started, 'POST', f"{base_url}/api/",
+                                       json={'question': PREDEFINED_QUESTION})
+        search = first_response_ms(session, started, 'POST', f"{base_url}/api/", json={'question': SEARCH_QUESTION})
+        return {'health': health, 'predefined': predefined, 'search': search}
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--topics', type=int, default=20000)
+    parser.add_argument('--sections', type=int, default=500)
+    parser.add_argument('--binary', action='store_true', help="serve from the compiled knowledge base")
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    course_content, discourse_posts = synthetic_corpus(args.topics, args.sections)
+    with scraped_data_workdir(course_content, discourse_posts, compile_kb=args.binary) as workdir:
+        print(f"{len(course_content) + len(discourse_posts)} documents ({'binary' if args.binary else 'JSON'}); "
+              f"ms since process start, median of {args.runs} runs")
+        print(f"{'mode':<8} {'/health':>9} {'predefined':>11} {'search':>9}")
+        for mode in ('eager', 'lazy', 'warm-up'):
+            runs = [measure(mode, workdir) for _ in range(args.runs)]
+            print(f"{mode:<8} {statistics.median(r['health'] for r in runs):>9.0f} "
+                  f"{statistics.median(r['predefined'] for r in runs):>11.0f} "
+                  f"{statistics.median(r['search'] for r in runs):>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+LLM answer synthesis (services/synthesis.py) against a local fake
+OpenAI-compatible server (benchmarks/openai_stub.py), driven the way
+app.py drives the pipeline: retrieval on a thread pool of --workers, many
+concurrent requests on one event loop, answer caches off.
+
+    extractive     synthesis disabled
+    blocking       synthesis inside the worker thread (how process-pool
+                   workers run it), so each wait holds a worker
+    deferred       the thread-mode app path: the worker returns the
+                   extractive answer and the event loop awaits synthesis
+    fresh-client   deferred, but every call opens its own HTTP client
+    timeout        deferred, with the provider slower than LLM_TIMEOUT
+
+Reported: throughput, latency percentiles, answers synthesized vs fallen
+back to extractive, TCP connections the fake server accepted and its peak
+number of requests in flight.
+
+Usage:
+    python -m benchmarks.bench_synthesis [--requests 300] [--clients 32] [--latency 0.3] [--workers 4] [--max-concurrency 16]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from functools import partial
+
+import httpx
+
+from benchmarks.corpus import REPO_ROOT, sample_questions
+from benchmarks.openai_stub import StubChatCompletions
+from services.answer_cache import AnswerCache, SemanticAnswerCache
+from services.answer_generator import AnswerGenerator
+from services.executor import BoundedExecutor
+from services.ocr import OCRStage
+from services.pipeline import AnswerPipeline
+from services.question_processor import QuestionProcessor
+from services.synthesis import ChatCompletionsProvider, SynthesisStage
+
+MODES = ('extractive', 'blocking', 'deferred', 'fresh-client', 'timeout')
+
+
+class FreshClientProvider(ChatCompletionsProvider):
+    """A new client, hence a new connection, for every call"""
+
+    async def complete(self, client: httpx.AsyncClient, messages):
+        async with httpx.AsyncClient(timeout=client.timeout) as own_client:
+            return await super().complete(own_client, messages)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def drive(pipeline: AnswerPipeline, executor: BoundedExecutor, questions: list, clients: int,
+                defer: bool) -> dict:
+    queue = list(reversed(questions))
+    latencies, answers = [], []
+
+    async def client():
+        while queue:
+            question = queue.pop()
+            started = time.perf_counter()
+            answer = partial(pipeline.answer, defer_synthesis=defer)
+            answer_data = await pipeline.finish_synthesis(await executor.run(answer, question))
+            latencies.append((time.perf_counter() - started) * 1000)
+            answers.append(answer_data['answer'])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return {'seconds': time.perf_counter() - started, 'latencies': latencies, 'answers': answers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=300)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--latency', type=float, default=0.3, help='fake provider latency in seconds')
+    parser.add_argument('--jitter', type=float, default=0.1)
+    parser.add_argument('--timeout', type=float, default=2.0, help='LLM_TIMEOUT')
+    parser.add_argument('--workers', type=int, default=4, help='request worker threads')
+    parser.add_argument('--max-concurrency', type=int, default=16)
+    parser.add_argument('--modes', nargs='+', default=list(MODES), choices=MODES)
+    args = parser.parse_args()
+
+    os.chdir(REPO_ROOT)
+    generator = AnswerGenerator(kb_path='')
+    generator.warm_up()
+    processor = QuestionProcessor()
+    # Only questions with a contextual answer reach synthesis
+    questions = [question for question in sample_questions(args.requests * 3)
+                 if generator.generate_answer(processor.process_question(question)).get('context')][:args.requests]
+
+    print(f"{len(questions)} questions, {args.clients} concurrent clients, {args.workers} worker threads; "
+          f"fake provider {args.latency * 1000:.0f}ms (+0-{args.jitter * 1000:.0f}ms), LLM_TIMEOUT {args.timeout}s, "
+          f"at most {args.max_concurrency} calls in flight")
+    print(f"{'mode':<13} {'req/s':>7} {'p50':>8} {'p95':>8} {'synthesized':>12} {'connections':>12} {'peak':>5}")
+    for mode in args.modes:
+        # Slower than LLM_TIMEOUT, but within the client's socket timeout (twice LLM_TIMEOUT)
+        latency = args.timeout * 1.5 if mode == 'timeout' else args.latency
+        with StubChatCompletions(latency=latency, jitter=args.jitter) as stub:
+            provider = None
+            if mode != 'extractive':
+                provider_class = FreshClientProvider if mode == 'fresh-client' else ChatCompletionsProvider
+                provider = provider_class(base_url=stub.base_url, api_key='stub')
+            stage = SynthesisStage(provider, timeout_seconds=args.timeout, max_concurrency=args.max_concurrency)
+            pipeline = AnswerPipeline(processor, generator, AnswerCache(max_entries=0), SemanticAnswerCache(capacity=0),
+                                      OCRStage('none'), stage)
+            executor = BoundedExecutor('bench', max_workers=args.workers, max_pending=10 ** 6, mode='thread')
+            try:
+                result = asyncio.run(drive(pipeline, executor, questions, args.clients, defer=mode != 'blocking'))
+            finally:
+                executor.shutdown()
+                stage.shutdown()
+        synthesized = sum(answer.startswith('From the course material') for answer in result['answers'])
+        print(f"{mode:<13} {len(questions) / result['seconds']:>7.1f} "
+              f"{statistics.median(result['latencies']):>6.0f}ms {percentile(result['latencies'], 0.95):>6.0f}ms "
+              f"{synthesized:>6}/{len(questions):<5} {stub.connections:>12} {stub.peak_in_flight:>5}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Request parsing time and server peak RSS for image questions sent as base64
+JSON (POST /api/) versus binary multipart / octet-stream (POST /api/upload).
+
+Each (path, size) pair runs against a fresh server so the peak RSS (VmHWM)
+growth is attributable to that upload path alone. Linux only for RSS.
+
+Usage:
+    python -m benchmarks.bench_upload [--sizes 1 5 10] [--requests 5]
+"""
+import argparse
+import base64
+import json
+import os
+import statistics
+import time
+import uuid
+
+import requests
+
+from benchmarks.server import running_server
+
+QUESTION = "What is shown in this screenshot?"
+
+
+def peak_rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def parse_server_timing(header: str) -> dict:
+    stages = {}
+    for entry in filter(None, (part.strip() for part in header.split(','))):
+        name, _, duration = entry.partition(';dur=')
+        stages[name] = float(duration or 0)
+    return stages
+
+
+def build_request(path: str, image: bytes) -> dict:
+    """Pre-encoded request so client-side encoding stays out of the measurement"""
+    if path == 'json':
+        body = json.dumps({'question': QUESTION, 'image': base64.b64encode(image).decode('ascii')}).encode()
+        return {'url': '/api/', 'data': body, 'headers': {'Content-Type': 'application/json'}}
+    if path == 'multipart':
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\nContent-Disposition: form-data; name=\"question\"\r\n\r\n{QUESTION}\r\n"
+                f"--{boundary}\r\nContent-Disposition: form-data; name=\"image\"; filename=\"image.png\"\r\n"
+                f"Content-Type: image/png\r\n\r\n").encode() + image + f"\r\n--{boundary}--\r\n".encode()
+        return {'url': '/api/upload', 'data': body,
+                'headers': {'Content-Type': f"multipart/form-data; boundary={boundary}"}}
+    return {'url': '/api/upload', 'data': image, 'params': {'question': QUESTION},
+            'headers': {'Content-Type': 'application/octet-stream'}}
+
+
+def run(path: str, size_mb: int, args) -> dict:
+    env = {'ANSWER_CACHE_SIZE': '0', 'SEMANTIC_CACHE_SIZE': '0',
+           'MAX_IMAGE_BYTES': str((max(args.sizes) + 1) * 1024 * 1024)}
+    image = b'\x89PNG\r\n\x1a\n' + os.urandom(size_mb * 1024 * 1024 - 8)
+    request = build_request(path, image)
+    url = request.pop('url')
+
+    with running_server(env) as (base_url, process):
+        session = requests.Session()
+        session.post(f"{base_url}/api/", json={'question': QUESTION}, timeout=60)
+        baseline_rss = peak_rss_mb(process.pid)
+
+        latencies, server_ms = [], []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            response = session.post(f"{base_url}{url}", timeout=120, **request)
+            latencies.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+            stages = parse_server_timing(response.headers.get('Server-Timing', ''))
+            server_ms.append(stages.get('upload', 0.0) + stages.get('image', 0.0))
+        return {
+            'body_mb': len(request['data']) / 1024 / 1024,
+            'latency_ms': statistics.median(latencies),
+            'ingest_ms': statistics.median(server_ms),
+            'peak_rss_growth_mb': peak_rss_mb(process.pid) - baseline_rss,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 10], help="image sizes in MB")
+    parser.add_argument('--requests', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'path':<10} {'image':>6} {'body':>8} {'latency p50':>12} {'upload+image':>13} {'peak RSS +':>11}")
+    for size_mb in args.sizes:
+        for path in ('json', 'multipart', 'octet'):
+            result = run(path, size_mb, args)
+            print(f"{path:<10} {size_mb:>4}MB {result['body_mb']:>6.1f}MB {result['latency_ms']:>10.1f}ms "
+                  f"{result['ingest_ms']:>11.1f}ms {result['peak_rss_growth_mb']:>9.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Compare exact and IVF vector search (float32 and int8) on a synthetic corpus
+using the deterministic hashing embedder.
+
+Usage:
+    python -m benchmarks.bench_vector_search [--topics 50000] [--queries 200]
+"""
+import argparse
+import time
+
+from benchmarks.corpus import synthetic_corpus, sample_questions
+from services.embeddings import EmbeddingIndex, HashingEmbedder
+from services.search_index import SearchIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topics', type=int, default=50000)
+    parser.add_argument('--sections', type=int, default=500)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--nprobe', type=int, default=8)
+    parser.add_argument('-k', type=int, default=3)
+    args = parser.parse_args()
+
+    course_content, discourse_posts = synthetic_corpus(args.topics, args.sections)
+    index = SearchIndex(course_content, discourse_posts)
+    embedder = HashingEmbedder()
+
+    started = time.perf_counter()
+    embedding_index = EmbeddingIndex.build(index, embedder)
+    print(f"Embedded {len(embedding_index)} documents in {time.perf_counter() - started:.1f}s")
+
+    queries = embedder.embed(sample_questions(args.queries))
+    exact = [[doc_id for doc_id, _ in embedding_index.search(q, args.k)] for q in queries]
+
+    for quantization in ('float32', 'int8'):
+        if quantization == 'int8':
+            embedding_index.quantize()
+        for mode in ('exact', 'ivf'):
+            started = time.perf_counter()
+            results = [[doc_id for doc_id, _ in embedding_index.search(q, args.k, mode=mode, nprobe=args.nprobe)]
+                       for q in queries]
+            per_query_ms = (time.perf_counter() - started) * 1000 / len(queries)
+            recall = sum(len(set(a) & set(b)) for a, b in zip(exact, results)) / (args.k * len(queries))
+            print(f"{quantization:>7} {mode:>5}: {per_query_ms:7.3f} ms/query, recall@{args.k} {recall:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Total memory of `uvicorn app:app --workers N` for 1, 4 and 8 workers, with
+every worker loading its own knowledge base from JSON versus shared mode
+(KB_SHARED=true), where the index is compiled once and each worker maps the
+same file read-only.
+
+Both RSS (shared pages counted once per process) and PSS (shared pages
+split between the processes mapping them) are summed over the uvicorn
+process tree once every worker has warmed up. Linux only.
+
+Usage:
+    python -m benchmarks.bench_workers [--topics 20000] [--sections 500] [--workers 1 4 8]
+"""
+import argparse
+import os
+import time
+from typing import Dict, List
+
+from benchmarks.corpus import REPO_ROOT, scraped_data_workdir, synthetic_corpus
+from benchmarks.server import running_server
+
+MODES = {
+    'per-worker': {'KB_SHARED': 'false', 'KB_PATH': ''},
+    'shared': {'KB_SHARED': 'true'},
+}
+
+
+def process_tree(pid: int) -> List[int]:
+    pids = [pid]
+    for task in os.listdir(f'/proc/{pid}/task'):
+        try:
+            with open(f'/proc/{pid}/task/{task}/children') as children:
+                for child in children.read().split():
+                    pids.extend(process_tree(int(child)))
+        except OSError:
+            continue
+    return pids
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """RSS and PSS of a process tree, in MB"""
+    totals = {'rss': 0.0, 'pss': 0.0}
+    for process_id in process_tree(pid):
+        try:
+            with open(f'/proc/{process_id}/smaps_rollup') as rollup:
+                for line in rollup:
+                    name, value = line.split(':', 1)
+                    if name in ('Rss', 'Pss'):
+                        totals[name.lower()] += int(value.split()[0]) / 1024
+        except OSError:
+            continue
+    return totals
+
+
+def settled_memory(pid: int, workers: int, timeout: float = 120.0) -> Dict[str, float]:
+    """Memory once all workers are up and it has stopped growing (background warm-up done)"""
+    deadline = time.monotonic() + timeout
+    previous, stable = None, 0
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        current = memory_mb(pid)
+        if len(process_tree(pid)) > workers and previous and abs(current['pss'] - previous['pss']) < 0.5:
+            stable += 1
+            if stable >= 4:
+                return current
+        else:
+            stable = 0
+        previous = current
+    return previous
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--topics', type=int, default=20000)
+    parser.add_argument('--sections', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    args = parser.parse_args()
+
+    course_content, discourse_posts = synthetic_corpus(args.topics, args.sections)
+    with scraped_data_workdir(course_content, discourse_posts) as workdir:
+        print(f"{len(course_content) + len(discourse_posts)} documents; total MB over the uvicorn process tree")
+        print(f"{'mode':<11} {'workers':>7} {'RSS':>9} {'PSS':>9}")
+        for mode, env in MODES.items():
+            for workers in args.workers:
+                with running_server({**env, 'PYTHONPATH': REPO_ROOT}, workers=workers, cwd=workdir,
+                                    timeout=180) as (_, process):
+                    memory = settled_memory(process.pid, workers)
+                print(f"{mode:<11} {workers:>7} {memory['rss']:>9.0f} {memory['pss']:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
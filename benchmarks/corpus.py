@@ -0,0 +1,115 @@
+"""
+Synthetic corpus helpers shared by the benchmark scripts.
+
+The real knowledge base under data/ is tiny, so benchmarks grow it by
+recombining sentences and keywords from the shipped documents. The output
+keeps the shape of enhanced_discourse_posts.json / enhanced_course_content.json.
+"""
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import List, Dict, Any, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_seed_documents() -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Load the shipped course content and discourse topics"""
+    with open(os.path.join('data', 'course_content.json'), 'r', encoding='utf-8') as f:
+        course_content = json.load(f)
+    with open(os.path.join('data', 'discourse_posts.json'), 'r', encoding='utf-8') as f:
+        discourse_posts = json.load(f)
+    return course_content, discourse_posts
+
+
+def synthetic_corpus(num_topics: int, num_sections: int = 0, seed: int = 42) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Build num_sections course sections and num_topics discourse topics"""
+    rng = random.Random(seed)
+    course_seed, discourse_seed = load_seed_documents()
+
+    words = []
+    keywords = []
+    for doc in course_seed + discourse_seed:
+        words.extend((doc.get('title', '') + ' ' + doc.get('content', '') + ' ' + doc.get('answer_summary', '')).split())
+        keywords.extend(doc.get('keywords', []))
+
+    def sentence(length: int) -> str:
+        return ' '.join(rng.choice(words) for _ in range(length))
+
+    course_content = []
+    for i in range(num_sections):
+        course_content.append({
+            'url': f"https://tds.s-anand.net/#/section-{i}",
+            'title': sentence(rng.randint(3, 8)),
+            'section': rng.choice(course_seed)['section'],
+            'content': sentence(rng.randint(40, 120)),
+            'keywords': rng.sample(keywords, 5),
+        })
+
+    discourse_posts = []
+    for i in range(num_topics):
+        topic_id = 200000 + i
+        discourse_posts.append({
+            'id': topic_id,
+            'title': sentence(rng.randint(3, 10)),
+            'url': f"https://discourse.onlinedegree.iitm.ac.in/t/topic-{topic_id}",
+            'category': rng.choice(discourse_seed)['category'],
+            'posts': [
+                {
+                    'id': topic_id * 10 + j,
+                    'username': f"student{rng.randint(1, 5000)}",
+                    'content': sentence(rng.randint(10, 60)),
+                    'created_at': "2025-02-01T10:00:00.000Z",
+                }
+                for j in range(rng.randint(1, 4))
+            ],
+            'keywords': rng.sample(keywords, 4),
+            'answer_summary': sentence(rng.randint(15, 40)),
+        })
+    return course_content, discourse_posts
+
+
+def sample_questions(count: int, seed: int = 7) -> List[str]:
+    """Questions built from the seed vocabulary plus the promptfoo samples"""
+    rng = random.Random(seed)
+    course_seed, discourse_seed = load_seed_documents()
+    titles = [doc['title'] for doc in course_seed + discourse_seed]
+    fixed = [
+        "Should I use gpt-4o-mini or gpt-3.5-turbo-0125 for GA5?",
+        "How do I deploy a FastAPI app on Vercel?",
+        "What is the weightage of Project 2?",
+        "My score keeps resetting to 0 after saving",
+        "How do I use uv to run a python script?",
+    ]
+    questions = list(fixed)
+    while len(questions) < count:
+        words = rng.choice(titles).split()
+        rng.shuffle(words)
+        questions.append(' '.join(words[:rng.randint(2, len(words))]) + '?')
+    return questions[:count]
+
+
+@contextmanager
+def scraped_data_workdir(course_content: List[Dict[str, Any]], discourse_posts: List[Dict[str, Any]],
+                         compile_kb: bool = False):
+    """
+    Temporary working directory laid out like the repository root, with the
+    given corpora as scraped_data/*.json (and, optionally, the compiled
+    knowledge base). Yields the directory path; run children with cwd set to it
+    and PYTHONPATH=REPO_ROOT.
+    """
+    with tempfile.TemporaryDirectory() as workdir:
+        os.symlink(os.path.join(REPO_ROOT, 'data'), os.path.join(workdir, 'data'))
+        os.makedirs(os.path.join(workdir, 'scraped_data'))
+        for name, corpus in (('enhanced_course_content.json', course_content),
+                             ('enhanced_discourse_posts.json', discourse_posts)):
+            with open(os.path.join(workdir, 'scraped_data', name), 'w', encoding='utf-8') as f:
+                json.dump(corpus, f)
+        if compile_kb:
+            subprocess.run([sys.executable, os.path.join(REPO_ROOT, 'build_index.py'), 'kb'], cwd=workdir,
+                           env={**os.environ, 'PYTHONPATH': REPO_ROOT}, check=True, capture_output=True)
+        yield workdir
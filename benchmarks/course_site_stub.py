@@ -0,0 +1,162 @@
+"""
+Local static copy of a course site for the lecture scraper benchmark.
+
+write_course_site() generates a dashboard (``index.html``) linking to
+``/lectures/unit-N.html`` pages. Like the real site, lecture text is
+rendered client-side: each page ships an empty ``<article>`` that a script
+fills after a short delay. Every page also pulls in images, a web font and
+an analytics script, none of which affect the text. StubCourseSite serves
+the directory with a fixed per-request latency (analytics slower still)
+and counts requests and bytes by kind.
+"""
+import json
+import os
+import random
+import socket
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.discourse_stub import QuietHTTPServer
+
+IMAGES_PER_PAGE = 4
+IMAGE_BYTES = 120_000
+FONT_BYTES = 60_000
+
+WORDS = ("data", "model", "pipeline", "deploy", "vector", "prompt", "scrape", "schema", "notebook", "docker",
+         "endpoint", "latency", "embedding", "dataset", "regression", "visualise", "container", "token")
+
+
+def request_kind(path: str) -> str:
+    if path.startswith('/images/'):
+        return 'image'
+    if path.startswith('/fonts/'):
+        return 'font'
+    if path.startswith('/analytics'):
+        return 'analytics'
+    return 'document'
+
+
+def lecture_page(title: str, body: str, render_delay_ms: int) -> str:
+    images = "".join(f'<img src="/images/figure-{n}.png" alt="">' for n in range(IMAGES_PER_PAGE))
+    return f"""<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>@font-face {{ font-family: Course; src: url(/fonts/course.woff2); }} body {{ font-family: Course; }}</style>
+<script async src="/analytics.js"></script>
+</head><body>
+<nav><a href="/">Home</a></nav>
+<main><article></article>{images}</main>
+<script>
+setTimeout(() => {{
+  document.querySelector("article").innerHTML = {json.dumps(body)};
+}}, {render_delay_ms});
+</script>
+</body></html>
+"""
+
+
+def write_course_site(root: str, num_lectures: int = 30, render_delay_ms: int = 300,
+                      seed: int = 5) -> List[Tuple[str, str]]:
+    """Write the site under root; returns (title, path) of every lecture"""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(root, 'lectures'), exist_ok=True)
+    os.makedirs(os.path.join(root, 'images'), exist_ok=True)
+    os.makedirs(os.path.join(root, 'fonts'), exist_ok=True)
+    lectures = []
+    for n in range(1, num_lectures + 1):
+        title = f"Unit {n}: {rng.choice(WORDS).title()} {rng.choice(WORDS)}"
+        paragraphs = "".join(
+            f"<p>{' '.join(rng.choice(WORDS) for _ in range(rng.randint(40, 120)))}.</p>"
+            for _ in range(rng.randint(3, 10)))
+        path = f"/lectures/unit-{n}.html"
+        with open(os.path.join(root, path.lstrip('/')), 'w', encoding='utf-8') as f:
+            f.write(lecture_page(title, f"<h1>{title}</h1>{paragraphs}", render_delay_ms))
+        lectures.append((title, path))
+    links = "".join(f'<li><a href="{path}">{title}</a></li>' for title, path in lectures)
+    with open(os.path.join(root, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(lecture_page("Tools in Data Science", "<h1>Tools in Data Science</h1>", 0)
+                .replace("<main>", f"<main><ul>{links}</ul>"))
+    for n in range(IMAGES_PER_PAGE):
+        with open(os.path.join(root, 'images', f'figure-{n}.png'), 'wb') as f:
+            f.write(rng.randbytes(IMAGE_BYTES))
+    with open(os.path.join(root, 'fonts', 'course.woff2'), 'wb') as f:
+        f.write(rng.randbytes(FONT_BYTES))
+    with open(os.path.join(root, 'analytics.js'), 'w', encoding='utf-8') as f:
+        f.write("navigator.sendBeacon && navigator.sendBeacon('/analytics/collect', location.href);\n")
+    return lectures
+
+
+class StubCourseSite:
+    """Serves a directory written by write_course_site(); use as a context manager"""
+
+    def __init__(self, root: str, latency: float = 0.02, analytics_latency: float = 0.5):
+        self.root = root
+        self.latency = latency
+        self.analytics_latency = analytics_latency
+        self.requests: Dict[str, int] = {}
+        self.bytes_sent: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[QuietHTTPServer] = None
+        self.base_url = ''
+
+    def handler(self):
+        stub = self
+
+        class Handler(SimpleHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, directory=stub.root, **kwargs)
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def log_message(self, *args):
+                pass
+
+            def end_headers(self):
+                self.send_header('Cache-Control', 'no-store')
+                super().end_headers()
+
+            def handle_request(self, method):
+                kind = request_kind(self.path)
+                time.sleep(stub.analytics_latency if kind == 'analytics' else stub.latency)
+                if self.path.startswith('/analytics/collect'):
+                    self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                    self.send_response(204)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    size = 0
+                else:
+                    method()
+                    local_path = self.translate_path(self.path)
+                    if os.path.isdir(local_path):
+                        local_path = os.path.join(local_path, 'index.html')
+                    size = os.path.getsize(local_path) if os.path.isfile(local_path) else 0
+                with stub._lock:
+                    stub.requests[kind] = stub.requests.get(kind, 0) + 1
+                    stub.bytes_sent[kind] = stub.bytes_sent.get(kind, 0) + size
+
+            def do_GET(self):
+                self.handle_request(super().do_GET)
+
+            def do_POST(self):
+                self.handle_request(lambda: self.send_error(404))
+
+        return Handler
+
+    def reset_counts(self):
+        with self._lock:
+            self.requests, self.bytes_sent = {}, {}
+
+    def __enter__(self) -> 'StubCourseSite':
+        self._server = QuietHTTPServer(('127.0.0.1', 0), self.handler())
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
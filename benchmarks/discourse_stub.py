@@ -0,0 +1,267 @@
+"""
+Local stand-in for the Discourse JSON API used by the scraper benchmarks.
+
+Serves ``/c/<slug>/<id>.json?page=N`` (30 topics per page, most recently
+bumped first), ``/t/<id>.json`` (first 20 posts plus the post-id stream)
+and ``/t/<id>/posts.json?post_number=N&asc=true`` (the next 20 posts) over
+HTTP/1.1 keep-alive, with ETags and 304 responses, a fixed per-request
+latency and optional injected 429/503 responses. Counts requests and TCP
+connections so connection reuse is visible. add_posts() and add_topic()
+change the forum between runs.
+"""
+import hashlib
+import json
+import random
+import re
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+TOPICS_PER_PAGE = 30
+POSTS_PER_TOPIC_PAGE = 20
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+CATEGORY_RE = re.compile(r'^/c/.+/\d+\.json$')
+TOPIC_RE = re.compile(r'^/t/(\d+)\.json$')
+TOPIC_POSTS_RE = re.compile(r'^/t/(\d+)/posts\.json$')
+
+
+def synthetic_forum(num_topics: int, max_posts: int = 12, seed: int = 11, newest: datetime = datetime(2025, 4, 14, 12, 0),
+                    oldest: datetime = datetime(2024, 12, 1)) -> List[Dict[str, Any]]:
+    """
+    Topics (with their posts) spread evenly between oldest and newest, newest
+    first. Topics with more than 20 posts need /t/<id>/posts.json for the rest.
+    """
+    rng = random.Random(seed)
+    step = (newest - oldest) / max(1, num_topics)
+    topics = []
+    for position in range(num_topics):
+        created = newest - step * position
+        topic = {
+            'id': 160000 + position,
+            'title': f"Question {position} about the graded assignment",
+            'created_at': created.strftime(DATE_FORMAT),
+            'posts': [],
+        }
+        for post_number in range(1, rng.randint(2, max_posts) + 1):
+            topic['posts'].append(make_post(rng, 500000 + position * 1000 + post_number, post_number,
+                                            created + timedelta(hours=post_number)))
+        topics.append(topic)
+    return topics
+
+
+def make_post(rng: random.Random, post_id: int, post_number: int, posted: datetime) -> Dict[str, Any]:
+    return {
+        'id': post_id,
+        'post_number': post_number,
+        'username': f"student{rng.randint(1, 500)}",
+        'created_at': posted.strftime(DATE_FORMAT),
+        'updated_at': posted.strftime(DATE_FORMAT),
+        'cooked': f"<p>Reply {post_number} about <code>GA{rng.randint(1, 7)}</code> "
+                  f"and <a href=\"https://tds.s-anand.net\">the course</a>.</p>" * rng.randint(1, 6),
+    }
+
+
+def realistic_cooked(rng: random.Random) -> str:
+    """
+    Cooked HTML shaped like real Discourse posts: paragraphs with mentions,
+    links and inline code, quotes of earlier posts, code blocks, lists,
+    lightboxed screenshots, onebox link previews and emoji.
+    """
+    words = ("docker", "fastapi", "deadline", "score", "proxy", "token", "prompt", "notebook", "submission",
+             "vercel", "embedding", "assignment", "github", "error", "portal", "regex", "json", "llm")
+
+    def text(count: int) -> str:
+        return ' '.join(rng.choice(words) for _ in range(count))
+
+    def paragraph() -> str:
+        user = f"student{rng.randint(1, 500)}"
+        return (f"<p>{text(rng.randint(5, 25))} <a class=\"mention\" href=\"/u/{user}\">@{user}</a> {text(rng.randint(3, 15))} <code>GA{rng.randint(1, 7)}</code> "
+                f"<a href=\"https://tds.s-anand.net/#/{rng.choice(words)}\">{text(2)}</a> &amp; {text(4)}.</p>")
+
+    blocks = [paragraph() for _ in range(rng.randint(1, 4))]
+    if rng.random() < 0.3:
+        blocks.insert(0, f"<aside class=\"quote no-group\" data-username=\"student{rng.randint(1, 500)}\" "
+                         f"data-post=\"{rng.randint(1, 20)}\"><div class=\"title\"><div class=\"quote-controls\"></div>"
+                         f"<img alt=\"\" width=\"24\" height=\"24\" src=\"/user_avatar/24/1.png\" class=\"avatar\"> "
+                         f"student:</div><blockquote><p>{text(rng.randint(8, 30))}</p></blockquote></aside>")
+    if rng.random() < 0.3:
+        code = '\n'.join(f"{rng.choice(words)} = {rng.choice(words)}({rng.randint(0, 99)})" for _ in range(rng.randint(2, 12)))
+        blocks.append(f"<pre><code class=\"lang-python\">{code}\n</code></pre>")
+    if rng.random() < 0.2:
+        blocks.append("<ul>" + "".join(f"<li>{text(rng.randint(3, 10))}</li>" for _ in range(rng.randint(2, 6))) + "</ul>")
+    if rng.random() < 0.2:
+        blocks.append(f"<div class=\"lightbox-wrapper\"><a class=\"lightbox\" href=\"/uploads/default/original/3X/a/b/c.png\" "
+                      f"data-download-href=\"/uploads/default/c\" title=\"image\"><img src=\"/uploads/default/optimized/c.png\" "
+                      f"alt=\"image\" width=\"690\" height=\"388\"><div class=\"meta\"><svg class=\"fa d-icon d-icon-far-image "
+                      f"svg-icon\"><use href=\"#far-image\"></use></svg><span class=\"filename\">image</span>"
+                      f"<span class=\"informations\">1920x1080 {rng.randint(50, 400)} KB</span></div></a></div>")
+    if rng.random() < 0.1:
+        blocks.append(f"<aside class=\"onebox allowlistedgeneric\"><header class=\"source\"><a href=\"https://tds.s-anand.net\">"
+                      f"tds.s-anand.net</a></header><article class=\"onebox-body\"><h3>{text(4)}</h3><p>{text(20)}</p>"
+                      f"</article></aside>")
+    if rng.random() < 0.3:
+        blocks[-1] += " <img src=\"/images/emoji/twitter/slight_smile.png?v=12\" title=\":slight_smile:\" class=\"emoji\" alt=\":slight_smile:\">"
+    return '\n'.join(blocks)
+
+
+def topic_summary(topic: Dict[str, Any]) -> Dict[str, Any]:
+    """The category-list entry of a topic"""
+    posts = topic['posts']
+    return {
+        'id': topic['id'],
+        'title': topic['title'],
+        'created_at': topic['created_at'],
+        'last_posted_at': posts[-1]['created_at'],
+        'bumped_at': posts[-1]['created_at'],
+        'posts_count': len(posts),
+        'highest_post_number': posts[-1]['post_number'],
+    }
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients that are cancelled mid-request (interrupted scrapes) just hang up
+        pass
+
+
+class StubDiscourse:
+    """Threaded stub server; use as a context manager, base_url is set while running"""
+
+    def __init__(self, topics: List[Dict[str, Any]], latency: float = 0.02, fail_every: int = 0,
+                 rate_limit_every: int = 0, retry_after: float = 0.2):
+        self.topics = topics
+        self.by_id = {topic['id']: topic for topic in topics}
+        self._rng = random.Random(len(topics))
+        self.latency = latency
+        self.fail_every = fail_every
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server: Optional[QuietHTTPServer] = None
+        self.base_url = ''
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                # Headers and body go out in separate writes; without this Nagle delays every keep-alive response
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+                payload = json.dumps(body).encode('utf-8')
+                if status == 200:
+                    etag = f'W/"{hashlib.md5(payload).hexdigest()}"'
+                    headers = {**(headers or {}), 'ETag': etag}
+                    if self.headers.get('If-None-Match') == etag:
+                        status, payload = 304, b''
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                    count = stub.requests
+                time.sleep(stub.latency)
+                if stub.rate_limit_every and count % stub.rate_limit_every == 0:
+                    return self.send_json(429, {'errors': ['rate limited']}, {'Retry-After': str(stub.retry_after)})
+                if stub.fail_every and count % stub.fail_every == 0:
+                    return self.send_json(503, {'errors': ['unavailable']})
+                url = urlparse(self.path)
+                if CATEGORY_RE.match(url.path):
+                    return self.send_json(200, stub.category_page(int(parse_qs(url.query).get('page', ['0'])[0])))
+                match = TOPIC_RE.match(url.path)
+                if match and int(match.group(1)) in stub.by_id:
+                    return self.send_json(200, stub.topic(int(match.group(1))))
+                match = TOPIC_POSTS_RE.match(url.path)
+                if match and int(match.group(1)) in stub.by_id:
+                    after = int(parse_qs(url.query).get('post_number', ['0'])[0])
+                    return self.send_json(200, stub.topic_posts(int(match.group(1)), after))
+                self.send_json(404, {'errors': ['not found']})
+
+        return Handler
+
+    def category_page(self, page: int) -> Dict[str, Any]:
+        with self._lock:
+            listed = sorted(self.topics, key=lambda topic: topic['posts'][-1]['created_at'], reverse=True)
+        topics = listed[page * TOPICS_PER_PAGE:(page + 1) * TOPICS_PER_PAGE]
+        return {'topic_list': {'topics': [topic_summary(topic) for topic in topics]}}
+
+    def topic_posts(self, topic_id: int, after_post_number: int) -> Dict[str, Any]:
+        posts = [post for post in self.by_id[topic_id]['posts'] if post['post_number'] > after_post_number]
+        return {'post_stream': {'posts': posts[:POSTS_PER_TOPIC_PAGE]}}
+
+    def add_posts(self, topic_id: int, count: int):
+        """Reply to a topic, bumping it to the top of the category"""
+        with self._lock:
+            topic = self.by_id[topic_id]
+            last = topic['posts'][-1]
+            posted = max(datetime.strptime(last['created_at'], DATE_FORMAT), datetime(2025, 4, 14, 12, 0))
+            for offset in range(1, count + 1):
+                topic['posts'].append(make_post(self._rng, last['id'] + offset, last['post_number'] + offset,
+                                                posted + timedelta(minutes=offset)))
+
+    def edit_post(self, topic_id: int, post_number: int, cooked: str):
+        """Edit a post in place: new cooked HTML and updated_at, listing metadata unchanged"""
+        with self._lock:
+            post = next(post for post in self.by_id[topic_id]['posts'] if post['post_number'] == post_number)
+            edited = datetime.strptime(post['updated_at'], DATE_FORMAT) + timedelta(days=1)
+            post.update(cooked=cooked, updated_at=edited.strftime(DATE_FORMAT))
+
+    def delete_post(self, topic_id: int, post_number: int):
+        with self._lock:
+            topic = self.by_id[topic_id]
+            topic['posts'] = [post for post in topic['posts'] if post['post_number'] != post_number]
+
+    def add_topic(self, num_posts: int = 3) -> int:
+        with self._lock:
+            topic_id = max(self.by_id) + 1
+            created = datetime(2025, 4, 14, 13, 0) + timedelta(seconds=len(self.topics))
+            topic = {'id': topic_id, 'title': f"New question {topic_id}", 'created_at': created.strftime(DATE_FORMAT),
+                     'posts': [make_post(self._rng, 900000 + topic_id * 100 + number, number,
+                                         created + timedelta(minutes=number)) for number in range(1, num_posts + 1)]}
+            self.topics.append(topic)
+            self.by_id[topic_id] = topic
+        return topic_id
+
+    def topic(self, topic_id: int) -> Dict[str, Any]:
+        topic = self.by_id[topic_id]
+        return {
+            **topic_summary(topic),
+            'post_stream': {
+                'posts': topic['posts'][:POSTS_PER_TOPIC_PAGE],
+                'stream': [post['id'] for post in topic['posts']],
+            },
+        }
+
+    def __enter__(self) -> 'StubDiscourse':
+        self._server = QuietHTTPServer(('127.0.0.1', 0), self.handler())
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,111 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API, used by the
+LLM synthesis benchmark.
+
+POST /v1/chat/completions answers after a configurable latency (plus
+uniform jitter) with a deterministic completion that quotes the start of
+the first context passage; fail_every turns every n-th request into a 500.
+Counts requests, TCP connections and the peak number of requests in
+flight, so connection reuse and the client's concurrency cap are visible.
+"""
+import json
+import random
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+
+from benchmarks.discourse_stub import QuietHTTPServer
+
+
+def stub_completion(messages: List[Dict[str, str]]) -> str:
+    """The canned answer: the opening words of the first passage in the prompt"""
+    prompt = messages[-1]['content'] if messages else ''
+    lines = prompt.split('\n')
+    passage = lines[2] if len(lines) > 2 and lines[0] == 'Context:' else ''
+    return f"From the course material: {' '.join(passage.split()[:25])}"
+
+
+class StubChatCompletions:
+    """Threaded stub server; use as a context manager, base_url (ending in /v1) is set while running"""
+
+    def __init__(self, latency: float = 0.3, jitter: float = 0.0, fail_every: int = 0, seed: int = 1):
+        self.latency = latency
+        self.jitter = jitter
+        self.fail_every = fail_every
+        self._rng = random.Random(seed)
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._server: Optional[QuietHTTPServer] = None
+        self.base_url = ''
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = self.connections = self.peak_in_flight = 0
+
+    def handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                with stub._lock:
+                    stub.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, status: int, body: Any):
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                with stub._lock:
+                    stub.requests += 1
+                    count = stub.requests
+                    stub.in_flight += 1
+                    stub.peak_in_flight = max(stub.peak_in_flight, stub.in_flight)
+                    delay = stub.latency + stub._rng.uniform(0, stub.jitter)
+                try:
+                    time.sleep(delay)
+                    if self.path.rstrip('/') != '/v1/chat/completions':
+                        return self.send_json(404, {'error': {'message': 'not found'}})
+                    if stub.fail_every and count % stub.fail_every == 0:
+                        return self.send_json(500, {'error': {'message': 'upstream error'}})
+                    self.send_json(200, {
+                        'id': f"chatcmpl-{count}",
+                        'object': 'chat.completion',
+                        'created': int(time.time()),
+                        'model': request.get('model', 'stub'),
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant',
+                                                 'content': stub_completion(request.get('messages', []))}}],
+                        'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                    })
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+
+        return Handler
+
+    def __enter__(self) -> 'StubChatCompletions':
+        self._server = QuietHTTPServer(('127.0.0.1', 0), self.handler())
+        self.base_url = f"http://127.0.0.1:{self._server.server_address[1]}/v1"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
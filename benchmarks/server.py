@@ -0,0 +1,47 @@
+"""
+Run the API in a uvicorn subprocess for the HTTP benchmarks.
+"""
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, List
+
+import requests
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def running_server(env: Optional[Dict[str, str]] = None, workers: int = 1, extra_args: Optional[List[str]] = None,
+                   timeout: float = 60.0, cwd: Optional[str] = None):
+    """Start `uvicorn app:app` (in cwd, e.g. a scraped_data_workdir), wait for /health, yield the base URL and process"""
+    port = free_port()
+    command = [sys.executable, '-m', 'uvicorn', 'app:app', '--host', '127.0.0.1', '--port', str(port),
+               '--log-level', 'warning', '--workers', str(workers)] + (extra_args or [])
+    process = subprocess.Popen(command, env={**os.environ, **(env or {})}, cwd=cwd)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                if requests.get(f"{base_url}/health", timeout=1).status_code == 200:
+                    break
+            except requests.RequestException:
+                pass
+            if process.poll() is not None or time.monotonic() > deadline:
+                raise RuntimeError(f"server did not start (exit code {process.poll()})")
+            time.sleep(0.1)
+        yield base_url, process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
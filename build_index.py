@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Offline index builder for the TDS Virtual TA knowledge base
+
+Usage:
+    python build_index.py embeddings [--backend hashing|openai] [--quantize] [--ivf-lists N]
+    python build_index.py kb [--output scraped_data/knowledge_base.bin]
+    python build_index.py ingest [--lectures tds_lectures_content.csv] [--discourse tds_discourse_posts.csv]
+"""
+import argparse
+import time
+
+from services.answer_generator import AnswerGenerator, knowledge_base_sources
+from services.embeddings import EmbeddingIndex, DEFAULT_INDEX_DIR, create_embedder
+from services import ingest
+from services.kb_store import DEFAULT_KB_PATH, write_knowledge_base
+
+
+def build_embeddings(args):
+    """Embed every course section and topic summary and save the matrix"""
+    generator = AnswerGenerator(ranker='legacy')
+    embedder = create_embedder(args.backend)
+
+    started = time.perf_counter()
+    embedding_index = EmbeddingIndex.build(
+        generator.search_index, embedder, quantize=args.quantize, num_lists=args.ivf_lists
+    )
+    embedding_index.save(args.output)
+    elapsed = time.perf_counter() - started
+
+    print(f"Embedded {len(embedding_index)} documents with '{embedder.name}' "
+          f"({embedding_index.dim} dims, {embedding_index.quantization}) in {elapsed:.1f}s")
+    print(f"Saved to {args.output}")
+
+
+def build_kb(args):
+    """Compile the JSON corpora into the memory-mapped binary knowledge base"""
+    generator = AnswerGenerator(ranker='legacy', kb_path='')
+
+    started = time.perf_counter()
+    # The loaders read the JSON without building the generator's own search index
+    summary = write_knowledge_base(
+        generator.load_enhanced_course_content(), generator.load_enhanced_discourse_posts(), args.output,
+        sources=knowledge_base_sources()
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"Compiled {summary['documents']} documents, {summary['terms']} terms and "
+          f"{summary['strings']} strings ({summary['bytes'] / 1024:.0f} KB) in {elapsed:.1f}s")
+    print(f"Saved to {args.output}")
+
+
+def build_ingest(args):
+    """Stream the scraper CSVs into the enhanced JSON corpora and the compiled knowledge base"""
+    started = time.perf_counter()
+    summary = ingest.ingest(
+        args.lectures, args.discourse, output_dir=args.output_dir, kb_path=None if args.no_kb else args.kb_output,
+        shard_documents=args.shard_documents, chunk_chars=args.chunk_chars, keep_shards=args.keep_shards
+    )
+    elapsed = time.perf_counter() - started
+
+    print(f"Ingested {summary['course_content']} course sections and {summary['discourse_topics']} topics "
+          f"({summary['posts']} posts) in {elapsed:.1f}s")
+    print(f"Saved to {', '.join(summary['outputs'])}")
+    if 'knowledge_base' in summary:
+        kb = summary['knowledge_base']
+        print(f"Compiled {kb['documents']} documents from {kb['shards']} shards "
+              f"({kb['bytes'] / 1024:.0f} KB) to {kb['path']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build offline indexes for the TDS Virtual TA")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    embeddings = subparsers.add_parser('embeddings', help='build the document embedding index')
+    embeddings.add_argument('--backend', default=None, help='embedding backend (default: EMBEDDING_BACKEND or hashing)')
+    embeddings.add_argument('--quantize', action='store_true', help='store vectors as int8 with per-row scales')
+    embeddings.add_argument('--ivf-lists', type=int, default=None, help='number of IVF lists (default: sqrt(N))')
+    embeddings.add_argument('--output', default=DEFAULT_INDEX_DIR)
+    embeddings.set_defaults(handler=build_embeddings)
+
+    kb = subparsers.add_parser('kb', help='compile the knowledge base into a memory-mapped binary file')
+    kb.add_argument('--output', default=DEFAULT_KB_PATH)
+    kb.set_defaults(handler=build_kb)
+
+    pipeline = subparsers.add_parser('ingest', help='build the knowledge base from the scraper CSVs')
+    pipeline.add_argument('--lectures', default=ingest.LECTURES_CSV)
+    pipeline.add_argument('--discourse', default=ingest.DISCOURSE_CSV)
+    pipeline.add_argument('--output-dir', default=ingest.OUTPUT_DIR, help='where the enhanced_*.json files go')
+    pipeline.add_argument('--kb-output', default=DEFAULT_KB_PATH)
+    pipeline.add_argument('--no-kb', action='store_true', help='only write the JSON corpora')
+    pipeline.add_argument('--shard-documents', type=int, default=ingest.SHARD_DOCUMENTS,
+                          help='documents per compiled shard (bounds memory)')
+    pipeline.add_argument('--chunk-chars', type=int, default=ingest.CHUNK_CHARS,
+                          help='longest course-content section, in characters')
+    pipeline.add_argument('--keep-shards', action='store_true', help='keep the shard files next to the output')
+    pipeline.set_defaults(handler=build_ingest)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,18 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import Optional, Literal
+from pydantic import BaseModel, Field
+
+
+class SearchOptions(BaseModel):
+    top_k: Optional[int] = Field(None, ge=1, le=20)  # documents used to build the answer
+    fusion: Optional[Literal['rrf', 'weighted']] = None  # hybrid ranker only
+    lexical_weight: Optional[float] = Field(None, ge=0)
+    semantic_weight: Optional[float] = Field(None, ge=0)
 
 
 class QuestionRequest(BaseModel):
     question: str
     image: Optional[str] = None  # base64 encoded image
+    search: Optional[SearchOptions] = None
 
 
 class LinkResponse(BaseModel):
@@ -14,4 +22,4 @@ class LinkResponse(BaseModel):
 
 class AnswerResponse(BaseModel):
     answer: str
-    links: list[LinkResponse]
\ No newline at end of file
+    links: list[LinkResponse]
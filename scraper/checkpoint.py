@@ -0,0 +1,103 @@
+"""
+Per-topic scrape checkpoints for incremental Discourse runs.
+
+The checkpoint records, for every topic written to the CSV, the listing
+metadata it was scraped at (last_posted_at, posts_count, highest post
+number and id) and the updated_at of each post written, plus the ETag and topics of each category page so an
+unchanged page can be answered with 304 Not Modified. It is saved
+atomically while a run progresses, so an interrupted run resumes where it
+stopped.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+CHECKPOINT_VERSION = 1
+
+# Listing fields that change whenever a topic gains or loses posts
+TOPIC_STATE_FIELDS = ('last_posted_at', 'posts_count', 'highest_post_number')
+
+
+def default_checkpoint_path(output: str) -> str:
+    return f"{os.path.splitext(output)[0]}.checkpoint.json"
+
+
+class ScrapeCheckpoint:
+    def __init__(self, path: str):
+        self.path = path
+        self.topics: Dict[str, Dict[str, Any]] = {}
+        self.pages: Dict[str, Dict[str, Any]] = {}
+        # Requests, bytes and seconds of the last full scrape, the baseline savings are reported against
+        self.last_full_run: Optional[Dict[str, Any]] = None
+        self._unsaved = 0
+
+    @classmethod
+    def load(cls, path: str) -> 'ScrapeCheckpoint':
+        """The checkpoint at path, or an empty one if it is missing or from another version"""
+        checkpoint = cls(path)
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return checkpoint
+        if data.get('version') == CHECKPOINT_VERSION:
+            checkpoint.topics = data.get('topics', {})
+            checkpoint.pages = data.get('pages', {})
+            checkpoint.last_full_run = data.get('last_full_run')
+        return checkpoint
+
+    def save(self):
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': CHECKPOINT_VERSION, 'topics': self.topics, 'pages': self.pages,
+                       'last_full_run': self.last_full_run}, f)
+        os.replace(temporary_path, self.path)
+        self._unsaved = 0
+
+    def save_every(self, count: int):
+        """Save after every ``count`` recorded topics"""
+        self._unsaved += 1
+        if self._unsaved >= count:
+            self.save()
+
+    def reset(self):
+        """Forget every topic and page (a full scrape rewrites the CSV)"""
+        self.topics = {}
+        self.pages = {}
+
+    def plan(self, topic: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        """
+        What to fetch for a listed topic: None when it is unchanged since the
+        checkpoint, else (after_post_number, highest_post_id). Topics that only
+        gained posts continue after the last post already scraped; anything
+        else (new topic, deleted or moved posts) is fetched from the start.
+        """
+        state = self.topics.get(str(topic['id']))
+        if state is None:
+            return 0, 0
+        if all(state.get(field) == topic.get(field) for field in TOPIC_STATE_FIELDS):
+            return None
+        if (state.get('highest_post_number') is not None and state.get('posts_count') is not None
+                and topic.get('highest_post_number', 0) > state['highest_post_number']
+                and topic.get('posts_count', 0) >= state['posts_count']):
+            return state['highest_post_number'], state.get('highest_post_id', 0)
+        return 0, state.get('highest_post_id', 0)
+
+    def post_versions(self, topic: Dict[str, Any]) -> Dict[str, Any]:
+        """Post id -> updated_at of the topic's posts as last written"""
+        return self.topics.get(str(topic['id']), {}).get('post_versions', {})
+
+    def record_topic(self, topic: Dict[str, Any], posts: List[Dict[str, Any]], highest_post_id: int = 0):
+        """Mark a topic scraped as listed; ``posts`` are the ones fetched this run"""
+        state = {field: topic.get(field) for field in TOPIC_STATE_FIELDS}
+        state['highest_post_id'] = max([highest_post_id] + [post['id'] for post in posts])
+        state['post_versions'] = {**self.post_versions(topic),
+                                  **{str(post['id']): post.get('updated_at') for post in posts}}
+        self.topics[str(topic['id'])] = state
+
+    def page(self, page: int) -> Optional[Dict[str, Any]]:
+        return self.pages.get(str(page))
+
+    def record_page(self, page: int, etag: Optional[str], topics: List[Dict[str, Any]]):
+        if etag:
+            self.pages[str(page)] = {'etag': etag, 'topics': topics}
@@ -0,0 +1,378 @@
+"""
+Asynchronous Discourse scraper.
+
+Topics are listed from the category JSON API and their posts fetched
+concurrently over one pooled HTTP/1.1 client. Requests are paced by a
+token bucket instead of fixed sleeps, and 429/5xx responses and connection
+errors are retried with exponential backoff (honouring Retry-After). Rows
+are written to the CSV as each topic completes.
+
+With --incremental, only topics whose listing metadata changed since the
+checkpoint (see scraper/checkpoint.py) are fetched, topics that only gained
+posts are fetched from the first new post number, unchanged category
+pages come back as 304 Not Modified, and new rows are appended to the CSV.
+A refetched post whose updated_at differs from the version last written
+is appended again; readers keep the last row of each post id.
+
+Usage (from the repository root):
+    python -m scraper.discourse [--output tds_discourse_posts.csv] [--concurrency 8] [--rate 4] [--incremental]
+"""
+import argparse
+import asyncio
+import csv
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+import httpx
+
+try:
+    from scraper.checkpoint import ScrapeCheckpoint, default_checkpoint_path
+    from scraper.html_text import HtmlCleaner, html_to_text
+except ImportError:  # imported by `python scraper/scraper.py`
+    from checkpoint import ScrapeCheckpoint, default_checkpoint_path
+    from html_text import HtmlCleaner, html_to_text
+
+
+BASE_URL = "https://discourse.onlinedegree.iitm.ac.in"
+CATEGORY_PATH = "/c/courses/tds-kb/34.json"
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"  # e.g. 2025-04-15T12:34:56.789Z
+
+START_DATE = datetime(2025, 1, 1)
+END_DATE = datetime(2025, 4, 14, 23, 59, 59)
+
+CSV_HEADER = ["Topic ID", "Topic Title", "Post ID", "Author", "Created At", "Content"]
+
+# Checkpoint saves during a run (every N topics written)
+CHECKPOINT_EVERY = 25
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Async token bucket: ``rate`` requests per second on average, bursts of
+    up to ``capacity``. A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for a while (the server asked us to back off)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        if self.rate <= 0 and not self._paused_until:
+            return
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    return
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Retry-After in seconds (only the delta-seconds form is used)"""
+    value = response.headers.get('Retry-After')
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class DiscourseClient:
+    """
+    Pooled, rate-limited JSON client for one Discourse site.
+
+    At most ``concurrency`` requests are in flight (and as many keep-alive
+    connections are reused); ``rate`` caps requests per second across them.
+    """
+
+    def __init__(self, base_url: str = BASE_URL, concurrency: int = 8, rate: float = 4.0, max_retries: int = 5,
+                 backoff: float = 0.5, max_backoff: float = 30.0, timeout: float = 30.0,
+                 headers: Optional[Dict[str, str]] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.bucket = TokenBucket(rate)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url, headers=headers, timeout=timeout, transport=transport,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self.requests = 0
+        self.retries = 0
+        self.not_modified = 0
+        self.bytes_received = 0
+
+    async def __aenter__(self) -> 'DiscourseClient':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self._client.aclose()
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def get(self, path: str, params: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        """GET with retries; returns the final response (304 included; other non-2xx raise)"""
+        attempt = 0
+        while True:
+            await self.bucket.acquire()
+            retry_after = None
+            async with self._semaphore:
+                try:
+                    response = await self._client.get(path, params=params, headers=headers)
+                except httpx.TransportError:
+                    if attempt >= self.max_retries:
+                        raise
+                else:
+                    self.requests += 1
+                    self.bytes_received += len(response.content)
+                    if response.status_code == 304:
+                        # Conditional request: the cached copy is still current
+                        self.not_modified += 1
+                        return response
+                    if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                        response.raise_for_status()
+                        return response
+                    retry_after = retry_after_seconds(response)
+                    if response.status_code == 429:
+                        # Rate limits apply to the whole client, not just this request
+                        self.bucket.pause(retry_after if retry_after is not None else self.backoff_delay(attempt))
+            self.retries += 1
+            await asyncio.sleep(retry_after if retry_after is not None else self.backoff_delay(attempt))
+            attempt += 1
+
+    async def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return (await self.get(path, params=params)).json()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'requests': self.requests, 'retries': self.retries, 'not_modified': self.not_modified,
+                'bytes_received': self.bytes_received}
+
+
+def parse_date(value: str) -> datetime:
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+async def fetch_topics(client: DiscourseClient, start_date: datetime = START_DATE, end_date: datetime = END_DATE,
+                       category_path: str = CATEGORY_PATH,
+                       checkpoint: Optional[ScrapeCheckpoint] = None) -> List[Dict[str, Any]]:
+    """
+    Topics created in [start_date, end_date], paging the category newest first.
+    With a checkpoint, pages are requested conditionally on their last ETag.
+    """
+    topics = []
+    page = 0
+    while True:
+        cached = checkpoint.page(page) if checkpoint is not None else None
+        response = await client.get(category_path, params={'page': page},
+                                    headers={'If-None-Match': cached['etag']} if cached else None)
+        if response.status_code == 304:
+            current_topics = cached['topics']
+        else:
+            current_topics = response.json().get("topic_list", {}).get("topics", [])
+            if checkpoint is not None:
+                checkpoint.record_page(page, response.headers.get('ETag'), current_topics)
+        if not current_topics:
+            return topics
+        for topic in current_topics:
+            created_at = parse_date(topic["created_at"])
+            if created_at < start_date:
+                # Older than start date — stop fetching more pages
+                return topics
+            if created_at <= end_date:
+                topics.append(topic)
+        page += 1
+
+
+async def fetch_posts_for_topic(client: DiscourseClient, topic_id: int, after_post_number: int = 0,
+                                highest_post_number: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Posts numbered above after_post_number. The topic JSON carries only the
+    first page of posts; the rest are read as post-number ranges from
+    /t/{id}/posts.json until highest_post_number (or an empty page).
+    """
+    posts: List[Dict[str, Any]] = []
+    last = after_post_number
+    if after_post_number == 0:
+        stream = (await client.get_json(f"/t/{topic_id}.json")).get("post_stream", {})
+        posts = stream.get("posts", [])
+        if len(posts) >= len(stream.get("stream", posts)):
+            return posts
+        last = max(post["post_number"] for post in posts)
+    while highest_post_number is None or last < highest_post_number:
+        data = await client.get_json(f"/t/{topic_id}/posts.json", params={'post_number': last, 'asc': 'true'})
+        new_posts = [post for post in data.get("post_stream", {}).get("posts", []) if post["post_number"] > last]
+        if not new_posts:
+            break
+        posts.extend(new_posts)
+        last = max(post["post_number"] for post in new_posts)
+    return posts
+
+
+def written_post_ids(path: str) -> Set[str]:
+    """Post ids already in the CSV, so a resumed run never writes a post twice"""
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return {row[2] for row in reader if len(row) > 2}
+    except OSError:
+        return set()
+
+
+def post_rows(topic: Dict[str, Any], posts: List[Dict[str, Any]], texts: Optional[List[str]] = None) -> List[List[Any]]:
+    """CSV rows for a topic's posts; texts are the posts' cooked HTML reduced to text (converted here if None)"""
+    if texts is None:
+        texts = [html_to_text(post["cooked"]) for post in posts]
+    return [[topic["id"], topic["title"], post["id"], post["username"], post["created_at"], text_content]
+            for post, text_content in zip(posts, texts)]
+
+
+async def scrape_discourse_posts_async(output: str = "tds_discourse_posts.csv", base_url: str = BASE_URL,
+                                       category_path: str = CATEGORY_PATH, start_date: datetime = START_DATE,
+                                       end_date: datetime = END_DATE, concurrency: int = 8, rate: float = 4.0,
+                                       incremental: bool = False, checkpoint_path: Optional[str] = None,
+                                       transport: Optional[httpx.AsyncBaseTransport] = None,
+                                       parse_workers: Optional[int] = None,
+                                       html_parser: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Scrape topics in the date range into ``output``. Topics are written in
+    completion order as they arrive; a topic that still fails after the
+    retries is reported, skipped and retried by the next incremental run.
+
+    A full run rewrites the CSV and the checkpoint. An incremental run fetches
+    only what changed since the checkpoint and appends to the CSV; it also
+    resumes an interrupted run of either kind. Cooked HTML is converted to
+    text by ``parse_workers`` processes (see scraper/html_text.py) while the
+    loop keeps fetching. Returns run statistics.
+    """
+    started = time.perf_counter()
+    checkpoint = ScrapeCheckpoint.load(checkpoint_path or default_checkpoint_path(output))
+    if not incremental:
+        checkpoint.reset()
+    seen_post_ids = written_post_ids(output) if incremental else set()
+    append = incremental and os.path.exists(output) and os.path.getsize(output) > 0
+
+    with HtmlCleaner(parse_workers, html_parser) as cleaner:
+        async with DiscourseClient(base_url, concurrency=concurrency, rate=rate, transport=transport) as client:
+            topics = await fetch_topics(client, start_date, end_date, category_path, checkpoint)
+            print(f"Found {len(topics)} topics in date range.")
+
+            queue: asyncio.Queue = asyncio.Queue()
+            for topic in topics:
+                queue.put_nowait(topic)
+            written = {'topics_listed': len(topics), 'topics': 0, 'unchanged': 0, 'posts': 0, 'failed': 0}
+
+            with open(output, "a" if append else "w", encoding="utf-8", newline="") as csvfile:
+                writer = csv.writer(csvfile)
+                if not append:
+                    writer.writerow(CSV_HEADER)
+
+                async def worker():
+                    while True:
+                        try:
+                            topic = queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            return
+                        plan = checkpoint.plan(topic) if incremental else (0, 0)
+                        if plan is None:
+                            written['unchanged'] += 1
+                            continue
+                        after_post_number, highest_post_id = plan
+                        try:
+                            posts = await fetch_posts_for_topic(client, topic["id"], after_post_number,
+                                                                topic.get("highest_post_number"))
+                        except (httpx.HTTPError, ValueError) as e:
+                            written['failed'] += 1
+                            print(f"Failed to fetch topic {topic['id']}: {e}")
+                            continue
+                        versions = checkpoint.post_versions(topic)
+                        new_posts = [post for post in posts if str(post["id"]) not in seen_post_ids
+                                     or versions.get(str(post["id"]), post.get("updated_at")) != post.get("updated_at")]
+                        texts = await cleaner.convert_async([post["cooked"] for post in new_posts])
+                        writer.writerows(post_rows(topic, new_posts, texts))
+                        csvfile.flush()
+                        seen_post_ids.update(str(post["id"]) for post in new_posts)
+                        checkpoint.record_topic(topic, posts, highest_post_id)
+                        checkpoint.save_every(CHECKPOINT_EVERY)
+                        written['topics'] += 1
+                        written['posts'] += len(new_posts)
+
+                await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+            summary = {**written, **client.stats(), 'seconds': round(time.perf_counter() - started, 3),
+                       'incremental': incremental}
+
+    if incremental and checkpoint.last_full_run:
+        baseline = checkpoint.last_full_run
+        summary['saved_bytes'] = baseline['bytes_received'] - summary['bytes_received']
+        summary['saved_seconds'] = round(baseline['seconds'] - summary['seconds'], 3)
+    elif not incremental and not summary['failed']:
+        checkpoint.last_full_run = {key: summary[key] for key in ('requests', 'bytes_received', 'seconds')}
+    checkpoint.save()
+
+    print(f"Discourse posts scraping complete! {summary['posts']} posts from {summary['topics']} topics "
+          f"saved to {output} in {summary['seconds']}s ({summary['requests']} requests, {summary['retries']} retries, "
+          f"{summary['failed']} failed topics)")
+    if incremental:
+        print(f"Incremental run: {summary['unchanged']} of {len(topics)} topics unchanged, "
+              f"{summary['not_modified']} pages not modified, {summary['bytes_received'] / 1024:.0f} KB received")
+        if 'saved_bytes' in summary:
+            baseline = checkpoint.last_full_run
+            print(f"Saved {summary['saved_bytes'] / 1024:.0f} KB "
+                  f"({100 * summary['saved_bytes'] / max(1, baseline['bytes_received']):.0f}%) and "
+                  f"{summary['saved_seconds']}s ({100 * summary['saved_seconds'] / max(1e-9, baseline['seconds']):.0f}%) "
+                  f"against the last full scrape")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default="tds_discourse_posts.csv")
+    parser.add_argument('--base-url', default=BASE_URL)
+    parser.add_argument('--concurrency', type=int, default=8, help='requests in flight')
+    parser.add_argument('--rate', type=float, default=4.0, help='requests per second (0 = unlimited)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='fetch only topics changed since the checkpoint and append to the CSV')
+    parser.add_argument('--checkpoint', default=None, help='checkpoint file (default: <output>.checkpoint.json)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='processes converting HTML to text (0 = inline; default: a pool only for html.parser)')
+    parser.add_argument('--html-parser', default=None,
+                        help='auto, selectolax, lxml or html.parser (default: HTML_PARSER or auto)')
+    args = parser.parse_args()
+    asyncio.run(scrape_discourse_posts_async(args.output, base_url=args.base_url, concurrency=args.concurrency,
+                                             rate=args.rate, incremental=args.incremental,
+                                             checkpoint_path=args.checkpoint, parse_workers=args.parse_workers,
+                                             html_parser=args.html_parser))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Parallel course-content scraper.
+
+Lecture pages are rendered in a pool of Playwright browser contexts, one
+page each, fed from a shared queue. Instead of networkidle plus fixed
+timeouts, each visit waits until the content element (article, main, ...)
+holds text. Images, fonts, media and analytics requests are aborted before
+they leave the browser. Rows are written to the CSV as pages complete.
+
+Usage (from the repository root):
+    python -m scraper.lectures [--dashboard-url https://tds.s-anand.net/#/2025-01] [--contexts 4]
+"""
+import argparse
+import asyncio
+import csv
+import re
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from playwright.async_api import async_playwright, Page, Route, TimeoutError as PlaywrightTimeoutError
+
+
+DASHBOARD_URL = "https://tds.s-anand.net/#/2025-01"
+SITE_URL = "https://tds.s-anand.net"
+
+CSV_HEADER = ["Lecture Title", "Content"]
+
+# Where lecture text lives, in order of preference
+CONTENT_SELECTORS = ("article", "main", "div.course-content", "section.lecture-body")
+
+# Requests that never affect the text content
+BLOCKED_RESOURCE_TYPES = {"image", "font", "media"}
+BLOCKED_URL_RE = re.compile(
+    r'google-analytics\.com|googletagmanager\.com|doubleclick\.net|plausible\.io|/gtag/js|/analytics[./?]'
+)
+
+# True once the first content selector present on the page has rendered some text
+CONTENT_READY_JS = """
+selectors => {
+    for (const selector of selectors) {
+        const element = document.querySelector(selector);
+        if (element) return element.innerText.trim().length > 0;
+    }
+    return false;
+}
+"""
+
+CONTENT_TEXT_JS = """
+selectors => {
+    for (const selector of selectors) {
+        const element = document.querySelector(selector);
+        if (element) return element.innerText.trim();
+    }
+    return "";
+}
+"""
+
+
+def lecture_links(links: List[Tuple[Optional[str], str]], site_url: str = SITE_URL) -> List[Tuple[str, str]]:
+    """(title, absolute url) of the lecture-like links among (href, text) pairs, first occurrence kept"""
+    lecture_links = []
+    seen_urls = set()
+    for href, text in links:
+        text = text.strip()
+        if href and text:
+            if href.startswith('#'):
+                continue
+            if any(k in href.lower() for k in ['lecture', 'unit', 'topic', 'lesson']) or href.startswith('/'):
+                full_url = href if href.startswith('http') else site_url + href
+                if full_url not in seen_urls:
+                    lecture_links.append((text, full_url))
+                    seen_urls.add(full_url)
+    return lecture_links
+
+
+class ResourceBlocker:
+    """Route handler aborting images, fonts, media and analytics; counts what it blocked"""
+
+    def __init__(self):
+        self.blocked = 0
+        self.allowed = 0
+
+    async def __call__(self, route: Route):
+        request = route.request
+        if request.resource_type in BLOCKED_RESOURCE_TYPES or BLOCKED_URL_RE.search(request.url):
+            self.blocked += 1
+            await route.abort()
+        else:
+            self.allowed += 1
+            await route.continue_()
+
+
+async def page_content(page: Page, url: str, timeout_ms: float) -> str:
+    """Open url and return the content text as soon as it has rendered"""
+    await page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+    try:
+        await page.wait_for_function(CONTENT_READY_JS, arg=list(CONTENT_SELECTORS), timeout=timeout_ms)
+    except PlaywrightTimeoutError:
+        # No content appeared in time; keep whatever the page has (possibly nothing)
+        pass
+    return await page.evaluate(CONTENT_TEXT_JS, list(CONTENT_SELECTORS))
+
+
+async def scrape_lectures_async(output: str = "tds_lectures_content.csv", dashboard_url: str = DASHBOARD_URL,
+                                site_url: str = SITE_URL, contexts: int = 4, timeout: float = 15.0,
+                                block_resources: bool = True) -> Dict[str, Any]:
+    """
+    Find the lecture links on the dashboard and scrape them with a pool of
+    ``contexts`` browser contexts. Returns run statistics.
+    """
+    started = time.perf_counter()
+    timeout_ms = timeout * 1000
+    blocker = ResourceBlocker()
+    written = {'lectures': 0, 'failed': 0, 'empty': 0}
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True)
+        try:
+            pool = []
+            for _ in range(max(1, contexts)):
+                context = await browser.new_context()
+                if block_resources:
+                    await context.route("**/*", blocker)
+                pool.append(await context.new_page())
+
+            print(f"Opening dashboard: {dashboard_url}")
+            dashboard = pool[0]
+            await dashboard.goto(dashboard_url, wait_until="domcontentloaded", timeout=timeout_ms)
+            try:
+                await dashboard.wait_for_selector("a[href]", timeout=timeout_ms)
+            except PlaywrightTimeoutError:
+                pass
+            anchors = await dashboard.eval_on_selector_all(
+                "a", "anchors => anchors.map(a => [a.getAttribute('href'), a.innerText])")
+            links = lecture_links([(href, text or '') for href, text in anchors], site_url)
+            print(f"Found {len(links)} potential lecture links.")
+
+            queue: asyncio.Queue = asyncio.Queue()
+            for link in links:
+                queue.put_nowait(link)
+
+            with open(output, mode="w", encoding="utf-8", newline="") as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(CSV_HEADER)
+
+                async def worker(page: Page):
+                    while True:
+                        try:
+                            title, url = queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            return
+                        try:
+                            content_text = await page_content(page, url, timeout_ms)
+                        except Exception as e:
+                            written['failed'] += 1
+                            print(f"Failed to scrape {title}: {e}")
+                            continue
+                        writer.writerow([title, content_text])
+                        csvfile.flush()
+                        written['lectures'] += 1
+                        written['empty'] += not content_text
+
+                await asyncio.gather(*(worker(page) for page in pool))
+        finally:
+            await browser.close()
+
+    summary = {**written, 'blocked_requests': blocker.blocked, 'allowed_requests': blocker.allowed,
+               'seconds': round(time.perf_counter() - started, 3)}
+    print(f"Course content scraping complete! {summary['lectures']} lectures saved to {output} in "
+          f"{summary['seconds']}s ({summary['failed']} failed, {summary['empty']} without content, "
+          f"{summary['blocked_requests']} requests blocked)")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default="tds_lectures_content.csv")
+    parser.add_argument('--dashboard-url', default=DASHBOARD_URL)
+    parser.add_argument('--site-url', default=SITE_URL, help='prefix for relative lecture links')
+    parser.add_argument('--contexts', type=int, default=4, help='browser contexts scraping in parallel')
+    parser.add_argument('--timeout', type=float, default=15.0, help='seconds to wait for a page and its content')
+    parser.add_argument('--no-block', action='store_true', help='load images, fonts and analytics too')
+    args = parser.parse_args()
+    asyncio.run(scrape_lectures_async(args.output, args.dashboard_url, args.site_url, contexts=args.contexts,
+                                      timeout=args.timeout, block_resources=not args.no_block))
+
+
+if __name__ == '__main__':
+    main()
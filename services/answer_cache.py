@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Hashable
+
+import numpy as np
+
+
+def make_cache_key(normalized_question: str, image_key: str = '',
+                   search_options: Optional[Dict[str, Any]] = None) -> Tuple[Hashable, ...]:
+    """Cache key: normalized question, image content hash and any per-request search options"""
+    options = tuple(sorted(search_options.items())) if search_options else ()
+    return normalized_question, image_key, options
+
+
+class AnswerCache:
+    """
+    Bounded LRU cache with a time-to-live for generated answers.
+
+    Entries are evicted least-recently-used once max_entries is reached and
+    expire ttl_seconds after insertion. clear() is hooked to knowledge-base
+    reloads so stale answers are never served.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv('ANSWER_CACHE_SIZE', 1024))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('ANSWER_CACHE_TTL', 3600))
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Dict[str, Any]):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self, *_):
+        """Drop every entry; accepts and ignores reload-listener arguments"""
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
+
+
+# Function words dropped from question signatures so near-duplicates compare on content terms.
+# Words in answer rule conditions (data/rules.json: "use", "how to get s", ...) are kept,
+# since they can change the answer
+SIGNATURE_STOPWORDS = frozenset(
+    "a an the and or of in on are was be i we you my me can could should would do does did "
+    "when where which who why will with it this that using instead just so".split()
+)
+
+
+class SemanticAnswerCache:
+    """
+    Second cache tier for near-duplicate questions.
+
+    Each answered question is stored as an embedding of its content tokens in
+    a fixed-size matrix; a new question is served from the most similar entry
+    when cosine similarity reaches the threshold. Entries are partitioned by
+    question type, numeric tokens (so GA4 never answers GA5) and search
+    options, and a lookup never crosses partitions. Eviction is LRU by capacity.
+    """
+
+    def __init__(self, embedder=None, capacity: Optional[int] = None, threshold: Optional[float] = None,
+                 ttl_seconds: Optional[float] = None):
+        from services.embeddings import HashingEmbedder
+
+        self.embedder = embedder or HashingEmbedder()
+        self.capacity = capacity if capacity is not None else int(os.getenv('SEMANTIC_CACHE_SIZE', 512))
+        self.threshold = threshold if threshold is not None else float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.85))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(os.getenv('ANSWER_CACHE_TTL', 3600))
+
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((max(self.capacity, 0), self.embedder.dim), dtype=np.float32)
+        self._partitions = np.full(max(self.capacity, 0), -1, dtype=np.int64)
+        self._expires = np.zeros(max(self.capacity, 0), dtype=np.float64)
+        self._values: Dict[int, Dict[str, Any]] = {}
+        self._costs_ms: Dict[int, float] = {}
+        self._recency: 'OrderedDict[int, None]' = OrderedDict()
+        # Partition key -> id stored per slot; an id is dropped with the last slot using it
+        self._partition_ids: Dict[Hashable, int] = {}
+        self._partition_keys: Dict[int, Hashable] = {}
+        self._partition_slots: Dict[int, int] = {}
+        self._next_partition = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.capacity > 0
+
+    def _signature(self, processed_question, search_options: Optional[Dict[str, Any]]) -> Tuple[np.ndarray, Hashable]:
+        """Embedding and partition key of a question; computed outside the lock"""
+        content_tokens = [token for token in processed_question.tokens if token not in SIGNATURE_STOPWORDS]
+        numeric_tokens = frozenset(token for token in content_tokens if any(char.isdigit() for char in token))
+        partition_key = (processed_question.question_type, numeric_tokens,
+                         tuple(sorted(search_options.items())) if search_options else ())
+        vector = self.embedder.embed([' '.join(content_tokens)])[0]
+        return vector, partition_key
+
+    def _add_to_partition(self, partition_key: Hashable) -> int:
+        partition = self._partition_ids.get(partition_key)
+        if partition is None:
+            partition = self._partition_ids[partition_key] = self._next_partition
+            self._partition_keys[partition] = partition_key
+            self._partition_slots[partition] = 0
+            self._next_partition += 1
+        self._partition_slots[partition] += 1
+        return partition
+
+    def _remove_from_partition(self, partition: int):
+        self._partition_slots[partition] -= 1
+        if not self._partition_slots[partition]:
+            del self._partition_slots[partition]
+            del self._partition_ids[self._partition_keys.pop(partition)]
+
+    def get(self, processed_question, search_options: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Cached answer of the most similar question in the same partition, if similar enough"""
+        if not self.enabled or processed_question.has_image:
+            return None
+        vector, partition_key = self._signature(processed_question, search_options)
+        with self._lock:
+            partition = self._partition_ids.get(partition_key)
+            candidates = () if partition is None else np.flatnonzero(
+                (self._partitions == partition) & (self._expires > time.monotonic()))
+            if len(candidates):
+                similarities = self._vectors[candidates] @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    slot = int(candidates[best])
+                    self._recency.move_to_end(slot)
+                    self.hits += 1
+                    self.saved_ms += self._costs_ms[slot]
+                    return self._values[slot]
+            self.misses += 1
+            return None
+
+    def put(self, processed_question, value: Dict[str, Any], cost_ms: float = 0.0,
+            search_options: Optional[Dict[str, Any]] = None):
+        """Store an answer together with the retrieval/generation time it took"""
+        if not self.enabled or processed_question.has_image:
+            return
+        vector, partition_key = self._signature(processed_question, search_options)
+        with self._lock:
+            if len(self._recency) < self.capacity:
+                # Slots fill up in order and are only released all at once by clear()
+                slot = len(self._recency)
+            else:
+                slot, _ = self._recency.popitem(last=False)
+                self._remove_from_partition(int(self._partitions[slot]))
+                self.evictions += 1
+            self._vectors[slot] = vector
+            self._partitions[slot] = self._add_to_partition(partition_key)
+            self._expires[slot] = time.monotonic() + self.ttl_seconds
+            self._values[slot] = value
+            self._costs_ms[slot] = cost_ms
+            self._recency[slot] = None
+            self._recency.move_to_end(slot)
+
+    def clear(self, *_):
+        """Drop every entry; accepts and ignores reload-listener arguments"""
+        with self._lock:
+            self._partitions[:] = -1
+            self._values.clear()
+            self._costs_ms.clear()
+            self._recency.clear()
+            self._partition_ids.clear()
+            self._partition_keys.clear()
+            self._partition_slots.clear()
+            self.invalidations += 1
+
+    def __len__(self) -> int:
+        return len(self._recency)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._recency),
+                'capacity': self.capacity,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'saved_retrieval_ms': round(self.saved_ms, 3),
+            }
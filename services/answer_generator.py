@@ -1,16 +1,94 @@
 import json
 import os
-from typing import List, Dict, Any, Optional
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import List, Dict, Any, Optional, FrozenSet, Callable
 import re
 from datetime import datetime
 
+from services.search_index import SearchIndex, answer_text
+from services.kb_store import DEFAULT_KB_PATH, KnowledgeBaseFile, compile_lock, is_compiled_current
+from services.kb_manager import KnowledgeBaseSnapshot, file_signature
+from services.question_processor import ProcessedQuestion
+from services.ranking import create_ranker, HybridRanker, SemanticRanker
+from services.segments import IndexSegment, LiveDiscoursePosts, SegmentedIndex, leaf_rankers, segmented_ranker
+from services.embeddings import EmbeddingIndex
+from services.timing import StageTimings
+from services.rule_engine import RuleEngine, load_rule_engine
+from services.snippets import best_passages, compose_snippet, query_weights, scored_sentences
+
+
+# Scraped corpora, falling back to the small shipped copies under data/
+COURSE_CONTENT_PATHS = (os.path.join('scraped_data', 'enhanced_course_content.json'),
+                        os.path.join('data', 'course_content.json'))
+DISCOURSE_POSTS_PATHS = (os.path.join('scraped_data', 'enhanced_discourse_posts.json'),
+                         os.path.join('data', 'discourse_posts.json'))
+
+# Contextual answers: the prefix plus quoted sentences, at most ANSWER_CHARS in all
+ANSWER_PREFIX = "Based on the TDS course materials and discussions: "
+ANSWER_CHARS = 500
+
+
+def first_existing(paths) -> Optional[str]:
+    return next((path for path in paths if os.path.exists(path)), None)
+
+
+def knowledge_base_sources() -> List[str]:
+    """JSON files the course content and discourse corpora are loaded from"""
+    return [path for path in (first_existing(COURSE_CONTENT_PATHS), first_existing(DISCOURSE_POSTS_PATHS)) if path]
+
+
+def publish_knowledge_base(kb_path: str = DEFAULT_KB_PATH) -> bool:
+    """
+    Make sure the compiled knowledge base at kb_path is current, compiling it
+    in a child process (`build_index.py kb`) when it is missing or stale.
+    Concurrent callers, e.g. the workers of `uvicorn --workers N`, serialise
+    on a lock file: the first compiles and the rest find it current, so every
+    process maps the same file instead of building its own index.
+    Returns True if this call compiled it.
+    """
+    with compile_lock(kb_path):
+        if is_compiled_current(kb_path, knowledge_base_sources()):
+            return False
+        build_index = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'build_index.py')
+        subprocess.run([sys.executable, build_index, 'kb', '--output', kb_path], check=True)
+        return True
+
 
 class AnswerGenerator:
-    def __init__(self):
-        # Load enhanced knowledge bases
-        self.enhanced_course_content = self.load_enhanced_course_content()
-        self.enhanced_discourse_posts = self.load_enhanced_discourse_posts()
-        self.comprehensive_knowledge = self.load_comprehensive_knowledge()
+    def __init__(self, ranker: Optional[str] = None, embedder: Any = None, vector_search: Optional[str] = None,
+                 top_k: int = 3, rule_engine: Optional[RuleEngine] = None, kb_path: Optional[str] = None,
+                 kb_shared: Optional[bool] = None):
+        # Phrase rules for predefined answers, compiled into one automaton
+        self.rule_engine = rule_engine or load_rule_engine()
+        
+        # Number of documents retrieved per question unless a request overrides it
+        self.top_k = top_k
+        # Ranking engine: 'legacy', 'bm25', 'bm25f', 'sparse', 'semantic' or 'hybrid' (defaults to SEARCH_RANKER env var).
+        # The semantic engine takes an embedder (backend name or texts -> vectors function)
+        # and a vector search mode ('exact' or 'ivf').
+        self._ranker_options = {'name': ranker, 'embedder': embedder, 'vector_search': vector_search}
+        
+        # Compiled knowledge base (build_index.py kb), used instead of the JSON files while it is current.
+        # Defaults to the KB_PATH env var; an empty string always loads the JSON files.
+        self.kb_path = kb_path if kb_path is not None else os.getenv('KB_PATH', DEFAULT_KB_PATH)
+        # Shared mode (KB_SHARED env var): compile the file when it is stale instead of loading JSON,
+        # so every worker process maps one copy of the knowledge base (see publish_knowledge_base)
+        self.kb_shared = kb_shared if kb_shared is not None else os.getenv('KB_SHARED', 'false').lower() == 'true'
+        
+        # Listeners (e.g. answer caches) are told the new version after every reload
+        self._reload_listeners: List[Callable[[int], None]] = []
+        
+        # The corpora and index load on first use (or via warm_up()), so constructing the
+        # generator is cheap and predefined answers never wait for the knowledge base.
+        # Reloads build a new immutable snapshot and swap it in whole.
+        self._kb_lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._snapshot: Optional[KnowledgeBaseSnapshot] = None
+        self._comprehensive_knowledge: Optional[Dict[str, Any]] = None
         
         # Enhanced predefined answers with real scraped data
         self.predefined_answers = {
@@ -126,6 +204,21 @@ class AnswerGenerator:
                     ]
                 }
             },
+            'schedule_info': {
+                'future_exam': {
+                    'answer': "I don't know the specific schedule for the TDS Sep 2025 end-term exam as this information is not available at this time. Please check the course announcements for updated information.",
+                    'links': [
+                        {
+                            'url': "https://tds.s-anand.net",
+                            'title': "TDS Course Schedule"
+                        },
+                        {
+                            'url': "https://discourse.onlinedegree.iitm.ac.in",
+                            'title': "TDS Announcements"
+                        }
+                    ]
+                }
+            },
             'grading_system': {
                 'bonus_scoring': {
                     'answer': "If a student scores 10/10 on GA4 as well as a bonus, it would appear as '110' on the dashboard, indicating 10 out of 10 plus the bonus point.",
@@ -139,37 +232,240 @@ class AnswerGenerator:
             }
         }
     
-    def load_enhanced_course_content(self) -> List[Dict[str, Any]]:
+    @property
+    def knowledge_base_loaded(self) -> bool:
+        return self._snapshot is not None
+    
+    @property
+    def current_snapshot(self) -> Optional[KnowledgeBaseSnapshot]:
+        """The snapshot requests are using now, without triggering a load"""
+        return self._snapshot
+    
+    @property
+    def kb_version(self) -> int:
+        return self._snapshot.version if self._snapshot is not None else 0
+    
+    def ensure_knowledge_base(self) -> KnowledgeBaseSnapshot:
+        """Load the knowledge base once; concurrent first callers wait for the same load"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._kb_lock:
+                if self._snapshot is None:
+                    self._snapshot = self.build_snapshot(version=0)
+                snapshot = self._snapshot
+        return snapshot
+    
+    def warm_up(self):
+        """Load the knowledge base ahead of the first search (e.g. from a background task)"""
+        self.ensure_knowledge_base()
+    
+    @property
+    def enhanced_course_content(self):
+        return self.ensure_knowledge_base().course_content
+    
+    @property
+    def enhanced_discourse_posts(self):
+        return self.ensure_knowledge_base().discourse_posts
+    
+    @property
+    def search_index(self) -> SearchIndex:
+        return self.ensure_knowledge_base().search_index
+    
+    @property
+    def ranker(self):
+        return self.ensure_knowledge_base().ranker
+    
+    @property
+    def kb_file(self) -> Optional[KnowledgeBaseFile]:
+        return self.ensure_knowledge_base().kb_file
+    
+    @property
+    def comprehensive_knowledge(self) -> Dict[str, Any]:
+        """Loaded separately on first access; answering never reads it"""
+        if self._comprehensive_knowledge is None:
+            self._comprehensive_knowledge = self.load_comprehensive_knowledge()
+        return self._comprehensive_knowledge
+    
+    def watched_paths(self) -> List[str]:
+        """Every file whose appearance or change alters what load_knowledge_base would read"""
+        paths = list(COURSE_CONTENT_PATHS) + list(DISCOURSE_POSTS_PATHS)
+        if self.kb_path:
+            paths.append(self.kb_path)
+        return paths
+    
+    def build_snapshot(self, version: int, strict: bool = False) -> KnowledgeBaseSnapshot:
+        """
+        Load the corpora from disk and build the search index and ranker over them.
+        With strict=True unreadable JSON raises instead of loading as empty.
+        """
+        started = time.perf_counter()
+        if self.kb_path and self.kb_shared:
+            # Before the signature is taken, so the watcher does not reload for the file compiled here
+            self.publish_compiled_knowledge_base()
+        # Taken before reading, so a file changing mid-build is seen as a change afterwards
+        sources = file_signature(self.watched_paths())
+        kb_file = self.open_compiled_knowledge_base()
+        if kb_file is not None:
+            # Memory-mapped: documents are decoded lazily and the index is read, not rebuilt
+            enhanced_course_content = kb_file.course_content
+            enhanced_discourse_posts = kb_file.discourse_posts
+            search_index = kb_file.search_index()
+        else:
+            enhanced_course_content = self.load_enhanced_course_content(strict)
+            enhanced_discourse_posts = self.load_enhanced_discourse_posts(strict)
+            search_index = SearchIndex(enhanced_course_content, enhanced_discourse_posts)
+        ranker = create_ranker(search_index, **self._ranker_options)
+        return KnowledgeBaseSnapshot(
+            version=version,
+            course_content=enhanced_course_content,
+            discourse_posts=enhanced_discourse_posts,
+            search_index=search_index,
+            ranker=ranker,
+            kb_file=kb_file,
+            sources=sources,
+            build_ms=(time.perf_counter() - started) * 1000,
+        )
+    
+    def publish_compiled_knowledge_base(self):
+        """Shared mode: compile the knowledge base file if it is missing or stale (see publish_knowledge_base)"""
+        try:
+            publish_knowledge_base(self.kb_path)
+        except Exception as e:
+            print(f"Error compiling shared knowledge base: {e}")
+    
+    def open_compiled_knowledge_base(self) -> Optional[KnowledgeBaseFile]:
+        """The compiled knowledge base, or None when it is missing, unreadable or older than the JSON files"""
+        if not self.kb_path or not os.path.exists(self.kb_path):
+            return None
+        try:
+            kb_file = KnowledgeBaseFile(self.kb_path)
+        except Exception as e:
+            print(f"Error loading compiled knowledge base: {e}")
+            return None
+        if not kb_file.is_current(knowledge_base_sources()):
+            print(f"Compiled knowledge base {self.kb_path} is stale; loading JSON (re-run `python build_index.py kb`)")
+            return None
+        return kb_file
+    
+    def reload(self, strict: bool = False) -> KnowledgeBaseSnapshot:
+        """
+        Rebuild the knowledge base (e.g. after re-running the scrapers), swap it in
+        and notify listeners. Requests already running keep the previous snapshot.
+        """
+        with self._reload_lock:
+            snapshot = self.build_snapshot(self.kb_version + 1, strict)
+            with self._kb_lock:
+                self._snapshot = snapshot
+                self._comprehensive_knowledge = None
+        self._notify_reload(snapshot)
+        return snapshot
+    
+    def _notify_reload(self, snapshot: KnowledgeBaseSnapshot):
+        for listener in list(self._reload_listeners):
+            listener(snapshot.version)
+    
+    def upsert_topics(self, topics: List[Dict[str, Any]]) -> KnowledgeBaseSnapshot:
+        """
+        Index new or re-scraped discourse topics without rebuilding the knowledge base.
+        A topic whose id is already indexed replaces the previous version.
+        """
+        topics = list(topics)
+        return self._update_segments(lambda segmented: segmented.upsert(topics, self._segment_rankers))
+    
+    def delete_topics(self, topic_ids: List[Any]) -> KnowledgeBaseSnapshot:
+        """Remove discourse topics by id; unknown ids are ignored"""
+        topic_ids = list(topic_ids)
+        return self._update_segments(lambda segmented: segmented.delete(topic_ids))
+    
+    def compaction_needed(self) -> Optional[str]:
+        """'full', 'deltas' or None for the current snapshot (see SegmentedIndex.compaction_needed)"""
+        snapshot = self._snapshot
+        if snapshot is None or not isinstance(snapshot.search_index, SegmentedIndex):
+            return None
+        return snapshot.search_index.compaction_needed()
+    
+    def compact(self, full: bool = True) -> KnowledgeBaseSnapshot:
+        """Merge index segments and drop deleted topics (see SegmentedIndex.compact)"""
+        return self._update_segments(lambda segmented: segmented.compact(self._segment_rankers, full))
+    
+    def _update_segments(self, update: Callable[[SegmentedIndex], SegmentedIndex]) -> KnowledgeBaseSnapshot:
+        """Apply a copy-on-write segment update and swap in the resulting snapshot"""
+        with self._reload_lock:
+            current = self.ensure_knowledge_base()
+            started = time.perf_counter()
+            if isinstance(current.search_index, SegmentedIndex):
+                segmented = current.search_index
+            else:
+                segmented = SegmentedIndex.from_index(current.search_index, current.ranker)
+            updated = update(segmented)
+            if updated is segmented:
+                return current
+            if len(updated.segments) == 1 and not updated.deleted:
+                # Fully compacted: serve the single segment directly again
+                search_index = updated.segments[0].index
+            else:
+                search_index = updated
+            snapshot = replace(
+                current,
+                version=current.version + 1,
+                discourse_posts=LiveDiscoursePosts(updated),
+                search_index=search_index,
+                ranker=segmented_ranker(updated, current.ranker),
+                build_ms=(time.perf_counter() - started) * 1000,
+                built_at=time.time(),
+            )
+            with self._kb_lock:
+                self._snapshot = snapshot
+        self._notify_reload(snapshot)
+        return snapshot
+    
+    def _segment_rankers(self, index: SearchIndex, embedding_index: Optional[EmbeddingIndex] = None) -> Dict[str, Any]:
+        """Leaf rankers for a new segment, configured like those of the current base segment"""
+        snapshot = self.ensure_knowledge_base()
+        base = snapshot.search_index.segments[0] if isinstance(snapshot.search_index, SegmentedIndex) \
+            else IndexSegment(snapshot.search_index, leaf_rankers(snapshot.ranker))
+        rankers = {}
+        for leaf, template in base.rankers.items():
+            if isinstance(template, SemanticRanker):
+                if embedding_index is None and template.embedding_index is not None:
+                    # Only the segment's own documents are embedded
+                    embedding_index = EmbeddingIndex.build(index, template.embedder)
+                rankers[leaf] = SemanticRanker(index, embedder=template.embedder, embedding_index=embedding_index,
+                                               vector_search=template.vector_search, nprobe=template.nprobe,
+                                               min_similarity=template.min_similarity)
+            else:
+                rankers[leaf] = type(template)(index)
+        return rankers
+    
+    def add_reload_listener(self, listener: Callable[[int], None]):
+        """Call listener(kb_version) after every knowledge-base reload"""
+        self._reload_listeners.append(listener)
+    
+    def load_enhanced_course_content(self, strict: bool = False) -> List[Dict[str, Any]]:
         """Load enhanced course content from scraped data"""
         try:
-            filepath = os.path.join('scraped_data', 'enhanced_course_content.json')
-            if os.path.exists(filepath):
+            # Falls back to the existing data structure under data/
+            filepath = first_existing(COURSE_CONTENT_PATHS)
+            if filepath:
                 with open(filepath, 'r', encoding='utf-8') as f:
                     return json.load(f)
-            else:
-                # Fallback to existing data structure
-                filepath = os.path.join('data', 'course_content.json')
-                if os.path.exists(filepath):
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        return json.load(f)
         except Exception as e:
+            if strict:
+                raise
             print(f"Error loading enhanced course content: {e}")
         return []
     
-    def load_enhanced_discourse_posts(self) -> List[Dict[str, Any]]:
+    def load_enhanced_discourse_posts(self, strict: bool = False) -> List[Dict[str, Any]]:
         """Load enhanced discourse posts from scraped data"""
         try:
-            filepath = os.path.join('scraped_data', 'enhanced_discourse_posts.json')
-            if os.path.exists(filepath):
+            # Falls back to the existing data structure under data/
+            filepath = first_existing(DISCOURSE_POSTS_PATHS)
+            if filepath:
                 with open(filepath, 'r', encoding='utf-8') as f:
                     return json.load(f)
-            else:
-                # Fallback to existing data structure
-                filepath = os.path.join('data', 'discourse_posts.json')
-                if os.path.exists(filepath):
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        return json.load(f)
         except Exception as e:
+            if strict:
+                raise
             print(f"Error loading enhanced discourse posts: {e}")
         return []
     
@@ -184,155 +480,111 @@ class AnswerGenerator:
             print(f"Error loading comprehensive knowledge: {e}")
         return {}
     
-    def generate_answer(self, processed_question: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate an answer using enhanced knowledge base"""
-        question_type = processed_question['question_type']
-        keywords = processed_question['keywords']
-        original_question = processed_question['original_question']
+    def generate_answer(self, processed_question: ProcessedQuestion, search_options: Optional[Dict[str, Any]] = None,
+                        timings: Optional[StageTimings] = None) -> Dict[str, Any]:
+        """
+        Generate an answer using enhanced knowledge base.
+
+        search_options may set 'top_k' and, for the hybrid engine, 'fusion',
+        'lexical_weight' and 'semantic_weight'. Per-stage timings in
+        milliseconds are returned under 'timings'.
+        """
+        timings = timings if timings is not None else StageTimings()
+        question_type = processed_question.question_type
+        keywords = processed_question.keywords
+        original_question = processed_question.original_question
         
         # Check predefined answers first
-        predefined_answer = self.get_predefined_answer(question_type, keywords, original_question)
+        with timings.measure('predefined'):
+            predefined_answer = self.get_predefined_answer(
+                question_type, keywords, original_question, processed_question.matched_phrases
+            )
         if predefined_answer:
-            return predefined_answer
+            return {**predefined_answer, 'timings': timings.as_dict()}
         
         # Search enhanced content
-        relevant_content = self.search_enhanced_content(processed_question)
+        with timings.measure('search'):
+            relevant_content = self.search_enhanced_content(processed_question, search_options, timings)
         
-        if relevant_content:
-            return self.generate_contextual_answer(processed_question, relevant_content)
-        else:
-            return self.generate_fallback_answer(processed_question)
+        with timings.measure('generate'):
+            if relevant_content:
+                answer_data = self.generate_contextual_answer(processed_question, relevant_content)
+            else:
+                answer_data = self.generate_fallback_answer(processed_question)
+        answer_data['timings'] = timings.as_dict()
+        return answer_data
     
-    def get_predefined_answer(self, question_type: str, keywords: List[str], question: str) -> Optional[Dict[str, Any]]:
-        """Enhanced predefined answer detection"""
-        question_lower = question.lower()
-        
-        # Course information
-        if any(phrase in question_lower for phrase in ['what is tds', 'about tds', 'tds course']):
-            return self.predefined_answers['course_info']['what_is_tds']
-        elif any(phrase in question_lower for phrase in ['tds full form', 'stands for', 'tds means']):
-            return self.predefined_answers['course_info']['tds_full_form']
-        elif any(phrase in question_lower for phrase in ['books', 'pdf', 'certified', 'reference']):
-            return self.predefined_answers['course_info']['course_books']
-        
-        # Grading and deadlines
-        elif any(phrase in question_lower for phrase in ['s grade', 'how to get s', 'grade s']):
-            return self.predefined_answers['grading_info']['s_grade']
-        elif any(phrase in question_lower for phrase in ['deadline', 'due date', 'project 01', 'project 1']):
-            return self.predefined_answers['grading_info']['project_deadline']
-        
-        # Technical issues
-        elif any(phrase in question_lower for phrase in ['score reset', 'score 0', 'resetting']):
-            return self.predefined_answers['technical_issues']['score_reset']
-        
-        # Project-related
-        elif any(phrase in question_lower for phrase in ['github email', 'iitm email', 'email github']):
-            return self.predefined_answers['projects']['github_email']
-        
-        # ROE exam
-        elif any(phrase in question_lower for phrase in ['roe', 'remote online exam', 'roe exam']):
-            return self.predefined_answers['roe_exam']['roe_info']
-        
-        # Model usage questions
-        elif any(phrase in question_lower for phrase in ['gpt-3.5-turbo-0125', 'gpt3.5', 'openai api']):
-            return self.predefined_answers['model_usage']['gpt-3.5-turbo-0125']
+    def get_predefined_answer(self, question_type: str, keywords: List[str], question: str,
+                              matched_phrases: Optional[FrozenSet[str]] = None) -> Optional[Dict[str, Any]]:
+        """Enhanced predefined answer detection (first matching rule in data/rules.json)"""
+        if matched_phrases is None:
+            matched_phrases = self.rule_engine.match(question.lower())
         
-        # Environment setup questions
-        elif any(phrase in question_lower for phrase in ['docker', 'podman']) and 'use' in question_lower:
-            return self.predefined_answers['environment_setup']['docker_vs_podman']
-        
-        # Grading system questions (bonus scoring)
-        elif any(phrase in question_lower for phrase in ['10/10', 'bonus', 'dashboard']) and any(word in question_lower for word in ['appear', 'show', 'display']):
-            return self.predefined_answers['grading_system']['bonus_scoring']
-        
-        # Future schedule questions
-        elif any(phrase in question_lower for phrase in ['sep 2025', 'end-term', 'future']) and 'exam' in question_lower:
-            return {
-                'answer': "I don't know the specific schedule for the TDS Sep 2025 end-term exam as this information is not available at this time. Please check the course announcements for updated information.",
-                'links': [
-                    {
-                        'url': "https://tds.s-anand.net",
-                        'title': "TDS Course Schedule"
-                    },
-                    {
-                        'url': "https://discourse.onlinedegree.iitm.ac.in",
-                        'title': "TDS Announcements"
-                    }
-                ]
-            }
-        
-        return None
+        intent = self.rule_engine.answer_intent(matched_phrases)
+        if intent is None:
+            return None
+        category, answer_key = intent.split('/', 1)
+        return self.predefined_answers[category][answer_key]
     
-    def search_enhanced_content(self, processed_question: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def search_enhanced_content(self, processed_question: ProcessedQuestion, search_options: Optional[Dict[str, Any]] = None,
+                                timings: Optional[StageTimings] = None) -> List[Dict[str, Any]]:
         """Search enhanced content sources"""
-        relevant_content = []
-        keywords = processed_question['keywords']
-        question_lower = processed_question['cleaned_question'].lower()
-        
-        # Search enhanced course content
-        for content in self.enhanced_course_content:
-            relevance_score = 0
-            
-            # Check keywords in content
-            content_text = (content.get('content', '') + ' ' + 
-                          ' '.join(content.get('keywords', []))).lower()
-            
-            for keyword in keywords:
-                if keyword.lower() in content_text:
-                    relevance_score += 2
-            
-            # Check question terms
-            question_terms = question_lower.split()
-            for term in question_terms:
-                if len(term) > 3 and term in content_text:
-                    relevance_score += 1
-            
-            if relevance_score > 0:
-                relevant_content.append({
-                    'type': 'course_content',
-                    'data': content,
-                    'relevance': relevance_score
-                })
+        search_options = search_options or {}
+        top_k = search_options.get('top_k') or self.top_k
+        snapshot = self.ensure_knowledge_base()
+        ranker = snapshot.ranker
         
-        # Search enhanced discourse posts
-        for post_topic in self.enhanced_discourse_posts:
-            relevance_score = 0
-            
-            # Check title and summary
-            title_text = post_topic.get('title', '').lower()
-            summary_text = post_topic.get('answer_summary', '').lower()
-            keywords_text = ' '.join(post_topic.get('keywords', [])).lower()
-            
-            search_text = f"{title_text} {summary_text} {keywords_text}"
-            
-            for keyword in keywords:
-                if keyword.lower() in search_text:
-                    relevance_score += 2
-            
-            for term in question_lower.split():
-                if len(term) > 3 and term in search_text:
-                    relevance_score += 1
-            
-            if relevance_score > 0:
-                relevant_content.append({
-                    'type': 'discourse',
-                    'data': post_topic,
-                    'relevance': relevance_score
-                })
+        if isinstance(ranker, HybridRanker):
+            ranked = ranker.rank(
+                processed_question, top_k,
+                fusion=search_options.get('fusion'),
+                lexical_weight=search_options.get('lexical_weight'),
+                semantic_weight=search_options.get('semantic_weight'),
+                timings=timings
+            )
+        else:
+            ranked = ranker.rank(processed_question, top_k)
         
-        # Sort by relevance
-        relevant_content.sort(key=lambda x: x['relevance'], reverse=True)
-        return relevant_content[:3]  # Top 3 most relevant
+        relevant_content = []
+        for doc_id, relevance_score in ranked:
+            document = snapshot.search_index.documents[doc_id]
+            # The document's best-matching passages and their sentences, for the answer
+            index, local_id = snapshot.search_index.locate(doc_id)
+            weights = query_weights(index, processed_question.tokens)
+            passages = best_passages(index, local_id, weights)
+            relevant_content.append({
+                'type': document['type'],
+                'data': document['data'],
+                'relevance': relevance_score,
+                'passages': passages,
+                'sentences': scored_sentences(answer_text(document), passages, weights)
+            })
+        return relevant_content
     
-    def generate_contextual_answer(self, processed_question: Dict[str, Any], relevant_content: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Generate answer from relevant content"""
+    def generate_contextual_answer(self, processed_question: ProcessedQuestion, relevant_content: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Generate answer from relevant content: the best-matching sentences of
+        the first two results that have answer text, within ANSWER_CHARS.
+        'context' holds the best passages of every result, for LLM synthesis.
+        """
         answer_parts = []
         links = []
+        context = []
+        
+        for content_item in relevant_content:
+            text = answer_text(content_item)
+            if text:
+                context.append({
+                    'title': content_item['data'].get('title', ''),
+                    'url': content_item['data'].get('url', ''),
+                    'text': ' '.join(text[start:end] for start, end in content_item['passages'])
+                })
         
         for content_item in relevant_content:
             if content_item['type'] == 'course_content':
                 course_data = content_item['data']
-                answer_parts.append(course_data.get('content', ''))
+                if course_data.get('content'):
+                    answer_parts.append((course_data['content'], content_item['sentences']))
                 links.append({
                     'url': course_data.get('url', ''),
                     'title': course_data.get('title', 'TDS Course Content')
@@ -341,24 +593,26 @@ class AnswerGenerator:
             elif content_item['type'] == 'discourse':
                 discourse_data = content_item['data']
                 if discourse_data.get('answer_summary'):
-                    answer_parts.append(discourse_data['answer_summary'])
+                    answer_parts.append((discourse_data['answer_summary'], content_item['sentences']))
                 links.append({
                     'url': discourse_data.get('url', ''),
                     'title': discourse_data.get('title', 'Discourse Discussion')
                 })
         
         # Combine answer
-        if answer_parts:
-            answer = "Based on the TDS course materials and discussions: " + " ".join(answer_parts[:2])
+        snippet = compose_snippet(answer_parts[:2], ANSWER_CHARS - len(ANSWER_PREFIX))
+        if snippet:
+            answer = ANSWER_PREFIX + snippet
         else:
             answer = "I found relevant discussions about your question. Please check the linked resources for detailed information."
         
         return {
-            'answer': answer[:500] + "..." if len(answer) > 500 else answer,
-            'links': links[:3]
+            'answer': answer,
+            'links': links,
+            'context': context
         }
     
-    def generate_fallback_answer(self, processed_question: Dict[str, Any]) -> Dict[str, Any]:
+    def generate_fallback_answer(self, processed_question: ProcessedQuestion) -> Dict[str, Any]:
         """Enhanced fallback with comprehensive knowledge"""
         return {
             'answer': "I don't have specific information about this question in my current knowledge base. Please check the official TDS course materials at https://tds.s-anand.net/ or ask on the Discourse forum for community assistance.",
@@ -0,0 +1,367 @@
+import hashlib
+import json
+import os
+import time
+import zlib
+from collections import Counter
+from typing import List, Dict, Any, Optional, Callable, Tuple, Union
+
+import numpy as np
+
+from services.search_index import SearchIndex, tokenize
+
+
+DEFAULT_INDEX_DIR = os.path.join('scraped_data', 'embeddings')
+
+# Rows scored per block when the matrix is int8 or memory-mapped
+SCORE_BLOCK_ROWS = 8192
+
+
+class Embedder:
+    """Turns a batch of texts into L2-normalised float32 vectors"""
+
+    name = 'base'
+    dim = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic local embedder using signed feature hashing of word tokens
+    and their character trigrams. Needs no network access, so it is the
+    default backend and the one to use in tests and benchmarks.
+    """
+
+    name = 'hashing'
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._token_features: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def _features(self, token: str) -> Tuple[np.ndarray, np.ndarray]:
+        cached = self._token_features.get(token)
+        if cached is not None:
+            return cached
+        padded = f"<{token}>"
+        features = [('w', token, 1.0)] + [('c', padded[i:i + 3], 0.5) for i in range(len(padded) - 2)]
+        indices = np.empty(len(features), dtype=np.int64)
+        weights = np.empty(len(features), dtype=np.float32)
+        for i, (kind, feature, weight) in enumerate(features):
+            digest = zlib.crc32(f"{kind}:{feature}".encode('utf-8'))
+            indices[i] = digest % self.dim
+            weights[i] = weight if (digest >> 31) & 1 else -weight
+        if len(self._token_features) > 100000:
+            self._token_features.clear()
+        self._token_features[token] = (indices, weights)
+        return indices, weights
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token, count in Counter(tokenize(text)).items():
+                indices, weights = self._features(token)
+                np.add.at(vectors[row], indices, weights * (1.0 + np.log(count)))
+        return normalize(vectors)
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings from the OpenAI API (used only at index-build time and once per query)"""
+
+    name = 'openai'
+
+    def __init__(self, model: str = 'text-embedding-3-small', batch_size: int = 256):
+        from openai import OpenAI
+
+        self.model = model
+        self.batch_size = batch_size
+        self.client = OpenAI()
+        self.dim = 1536 if model.endswith('small') or model.endswith('ada-002') else 3072
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        rows = []
+        for start in range(0, len(texts), self.batch_size):
+            batch = [text or ' ' for text in texts[start:start + self.batch_size]]
+            response = self.client.embeddings.create(model=self.model, input=batch)
+            rows.extend(item.embedding for item in response.data)
+        return normalize(np.asarray(rows, dtype=np.float32).reshape(len(texts), -1))
+
+
+class CallableEmbedder(Embedder):
+    """Adapts a plain ``texts -> vectors`` function, e.g. a deterministic test double"""
+
+    def __init__(self, function: Callable[[List[str]], Any], name: str = 'callable'):
+        self.function = function
+        self.name = name
+        self.dim = int(np.asarray(function(['dimension probe'])).shape[-1])
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        return normalize(np.asarray(self.function(texts), dtype=np.float32).reshape(len(texts), self.dim))
+
+
+EMBEDDERS = {
+    HashingEmbedder.name: HashingEmbedder,
+    OpenAIEmbedder.name: OpenAIEmbedder,
+}
+
+
+def create_embedder(embedder: Union[None, str, Embedder, Callable] = None) -> Embedder:
+    """
+    Resolve an embedder from an instance, a callable, a backend name, or the
+    EMBEDDING_BACKEND environment variable (default: hashing)
+    """
+    if isinstance(embedder, Embedder):
+        return embedder
+    if callable(embedder):
+        return CallableEmbedder(embedder)
+    name = (embedder or os.getenv('EMBEDDING_BACKEND', HashingEmbedder.name)).lower()
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedding backend '{name}'. Available: {', '.join(sorted(EMBEDDERS))}")
+    return EMBEDDERS[name]()
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def document_key(document: Dict[str, Any]) -> str:
+    """Stable key tying a stored vector to a document"""
+    data = document['data']
+    if document['type'] == 'discourse' and data.get('id') is not None:
+        return f"discourse:{data['id']}"
+    return f"{document['type']}:{data.get('url', '')}#{data.get('title', '')}"
+
+
+def document_text(document: Dict[str, Any]) -> str:
+    """Text that gets embedded: course section title + content, topic title + summary"""
+    data = document['data']
+    if document['type'] == 'course_content':
+        return f"{data.get('title', '')}. {data.get('content', '')}"
+    return f"{data.get('title', '')}. {data.get('answer_summary', '')}"
+
+
+def corpus_hash(texts: List[str]) -> str:
+    """SHA-256 over the embedded texts in order, so edited content is detected even when keys stay the same"""
+    digest = hashlib.sha256()
+    for text in texts:
+        encoded = text.encode('utf-8')
+        digest.update(len(encoded).to_bytes(8, 'little'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+
+def spherical_kmeans(vectors: np.ndarray, num_lists: int, iterations: int = 10, seed: int = 0,
+                     sample_size: int = 20000) -> np.ndarray:
+    """Train IVF centroids with cosine k-means on (a sample of) the vectors"""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > sample_size:
+        vectors = vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), num_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for list_id in range(num_lists):
+            members = vectors[assignment == list_id]
+            if len(members):
+                centroids[list_id] = members.sum(axis=0)
+        centroids = normalize(centroids)
+    return centroids
+
+
+class EmbeddingIndex:
+    """
+    Document embedding matrix with exact (brute-force matmul) and approximate
+    (IVF) nearest-neighbour search.
+
+    Vectors are stored as float32, or as int8 with a per-row scale, in .npy
+    files that are memory-mapped on load so workers share the page cache.
+    """
+
+    def __init__(self, vectors: np.ndarray, keys: List[str], embedder_name: str,
+                 scales: Optional[np.ndarray] = None, centroids: Optional[np.ndarray] = None,
+                 list_offsets: Optional[np.ndarray] = None, list_doc_ids: Optional[np.ndarray] = None,
+                 content_hash: Optional[str] = None):
+        self.vectors = vectors
+        self.keys = keys
+        self.embedder_name = embedder_name
+        self.content_hash = content_hash
+        self.scales = scales
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_doc_ids = list_doc_ids
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def dim(self) -> int:
+        return int(self.vectors.shape[1]) if self.vectors.ndim == 2 else 0
+
+    @property
+    def quantization(self) -> str:
+        return 'int8' if self.scales is not None else 'float32'
+
+    @classmethod
+    def build(cls, index: SearchIndex, embedder: Embedder, quantize: bool = False,
+              num_lists: Optional[int] = None, batch_size: int = 512) -> 'EmbeddingIndex':
+        """Embed every course section and topic summary in the search index"""
+        texts = [document_text(document) for document in index.documents]
+        keys = [document_key(document) for document in index.documents]
+        vectors = np.zeros((len(texts), embedder.dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            vectors[start:start + batch_size] = embedder.embed(texts[start:start + batch_size])
+
+        embedding_index = cls(vectors, keys, embedder.name, content_hash=corpus_hash(texts))
+        embedding_index.train_ivf(num_lists)
+        if quantize:
+            embedding_index.quantize()
+        return embedding_index
+
+    def quantize(self):
+        """Convert the matrix to int8 with one float32 scale per row"""
+        if self.scales is not None:
+            return
+        vectors = np.asarray(self.vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        self.vectors = np.round(vectors / scales[:, None]).astype(np.int8)
+        self.scales = scales.astype(np.float32)
+
+    def train_ivf(self, num_lists: Optional[int] = None):
+        """Cluster the vectors into inverted lists for approximate search"""
+        count = len(self.keys)
+        if count == 0:
+            return
+        num_lists = min(num_lists or max(1, int(np.sqrt(count))), count)
+        self.centroids = spherical_kmeans(self.rows(0, count), num_lists)
+        assignment = np.concatenate([
+            np.argmax(self.rows(start, min(start + SCORE_BLOCK_ROWS, count)) @ self.centroids.T, axis=1)
+            for start in range(0, count, SCORE_BLOCK_ROWS)
+        ])
+        self.list_doc_ids = np.argsort(assignment, kind='stable').astype(np.int32)
+        self.list_offsets = np.zeros(num_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assignment, minlength=num_lists), out=self.list_offsets[1:])
+
+    def rows(self, start: int, stop: int) -> np.ndarray:
+        """Dequantised float32 view of a block of rows"""
+        block = np.asarray(self.vectors[start:stop], dtype=np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:stop, None]
+        return block
+
+    def _score_rows(self, doc_ids: np.ndarray, query: np.ndarray) -> np.ndarray:
+        block = np.asarray(self.vectors[doc_ids], dtype=np.float32)
+        scores = block @ query
+        if self.scales is not None:
+            scores *= self.scales[doc_ids]
+        return scores
+
+    def score_all(self, query: np.ndarray) -> np.ndarray:
+        """Exact cosine similarity against every document"""
+        count = len(self.keys)
+        if self.scales is None and not isinstance(self.vectors, np.memmap):
+            return self.vectors @ query
+        scores = np.empty(count, dtype=np.float32)
+        for start in range(0, count, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, count)
+            block = np.asarray(self.vectors[start:stop], dtype=np.float32)
+            scores[start:stop] = block @ query
+            if self.scales is not None:
+                scores[start:stop] *= self.scales[start:stop]
+        return scores
+
+    def search(self, query: np.ndarray, k: int, mode: str = 'exact', nprobe: int = 8) -> List[Tuple[int, float]]:
+        """Return up to k (doc_id, similarity) pairs, best first"""
+        if k <= 0 or not len(self.keys):
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        if mode == 'ivf' and self.centroids is not None:
+            probes = np.argsort(-(self.centroids @ query))[:nprobe]
+            doc_ids = np.concatenate([
+                self.list_doc_ids[self.list_offsets[p]:self.list_offsets[p + 1]] for p in probes
+            ])
+            scores = self._score_rows(doc_ids, query)
+        elif mode in ('exact', 'ivf'):
+            doc_ids = None
+            scores = self.score_all(query)
+        else:
+            raise ValueError(f"Unknown vector search mode '{mode}'. Use 'exact' or 'ivf'")
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        ids = doc_ids[top] if doc_ids is not None else top
+        return [(int(doc_id), float(score)) for doc_id, score in zip(ids, scores[top])]
+
+    def save(self, directory: str = DEFAULT_INDEX_DIR):
+        """Write the matrix, IVF lists and metadata as memory-mappable .npy files"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, 'vectors.npy'), np.asarray(self.vectors))
+        if self.scales is not None:
+            np.save(os.path.join(directory, 'scales.npy'), self.scales)
+        if self.centroids is not None:
+            np.save(os.path.join(directory, 'ivf_centroids.npy'), self.centroids)
+            np.save(os.path.join(directory, 'ivf_offsets.npy'), self.list_offsets)
+            np.save(os.path.join(directory, 'ivf_doc_ids.npy'), self.list_doc_ids)
+        meta = {
+            'embedder': self.embedder_name,
+            'dim': self.dim,
+            'count': len(self.keys),
+            'quantization': self.quantization,
+            'keys': self.keys,
+            'content_hash': self.content_hash,
+            'built_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        }
+        with open(os.path.join(directory, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory: str = DEFAULT_INDEX_DIR) -> Optional['EmbeddingIndex']:
+        """Memory-map a saved index, or return None if there is none"""
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        def optional(name: str) -> Optional[np.ndarray]:
+            path = os.path.join(directory, name)
+            return np.load(path, mmap_mode='r') if os.path.exists(path) else None
+
+        return cls(
+            vectors=np.load(os.path.join(directory, 'vectors.npy'), mmap_mode='r'),
+            keys=meta['keys'],
+            embedder_name=meta['embedder'],
+            scales=optional('scales.npy'),
+            centroids=optional('ivf_centroids.npy'),
+            list_offsets=optional('ivf_offsets.npy'),
+            list_doc_ids=optional('ivf_doc_ids.npy'),
+            content_hash=meta.get('content_hash'),
+        )
+
+    def matches(self, index: SearchIndex, embedder: Embedder) -> bool:
+        """True if this index was built for the same documents and texts with the same embedder"""
+        return (self.embedder_name == embedder.name and self.dim == embedder.dim
+                and self.keys == [document_key(document) for document in index.documents]
+                and self.content_hash == corpus_hash([document_text(document) for document in index.documents]))
+
+
+def load_or_build_index(index: SearchIndex, embedder: Embedder,
+                        directory: str = DEFAULT_INDEX_DIR) -> Optional[EmbeddingIndex]:
+    """
+    Use the prebuilt index from ``build_index.py embeddings`` when it matches the
+    loaded documents. Local embedders can rebuild in memory; remote ones never
+    embed documents at serving time.
+    """
+    embedding_index = EmbeddingIndex.load(directory)
+    if embedding_index is not None and embedding_index.matches(index, embedder):
+        return embedding_index
+    if embedder.name == OpenAIEmbedder.name:
+        print("Embedding index missing or stale; run 'python build_index.py embeddings' to enable semantic search")
+        return None
+    return EmbeddingIndex.build(index, embedder)
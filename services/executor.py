@@ -0,0 +1,96 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Dict, Any, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when a request would exceed the executor's queue depth"""
+
+
+class BoundedExecutor:
+    """
+    Runs CPU-bound request handling off the event loop.
+
+    mode is 'thread' (default), 'process' or 'inline' (run on the event loop,
+    the old behaviour, kept for benchmarking). At most max_pending calls may be
+    running or queued; further calls fail fast with QueueFullError so the API
+    can answer 503 instead of letting latency grow without bound.
+    """
+
+    def __init__(self, name: str, max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 mode: Optional[str] = None, initializer: Optional[Callable] = None):
+        prefix = f"TA_{name.upper()}"
+        self.name = name
+        self.mode = (mode or os.getenv('TA_EXECUTOR', 'thread')).lower()
+        self.max_workers = max_workers or int(os.getenv(f'{prefix}_WORKERS', os.cpu_count() or 2))
+        self.max_pending = max_pending or int(os.getenv(f'{prefix}_MAX_PENDING', self.max_workers * 4))
+        self._initializer = initializer
+        self._pool: Optional[Executor] = None
+        self._pool_lock = threading.Lock()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+
+        if self.mode not in ('thread', 'process', 'inline'):
+            raise ValueError(f"Unknown executor mode '{self.mode}'. Use 'thread', 'process' or 'inline'")
+
+    @property
+    def pool(self) -> Executor:
+        """Worker pool, created on first use"""
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    if self.mode == 'process':
+                        self._pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=self._initializer)
+                    else:
+                        self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix=f"ta-{self.name}")
+        return self._pool
+
+    def _acquire(self):
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{self.name} queue is full ({self.max_pending} requests in flight)")
+            self._pending += 1
+
+    def _release(self):
+        with self._pending_lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def run(self, function: Callable, *args) -> Any:
+        """Run function(*args) in the pool and await its result"""
+        self._acquire()
+        if self.mode == 'inline':
+            try:
+                return function(*args)
+            finally:
+                self._release()
+        try:
+            future = self.pool.submit(function, *args)
+        except BaseException:
+            self._release()
+            raise
+        # Released when the work is done (or cancelled before it started), not when the
+        # caller stops waiting: a cancelled request must not free a slot its call still holds
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'mode': self.mode,
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self._pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
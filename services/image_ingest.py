@@ -0,0 +1,202 @@
+import binascii
+import hashlib
+import os
+import struct
+import tempfile
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, AsyncIterator, BinaryIO, Tuple
+
+
+# Decoded bytes allowed per image (MAX_IMAGE_BYTES env var, default 10 MB)
+DEFAULT_MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# Base64 characters decoded per step; a multiple of 4 so chunks decode independently
+CHUNK_CHARS = 64 * 1024
+
+# Leading bytes kept for format and dimension sniffing
+HEADER_BYTES = 64 * 1024
+
+# Uploads larger than this spill from memory to a temporary file
+SPOOL_MEMORY_BYTES = 1024 * 1024
+
+# Form fields and part headers allowed around the image in a multipart upload
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Tolerance for line-wrapped (MIME style) base64 in the up-front size estimate
+WRAPPED_BASE64_OVERHEAD = 1.03
+
+
+class ImageError(ValueError):
+    """Base class for rejected image uploads"""
+
+
+class InvalidImageError(ImageError):
+    """The image payload is not valid base64"""
+
+
+class ImageTooLargeError(ImageError):
+    """The decoded image exceeds the configured maximum size"""
+
+
+@dataclass(slots=True)
+class ImageInfo:
+    size_bytes: int
+    format: str
+    width: Optional[int]
+    height: Optional[int]
+    sha256: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def max_image_bytes() -> int:
+    return int(os.getenv('MAX_IMAGE_BYTES', DEFAULT_MAX_IMAGE_BYTES))
+
+
+def sniff_image(header: bytes) -> Tuple[str, Optional[int], Optional[int]]:
+    """Detect format and dimensions from the leading bytes of an image"""
+    if header.startswith(b'\x89PNG\r\n\x1a\n') and len(header) >= 24:
+        width, height = struct.unpack('>II', header[16:24])
+        return 'png', width, height
+    if header[:6] in (b'GIF87a', b'GIF89a') and len(header) >= 10:
+        width, height = struct.unpack('<HH', header[6:10])
+        return 'gif', width, height
+    if header.startswith(b'BM') and len(header) >= 26:
+        width, height = struct.unpack('<ii', header[18:26])
+        return 'bmp', width, abs(height)
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP' and len(header) >= 30:
+        chunk = header[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', header[26:30])
+            return 'webp', width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(header[21:25], 'little')
+            return 'webp', (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return 'webp', int.from_bytes(header[24:27], 'little') + 1, int.from_bytes(header[27:30], 'little') + 1
+        return 'webp', None, None
+    if header.startswith(b'\xff\xd8'):
+        return ('jpeg',) + _jpeg_dimensions(header)
+    return 'unknown', None, None
+
+
+def _jpeg_dimensions(header: bytes) -> Tuple[Optional[int], Optional[int]]:
+    """Walk JPEG segments up to the first start-of-frame marker"""
+    position = 2
+    while position + 9 <= len(header):
+        if header[position] != 0xFF:
+            return None, None
+        marker = header[position + 1]
+        if marker == 0xFF:
+            position += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            position += 2
+            continue
+        length = struct.unpack('>H', header[position + 2:position + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', header[position + 5:position + 9])
+            return width, height
+        position += 2 + length
+    return None, None
+
+
+class _ImageAccumulator:
+    """Hashes, counts and sniffs decoded bytes as they stream past"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest = hashlib.sha256()
+        self.header = bytearray()
+
+    def feed(self, data: bytes):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise ImageTooLargeError(f"Image exceeds the {self.max_bytes} byte limit")
+        self.digest.update(data)
+        if len(self.header) < HEADER_BYTES:
+            self.header += data[:HEADER_BYTES - len(self.header)]
+
+    def result(self) -> ImageInfo:
+        image_format, width, height = sniff_image(bytes(self.header))
+        return ImageInfo(self.size, image_format, width, height, self.digest.hexdigest())
+
+
+def ingest_base64(image_b64: str, max_bytes: Optional[int] = None, chunk_chars: int = CHUNK_CHARS) -> ImageInfo:
+    """
+    Validate and decode a base64 image in fixed-size chunks.
+
+    The decoded size is checked against max_bytes before decoding starts and
+    again as bytes arrive, and only one chunk of decoded bytes exists at a time.
+    A ``data:image/...;base64,`` prefix is accepted.
+    """
+    max_bytes = max_bytes if max_bytes is not None else max_image_bytes()
+    start = 0
+    if image_b64.startswith('data:'):
+        start = image_b64.find(',', 0, 256) + 1
+        if start == 0:
+            raise InvalidImageError("Malformed data URL")
+
+    estimated_bytes = (len(image_b64) - start) * 3 // 4
+    if estimated_bytes > max_bytes * WRAPPED_BASE64_OVERHEAD:
+        raise ImageTooLargeError(f"Image exceeds the {max_bytes} byte limit")
+
+    accumulator = _ImageAccumulator(max_bytes)
+    carry = ''
+    for offset in range(start, len(image_b64), chunk_chars):
+        chunk = image_b64[offset:offset + chunk_chars]
+        if ' ' in chunk or '\n' in chunk or '\r' in chunk or '\t' in chunk:
+            chunk = ''.join(chunk.split())
+        if carry:
+            chunk = carry + chunk
+        usable = len(chunk) - len(chunk) % 4
+        carry = chunk[usable:]
+        if usable:
+            try:
+                accumulator.feed(binascii.a2b_base64(chunk[:usable], strict_mode=True))
+            except binascii.Error as e:
+                raise InvalidImageError(f"Invalid base64 image data: {e}") from e
+    if carry:
+        raise InvalidImageError("Invalid base64 image data: truncated input")
+    return accumulator.result()
+
+
+def decode_base64(image_b64: str) -> bytes:
+    """Decode an image already accepted by ingest_base64 (data: prefix allowed)"""
+    start = image_b64.find(',', 0, 256) + 1 if image_b64.startswith('data:') else 0
+    return binascii.a2b_base64(image_b64[start:])
+
+
+def ingest_stream(stream: BinaryIO, max_bytes: Optional[int] = None, chunk_size: int = CHUNK_CHARS) -> ImageInfo:
+    """Hash, size-check and sniff a raw binary image read from a file-like object"""
+    accumulator = _ImageAccumulator(max_bytes if max_bytes is not None else max_image_bytes())
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        accumulator.feed(data)
+    return accumulator.result()
+
+
+async def spool_chunks(chunks: AsyncIterator[bytes], max_bytes: Optional[int] = None) -> BinaryIO:
+    """
+    Copy a streamed binary upload into a spooled temporary file, rewound for reading.
+
+    Raises ImageTooLargeError as soon as more than max_bytes have arrived.
+    """
+    max_bytes = max_bytes if max_bytes is not None else max_image_bytes()
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise ImageTooLargeError(f"Image exceeds the {max_bytes} byte limit")
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
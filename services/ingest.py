@@ -0,0 +1,437 @@
+"""
+Streaming scrape -> knowledge base pipeline.
+
+Reads the scraper CSVs (tds_lectures_content.csv, tds_discourse_posts.csv)
+and turns them into the enhanced_*.json corpora AnswerGenerator loads,
+plus the compiled binary knowledge base. Records flow one at a time through
+generator stages:
+
+    read -> clean -> dedup -> chunk -> keywords -> summary -> write
+
+Nothing holds the whole corpus. The JSON arrays are written record by
+record; the binary knowledge base is compiled in shards of a few thousand
+documents that are merged at the end (see kb_store.merge_knowledge_bases).
+Discourse rows are grouped into topics by a first pass that only keeps the
+byte offset of each row, so appended incremental scrapes need not be sorted.
+"""
+import csv
+import hashlib
+import html
+import json
+import os
+import re
+import shutil
+from array import array
+from collections import Counter
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+from scraper.html_text import html_to_text, resolve_backend
+from services.kb_store import DEFAULT_KB_PATH, merge_knowledge_bases, write_knowledge_base
+from services.rule_engine import RuleEngine, load_rule_engine
+from services.search_index import tokenize
+
+
+LECTURES_CSV = "tds_lectures_content.csv"
+DISCOURSE_CSV = "tds_discourse_posts.csv"
+OUTPUT_DIR = 'scraped_data'
+COURSE_CONTENT_JSON = 'enhanced_course_content.json'
+DISCOURSE_POSTS_JSON = 'enhanced_discourse_posts.json'
+
+COURSE_URL = "https://tds.s-anand.net"
+DISCOURSE_URL = "https://discourse.onlinedegree.iitm.ac.in"
+
+# Documents per compiled shard; bounds the memory of each write_knowledge_base call
+SHARD_DOCUMENTS = 5000
+# Longest course-content chunk, in characters
+CHUNK_CHARS = 2000
+MAX_KEYWORDS = 10
+SUMMARY_CHARS = 300
+
+# Replies from course staff are preferred as a topic's answer summary
+STAFF_USERNAMES = frozenset({'s.anand', 'carlton'})
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both but by
+can could did do does doing done during each few for from further get got had has have having he her here hers him
+his how i if in into is it its just me more most my no nor not now of off on once only or other our out over own
+please same she should so some such than thanks that the their them then there these they this those through to too
+under until up very was we were what when where which while who whom why will with would you your yours
+""".split())
+
+TAG_RE = re.compile(r'<[a-zA-Z/!][^>]*>')
+INLINE_SPACE_RE = re.compile(r'[ \t\u00a0]+')
+SENTENCE_RE = re.compile(r'(?<=[.!?])\s+')
+PARAGRAPH_RE = re.compile(r'\n\s*\n')
+
+
+# ----------- Readers -----------
+
+def csv_rows_with_offsets(path: str) -> Iterator[Tuple[int, List[str]]]:
+    """(byte offset, row) for every CSV row, quoted newlines included"""
+    with open(path, 'rb') as f:
+        position = 0
+
+        def lines() -> Iterator[str]:
+            nonlocal position
+            for line in f:
+                position += len(line)
+                yield line.decode('utf-8')
+
+        start = 0
+        # csv.reader pulls exactly the lines of one row at a time, so position is the next row's offset
+        for row in csv.reader(lines()):
+            yield start, row
+            start = position
+
+
+def csv_row_at(f, offset: int) -> List[str]:
+    f.seek(offset)
+    return next(csv.reader(line.decode('utf-8') for line in f))
+
+
+def read_lectures(path: str) -> Iterator[Dict[str, Any]]:
+    """Course-content records from the lecture scraper CSV"""
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) >= 2:
+                yield {'type': 'course_content', 'data': {'url': COURSE_URL, 'title': row[0], 'content': row[1]}}
+
+
+def read_discourse_topics(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Topic records (posts in file order) from the Discourse scraper CSV, in
+    order of first appearance. Only row offsets are kept in memory. A post id
+    seen again (an edit appended by an incremental scrape) replaces the
+    earlier row in place.
+    """
+    columns: Dict[str, int] = {}
+    topic_rows: Dict[str, array] = {}
+    for offset, row in csv_rows_with_offsets(path):
+        if not columns:
+            columns = {name: position for position, name in enumerate(row)}
+            continue
+        if row:
+            topic_rows.setdefault(row[columns['Topic ID']], array('Q')).append(offset)
+
+    with open(path, 'rb') as f:
+        for topic_id, offsets in topic_rows.items():
+            posts = []
+            positions: Dict[int, int] = {}
+            title = ''
+            for offset in offsets:
+                row = csv_row_at(f, offset)
+                title = row[columns['Topic Title']]
+                post = {
+                    'id': int(row[columns['Post ID']]),
+                    'username': row[columns['Author']],
+                    'content': row[columns['Content']],
+                    'created_at': row[columns['Created At']],
+                }
+                if post['id'] in positions:
+                    posts[positions[post['id']]] = post
+                else:
+                    positions[post['id']] = len(posts)
+                    posts.append(post)
+            yield {'type': 'discourse', 'data': {
+                'id': int(topic_id), 'title': title, 'url': f"{DISCOURSE_URL}/t/{topic_id}", 'posts': posts,
+            }}
+
+
+# ----------- Stages -----------
+
+def clean_text(text: str, backend: str = 'html.parser') -> str:
+    """Plain text with collapsed whitespace; leftover HTML goes through the parser backend's get_text"""
+    if TAG_RE.search(text):
+        text = html_to_text(text, backend)
+    text = html.unescape(text)
+    lines = (INLINE_SPACE_RE.sub(' ', line).strip() for line in text.splitlines())
+    # Keep single blank lines: they separate paragraphs for chunking
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def clean(records: Iterable[Dict[str, Any]], backend: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    backend = resolve_backend(backend)
+    for record in records:
+        data = record['data']
+        data['title'] = clean_text(data.get('title', ''), backend)
+        if record['type'] == 'course_content':
+            data['content'] = clean_text(data.get('content', ''), backend)
+        else:
+            for post in data['posts']:
+                post['content'] = clean_text(post['content'], backend)
+        yield record
+
+
+def _digest(*parts: str) -> bytes:
+    return hashlib.blake2b('\x00'.join(parts).encode('utf-8'), digest_size=8).digest()
+
+
+def dedup(records: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """
+    Drop empty and repeated records: course content with identical text,
+    repeated or empty posts within a topic, and topics whose title and
+    opening post were already seen. Only 8-byte digests are remembered.
+    """
+    seen = set()
+    for record in records:
+        data = record['data']
+        if record['type'] == 'course_content':
+            if not data['content']:
+                continue
+            key = _digest(data['content'])
+        else:
+            post_ids, post_digests, posts = set(), set(), []
+            for post in data['posts']:
+                post_digest = _digest(post['content'])
+                if not post['content'] or post['id'] in post_ids or post_digest in post_digests:
+                    continue
+                post_ids.add(post['id'])
+                post_digests.add(post_digest)
+                posts.append(post)
+            if not posts:
+                continue
+            data['posts'] = posts
+            key = _digest(data['title'], posts[0]['content'])
+        if key in seen:
+            continue
+        seen.add(key)
+        yield record
+
+
+def split_text(text: str, max_chars: int) -> List[str]:
+    """Split at paragraph, then sentence, then word boundaries into pieces of at most max_chars"""
+    pieces = []
+    for unit in _units(text, max_chars):
+        if pieces and len(pieces[-1]) + 2 + len(unit) <= max_chars:
+            pieces[-1] += '\n\n' + unit
+        else:
+            pieces.append(unit)
+    return pieces
+
+
+def _units(text: str, max_chars: int) -> Iterator[str]:
+    for paragraph in PARAGRAPH_RE.split(text):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= max_chars:
+            if paragraph:
+                yield paragraph
+            continue
+        sentence_chunk = ''
+        for sentence in SENTENCE_RE.split(paragraph):
+            while len(sentence) > max_chars:
+                cut = sentence.rfind(' ', 0, max_chars)
+                cut = cut if cut > 0 else max_chars
+                if sentence_chunk:
+                    yield sentence_chunk
+                    sentence_chunk = ''
+                yield sentence[:cut]
+                sentence = sentence[cut:].lstrip()
+            if sentence_chunk and len(sentence_chunk) + 1 + len(sentence) > max_chars:
+                yield sentence_chunk
+                sentence_chunk = ''
+            sentence_chunk = f"{sentence_chunk} {sentence}" if sentence_chunk else sentence
+        if sentence_chunk:
+            yield sentence_chunk
+
+
+def chunk(records: Iterable[Dict[str, Any]], max_chars: int = CHUNK_CHARS) -> Iterator[Dict[str, Any]]:
+    """Split long course content into sections of at most max_chars; topics pass through"""
+    for record in records:
+        data = record['data']
+        if record['type'] != 'course_content' or len(data['content']) <= max_chars:
+            if record['type'] == 'course_content':
+                data.setdefault('section', data['title'])
+            yield record
+            continue
+        pieces = split_text(data['content'], max_chars)
+        for number, piece in enumerate(pieces, 1):
+            yield {'type': 'course_content', 'data': {
+                **data, 'section': f"{data['title']} (part {number} of {len(pieces)})", 'content': piece,
+            }}
+
+
+def extract_keywords(title: str, text: str, rule_engine: RuleEngine, limit: int = MAX_KEYWORDS) -> List[str]:
+    """
+    Rule keywords (data/rules.json) found in the text, then the most frequent
+    informative tokens, title tokens counting three times
+    """
+    keywords = rule_engine.matched_keywords(rule_engine.match(f"{title}\n{text}".lower()))
+    counts = Counter()
+    for weight, source in ((3, title), (1, text)):
+        for token in tokenize(source):
+            if len(token) > 2 and not token.isdigit() and token not in STOPWORDS:
+                counts[token] += weight
+    for token, _ in counts.most_common():
+        if len(keywords) >= limit:
+            break
+        if token not in keywords:
+            keywords.append(token)
+    return keywords[:limit]
+
+
+def add_keywords(records: Iterable[Dict[str, Any]], rule_engine: Optional[RuleEngine] = None,
+                 limit: int = MAX_KEYWORDS) -> Iterator[Dict[str, Any]]:
+    rule_engine = rule_engine or load_rule_engine()
+    for record in records:
+        data = record['data']
+        if record['type'] == 'course_content':
+            text = data['content']
+        else:
+            text = '\n'.join(post['content'] for post in data['posts'])
+        data['keywords'] = extract_keywords(data['title'], text, rule_engine, limit)
+        yield record
+
+
+def leading_sentences(text: str, max_chars: int = SUMMARY_CHARS) -> str:
+    """Whole sentences from the start of text within max_chars (a long first sentence is cut at a word)"""
+    text = ' '.join(text.split())
+    summary = ''
+    for sentence in SENTENCE_RE.split(text):
+        if len(summary) + len(sentence) + 1 > max_chars:
+            break
+        summary = f"{summary} {sentence}" if summary else sentence
+    if not summary:
+        summary = text[:max_chars].rsplit(' ', 1)[0] + '...' if len(text) > max_chars else text
+    return summary
+
+
+def select_summary(topic: Dict[str, Any], max_chars: int = SUMMARY_CHARS) -> Optional[str]:
+    """
+    The opening of the best reply: replies by staff first, then those sharing
+    the most terms with the question, then the earliest. Unanswered topics
+    are summarised by the question itself.
+    """
+    posts = topic['posts']
+    if not posts:
+        return None
+    question = posts[0]
+    replies = [post for post in posts[1:] if post['username'] != question['username']]
+    if not replies:
+        return leading_sentences(question['content'], max_chars)
+    question_terms = set(tokenize(f"{topic['title']} {question['content']}")) - STOPWORDS
+    best = max(enumerate(replies), key=lambda item: (
+        item[1]['username'] in STAFF_USERNAMES,
+        len(question_terms.intersection(tokenize(item[1]['content']))),
+        -item[0],
+    ))[1]
+    return leading_sentences(best['content'], max_chars)
+
+
+def add_summaries(records: Iterable[Dict[str, Any]], max_chars: int = SUMMARY_CHARS) -> Iterator[Dict[str, Any]]:
+    for record in records:
+        if record['type'] == 'discourse':
+            summary = select_summary(record['data'], max_chars)
+            if summary:
+                record['data']['answer_summary'] = summary
+        yield record
+
+
+def enhance(records: Iterable[Dict[str, Any]], rule_engine: Optional[RuleEngine] = None,
+            chunk_chars: int = CHUNK_CHARS) -> Iterator[Dict[str, Any]]:
+    """All stages, in order"""
+    return add_summaries(add_keywords(chunk(dedup(clean(records)), chunk_chars), rule_engine))
+
+
+# ----------- Writers -----------
+
+class JsonArrayWriter:
+    """Writes a JSON array one element at a time; the file appears atomically on a clean exit"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._temporary_path = f"{path}.{os.getpid()}.tmp"
+        self._file = None
+
+    def __enter__(self) -> 'JsonArrayWriter':
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._file = open(self._temporary_path, 'w', encoding='utf-8')
+        self._file.write('[')
+        return self
+
+    def write(self, item: Dict[str, Any]):
+        self._file.write(',\n  ' if self.count else '\n  ')
+        json.dump(item, self._file, ensure_ascii=False)
+        self.count += 1
+
+    def __exit__(self, exc_type, *exc_info):
+        self._file.write('\n]\n' if self.count else ']\n')
+        self._file.close()
+        if exc_type is None:
+            os.replace(self._temporary_path, self.path)
+        else:
+            os.remove(self._temporary_path)
+
+
+class ShardWriter:
+    """Compiles documents into knowledge-base shards of at most shard_documents each"""
+
+    def __init__(self, directory: str, shard_documents: int = SHARD_DOCUMENTS):
+        self.directory = directory
+        self.shard_documents = shard_documents
+        self.paths: List[str] = []
+        self._type: Optional[str] = None
+        self._documents: List[Dict[str, Any]] = []
+
+    def add(self, record: Dict[str, Any]):
+        # A shard holds one document type, so course content stays ahead of discourse topics when merged
+        if self._documents and (record['type'] != self._type or len(self._documents) >= self.shard_documents):
+            self.flush()
+        self._type = record['type']
+        self._documents.append(record['data'])
+
+    def flush(self):
+        if not self._documents:
+            return
+        path = os.path.join(self.directory, f"shard-{len(self.paths):05d}.bin")
+        if self._type == 'course_content':
+            write_knowledge_base(self._documents, [], path)
+        else:
+            write_knowledge_base([], self._documents, path)
+        self.paths.append(path)
+        self._documents = []
+
+
+def ingest(lectures_csv: Optional[str] = LECTURES_CSV, discourse_csv: Optional[str] = DISCOURSE_CSV,
+           output_dir: str = OUTPUT_DIR, kb_path: Optional[str] = DEFAULT_KB_PATH,
+           shard_documents: int = SHARD_DOCUMENTS, chunk_chars: int = CHUNK_CHARS,
+           keep_shards: bool = False) -> Dict[str, Any]:
+    """
+    Stream the scraper CSVs into enhanced_course_content.json,
+    enhanced_discourse_posts.json and (unless kb_path is None) the compiled
+    knowledge base. Returns counts and output paths.
+    """
+    rule_engine = load_rule_engine()
+    course_path = os.path.join(output_dir, COURSE_CONTENT_JSON)
+    discourse_path = os.path.join(output_dir, DISCOURSE_POSTS_JSON)
+    shard_dir = f"{kb_path}.shards" if kb_path else None
+    shards = ShardWriter(shard_dir, shard_documents) if shard_dir else None
+    if shard_dir:
+        shutil.rmtree(shard_dir, ignore_errors=True)
+
+    posts = 0
+    with JsonArrayWriter(course_path) as course_json:
+        lectures = read_lectures(lectures_csv) if lectures_csv and os.path.exists(lectures_csv) else ()
+        for record in enhance(lectures, rule_engine, chunk_chars):
+            course_json.write(record['data'])
+            if shards:
+                shards.add(record)
+    with JsonArrayWriter(discourse_path) as discourse_json:
+        topics = read_discourse_topics(discourse_csv) if discourse_csv and os.path.exists(discourse_csv) else ()
+        for record in enhance(topics, rule_engine, chunk_chars):
+            discourse_json.write(record['data'])
+            posts += len(record['data']['posts'])
+            if shards:
+                shards.add(record)
+
+    summary = {'course_content': course_json.count, 'discourse_topics': discourse_json.count, 'posts': posts,
+               'outputs': [course_path, discourse_path]}
+    if shards:
+        shards.flush()
+        # Recorded as the sources so AnswerGenerator sees the compiled file as current
+        summary['knowledge_base'] = merge_knowledge_bases(shards.paths, kb_path, sources=[course_path, discourse_path])
+        if not keep_shards:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+    return summary
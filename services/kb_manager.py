@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# (path, size, mtime_ns) per watched file; size and mtime are None while the file is absent
+FileSignature = Tuple[Tuple[str, Optional[int], Optional[int]], ...]
+
+
+def file_signature(paths: Sequence[str]) -> FileSignature:
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+
+@dataclass(frozen=True)
+class KnowledgeBaseSnapshot:
+    """
+    One fully built knowledge base. Requests read the current snapshot once and
+    use it throughout, so a reload never changes the index under them.
+    """
+    version: int
+    course_content: Sequence[Any]
+    discourse_posts: Sequence[Any]
+    search_index: Any
+    ranker: Any
+    kb_file: Any = None
+    # Watched-file signature taken before the build started
+    sources: FileSignature = ()
+    build_ms: float = 0.0
+    built_at: float = field(default_factory=time.time)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'format': 'binary' if self.kb_file is not None else 'json',
+            'documents': len(self.search_index),
+            'segments': len(getattr(self.search_index, 'segments', ())) or 1,
+            'deleted': len(getattr(self.search_index, 'deleted', ())),
+            'build_ms': round(self.build_ms, 3),
+            'built_at': self.built_at,
+        }
+
+
+class KnowledgeBaseManager:
+    """
+    Watches the knowledge-base files and hot-reloads the generator.
+
+    Files are polled for size/mtime changes every poll_interval seconds. A
+    change is acted on once the files have stopped changing for one interval
+    (so a scraper still writing is not picked up half way). The new snapshot
+    is built in this background thread while requests keep using the old one,
+    then swapped in by AnswerGenerator.reload(), which also clears the answer
+    caches. A failed build keeps the current snapshot and is reported in stats.
+
+    The same thread compacts index segments left by upsert_topics() and
+    delete_topics() once AnswerGenerator.compaction_needed() says so. A reload
+    from disk replaces in-memory updates, so scrapers that upsert topics
+    should also write them to the JSON files.
+    """
+
+    def __init__(self, answer_generator, poll_interval: Optional[float] = None):
+        self.answer_generator = answer_generator
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv('KB_POLL_INTERVAL', 5.0))
+        self.reloads = 0
+        self.compactions = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._pending: Optional[FileSignature] = None
+        self._failed: Optional[FileSignature] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watched_paths(self) -> List[str]:
+        return self.answer_generator.watched_paths()
+
+    def check(self) -> bool:
+        """Poll once; rebuild when the files changed and have settled. Returns True after a reload."""
+        snapshot = self.answer_generator.current_snapshot
+        if snapshot is None:
+            # Nothing loaded yet: the first load reads whatever is on disk
+            return False
+        signature = file_signature(self.watched_paths())
+        if signature == snapshot.sources or signature == self._failed:
+            # Unchanged, or the same files already failed to build
+            self._pending = None
+            return False
+        if signature != self._pending:
+            # Changed since the last poll; wait until it stops changing
+            self._pending = signature
+            return False
+        self._pending = None
+        try:
+            self.answer_generator.reload(strict=True)
+        except Exception as e:
+            self.failures += 1
+            self._failed = signature
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Knowledge base reload failed, keeping version {snapshot.version}: {self.last_error}")
+            return False
+        self.reloads += 1
+        self._failed = None
+        self.last_error = None
+        return True
+
+    def compact(self) -> bool:
+        """Merge index segments if due. Returns True after a compaction."""
+        mode = self.answer_generator.compaction_needed()
+        if mode is None:
+            return False
+        try:
+            self.answer_generator.compact(full=mode == 'full')
+        except Exception as e:
+            self.failures += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+            print(f"Knowledge base compaction failed: {self.last_error}")
+            return False
+        self.compactions += 1
+        return True
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval):
+            if not self.check():
+                self.compact()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ta-kb-watch', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval + 1)
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'watching': self._thread is not None,
+            'poll_interval_s': self.poll_interval,
+            'reloads': self.reloads,
+            'compactions': self.compactions,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,503 @@
+import json
+import mmap
+import os
+from collections.abc import Mapping, Sequence
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock; writes stay atomic
+    fcntl = None
+
+import numpy as np
+
+from services.search_index import INDEXED_FIELDS, SearchIndex
+
+
+# Compiled knowledge base written by `python build_index.py kb`
+DEFAULT_KB_PATH = os.path.join('scraped_data', 'knowledge_base.bin')
+
+MAGIC = b'TDSKB\x00\x00\x02'
+ALIGNMENT = 64
+
+# Document fields kept in the compiled file; everything else (e.g. the raw
+# discourse `posts`) is never read when answering and is dropped
+STRING_FIELDS = ('url', 'title', 'section', 'category', 'content', 'answer_summary')
+DOCUMENT_TYPES = ('course_content', 'discourse')
+
+# String id marking a field that is absent from the source document
+MISSING = np.iinfo(np.uint32).max
+NO_TOPIC_ID = np.iinfo(np.int64).min
+
+RECORD_DTYPE = np.dtype(
+    [('type', np.uint8), ('id', np.int64), ('keywords_start', np.uint32), ('keywords_count', np.uint32),
+     ('search_text', np.uint32)]
+    + [(field, np.uint32) for field in STRING_FIELDS]
+)
+
+
+class KnowledgeBaseFormatError(ValueError):
+    """The compiled knowledge-base file is missing, truncated or from another format version"""
+
+
+def source_signature(paths: List[str]) -> List[Dict[str, Any]]:
+    """Path, size and mtime of each source file, used to detect a stale compiled file"""
+    signature = []
+    for path in paths:
+        stat = os.stat(path)
+        signature.append({'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    return signature
+
+
+class _StringTable:
+    """Interns strings and lays them out as one UTF-8 blob plus offsets"""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.encoded: List[bytes] = []
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.encoded)
+            self.encoded.append(value.encode('utf-8'))
+        return string_id
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        offsets = np.zeros(len(self.encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(value) for value in self.encoded], out=offsets[1:])
+        return offsets, np.frombuffer(b''.join(self.encoded), dtype=np.uint8)
+
+
+def write_knowledge_base(course_content: List[Dict[str, Any]], discourse_posts: List[Dict[str, Any]], path: str,
+                         sources: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Compile the corpora into a single binary file: a string table, one
+    fixed-width record per document and the inverted index (per-field posting
+    lists, field lengths and document frequencies, passage offsets and
+    passage posting lists) of SearchIndex.
+    """
+    index = SearchIndex(course_content, discourse_posts)
+    strings = _StringTable()
+
+    records = np.zeros(len(index.documents), dtype=RECORD_DTYPE)
+    keyword_ids: List[int] = []
+    for doc_id, document in enumerate(index.documents):
+        data = document['data']
+        record = records[doc_id]
+        record['type'] = DOCUMENT_TYPES.index(document['type'])
+        record['id'] = data['id'] if isinstance(data.get('id'), int) else NO_TOPIC_ID
+        for field in STRING_FIELDS:
+            value = data.get(field)
+            record[field] = strings.add(value if isinstance(value, str) else None)
+        keywords = data.get('keywords')
+        record['keywords_start'] = len(keyword_ids)
+        record['keywords_count'] = len(keywords) if keywords is not None else MISSING
+        keyword_ids.extend(strings.add(keyword) for keyword in keywords or ())
+        record['search_text'] = strings.add(index.search_texts[doc_id])
+
+    term_ids = index.term_ids
+    sections: Dict[str, np.ndarray] = {
+        'records': records,
+        'keywords': np.asarray(keyword_ids, dtype=np.uint32),
+        'vocabulary': np.asarray([strings.add(token) for token in index.vocabulary], dtype=np.uint32),
+        'doc_freqs': np.frombuffer(index.doc_freqs, dtype=np.uint32),
+    }
+    for field in INDEXED_FIELDS:
+        sections[f'{field}.indptr'], sections[f'{field}.docs'], sections[f'{field}.freqs'] = _csr_postings(
+            index.postings[field], index.frequencies[field], term_ids)
+        sections[f'{field}.lengths'] = np.frombuffer(index.field_lengths[field], dtype=np.uint32)
+    sections['passages.offsets'] = np.frombuffer(index.passage_offsets, dtype=np.uint32)
+    sections['passages.bounds'] = np.frombuffer(index.passage_bounds, dtype=np.uint32)
+    sections['passages.indptr'], sections['passages.ids'], sections['passages.freqs'] = _csr_postings(
+        index.passage_postings, index.passage_frequencies, term_ids)
+    sections['passages.lengths'] = np.frombuffer(index.passage_lengths, dtype=np.uint32)
+    sections['string_offsets'], sections['string_data'] = strings.arrays()
+
+    header: Dict[str, Any] = {
+        'num_course_content': len(course_content),
+        'num_discourse': len(discourse_posts),
+        'sources': source_signature(sources or []),
+        'sections': _section_layout({name: (array.dtype, array.shape) for name, array in sections.items()}),
+    }
+
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with _open_for_writing(temporary_path) as f:
+        data_start = _write_header(f, header)
+        for name, array in sections.items():
+            f.seek(data_start + header['sections'][name]['offset'])
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(temporary_path, path)
+    return {'path': path, 'documents': len(records), 'terms': len(index.vocabulary),
+            'strings': len(strings.encoded), 'bytes': os.path.getsize(path)}
+
+
+def _csr_postings(postings: Dict[str, Any], frequencies: Dict[str, Any],
+                  term_ids: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Posting lists as CSR arrays over term ids: (indptr, ids, term frequencies)"""
+    counts = np.zeros(len(term_ids), dtype=np.uint64)
+    for token, ids in postings.items():
+        counts[term_ids[token]] = len(ids)
+    indptr = np.zeros(len(term_ids) + 1, dtype=np.uint64)
+    np.cumsum(counts, out=indptr[1:])
+    ids = np.zeros(int(indptr[-1]), dtype=np.uint32)
+    tfs = np.zeros(int(indptr[-1]), dtype=np.uint32)
+    for token, posting_list in postings.items():
+        start = int(indptr[term_ids[token]])
+        ids[start:start + len(posting_list)] = posting_list
+        tfs[start:start + len(posting_list)] = frequencies[token]
+    return indptr, ids, tfs
+
+
+def _section_layout(shapes: Dict[str, Tuple[np.dtype, Tuple[int, ...]]]) -> Dict[str, Dict[str, Any]]:
+    """Aligned offsets (relative to the end of the header, so it can be sized last) of each section"""
+    layout = {}
+    offset = 0
+    for name, (dtype, shape) in shapes.items():
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        layout[name] = {'offset': offset, 'dtype': dtype.descr if dtype.names else dtype.str, 'shape': list(shape)}
+        offset += dtype.itemsize * int(np.prod(shape))
+    return layout
+
+
+def _write_header(f, header: Dict[str, Any]) -> int:
+    """Write magic and header; returns where the section data starts"""
+    header_bytes = json.dumps(header).encode('utf-8')
+    f.write(MAGIC)
+    f.write(len(header_bytes).to_bytes(8, 'little'))
+    f.write(header_bytes)
+    return -(-(len(MAGIC) + 8 + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+
+
+def _open_for_writing(path: str):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    return open(path, 'wb')
+
+
+def merge_knowledge_bases(shard_paths: List[str], path: str, sources: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Merge compiled shards into one knowledge base, as if write_knowledge_base
+    had been given all their documents in shard order. Course content must
+    precede discourse topics across the shards.
+
+    Posting lists are scattered straight into a memory map of the output, so
+    memory stays bounded by the merged vocabulary rather than the corpus.
+    Strings are not re-interned across shards; decoded values are identical.
+    """
+    shards = [KnowledgeBaseFile(shard_path) for shard_path in shard_paths]
+    seen_discourse = False
+    for shard in shards:
+        if seen_discourse and shard.header['num_course_content']:
+            raise ValueError(f"{shard.path}: course content after discourse topics in an earlier shard")
+        seen_discourse = seen_discourse or shard.header['num_discourse'] > 0
+
+    shard_vocabularies = [shard.strings(shard.sections['vocabulary']) for shard in shards]
+    vocabulary = sorted(set().union(*shard_vocabularies))
+    term_ids = {token: term_id for term_id, token in enumerate(vocabulary)}
+    term_maps = [np.fromiter((term_ids[token] for token in tokens), dtype=np.int64, count=len(tokens))
+                 for tokens in shard_vocabularies]
+    del shard_vocabularies, term_ids
+
+    def total(name: str) -> int:
+        return sum(len(shard.sections[name]) for shard in shards)
+
+    num_documents = total('records')
+    num_strings = sum(len(shard.sections['string_offsets']) - 1 for shard in shards)
+    shapes: Dict[str, Tuple[np.dtype, Tuple[int, ...]]] = {
+        'records': (RECORD_DTYPE, (num_documents,)),
+        'keywords': (np.dtype(np.uint32), (total('keywords'),)),
+        'vocabulary': (np.dtype(np.uint32), (len(vocabulary),)),
+        'doc_freqs': (np.dtype(np.uint32), (len(vocabulary),)),
+    }
+    for field in INDEXED_FIELDS:
+        shapes[f'{field}.indptr'] = (np.dtype(np.uint64), (len(vocabulary) + 1,))
+        shapes[f'{field}.docs'] = (np.dtype(np.uint32), (total(f'{field}.docs'),))
+        shapes[f'{field}.freqs'] = (np.dtype(np.uint32), (total(f'{field}.freqs'),))
+        shapes[f'{field}.lengths'] = (np.dtype(np.uint32), (num_documents,))
+    num_passages = total('passages.lengths')
+    shapes['passages.offsets'] = (np.dtype(np.uint32), (num_documents + 1,))
+    shapes['passages.bounds'] = (np.dtype(np.uint32), (2 * num_passages,))
+    shapes['passages.indptr'] = (np.dtype(np.uint64), (len(vocabulary) + 1,))
+    shapes['passages.ids'] = (np.dtype(np.uint32), (total('passages.ids'),))
+    shapes['passages.freqs'] = (np.dtype(np.uint32), (total('passages.freqs'),))
+    shapes['passages.lengths'] = (np.dtype(np.uint32), (num_passages,))
+    shapes['string_offsets'] = (np.dtype(np.uint64), (num_strings + 1,))
+    shapes['string_data'] = (np.dtype(np.uint8), (total('string_data'),))
+
+    header: Dict[str, Any] = {
+        'num_course_content': sum(shard.header['num_course_content'] for shard in shards),
+        'num_discourse': sum(shard.header['num_discourse'] for shard in shards),
+        'sources': source_signature(sources or []),
+        'sections': _section_layout(shapes),
+    }
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with _open_for_writing(temporary_path) as f:
+        data_start = _write_header(f, header)
+        end = max((data_start + section['offset'] + shapes[name][0].itemsize * int(np.prod(shapes[name][1]))
+                   for name, section in header['sections'].items()), default=data_start)
+        f.truncate(end)
+
+    def output(name: str) -> np.ndarray:
+        dtype, shape = shapes[name]
+        if not int(np.prod(shape)):
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(temporary_path, dtype=dtype, mode='r+', offset=data_start + header['sections'][name]['offset'],
+                         shape=shape)
+
+    # Per-shard shifts of document, passage, string, string-byte and keyword ids
+    doc_shifts = np.cumsum([0] + [len(shard.records) for shard in shards]).tolist()
+    passage_shifts = np.cumsum([0] + [len(shard.sections['passages.lengths']) for shard in shards]).tolist()
+    string_shifts = np.cumsum([0] + [len(shard.sections['string_offsets']) - 1 for shard in shards]).tolist()
+    byte_shifts = np.cumsum([0] + [len(shard.sections['string_data']) for shard in shards]).tolist()
+    keyword_shifts = np.cumsum([0] + [len(shard.sections['keywords']) for shard in shards]).tolist()
+
+    records, keywords = output('records'), output('keywords')
+    string_offsets, string_data = output('string_offsets'), output('string_data')
+    vocabulary_ids, doc_freqs = output('vocabulary'), output('doc_freqs')
+    assigned = np.zeros(len(vocabulary), dtype=bool)
+    for number, (shard, term_map) in enumerate(zip(shards, term_maps)):
+        shard_records = np.array(shard.records)
+        for field in STRING_FIELDS + ('search_text',):
+            present = shard_records[field] != MISSING
+            shard_records[field][present] += string_shifts[number]
+        shard_records['keywords_start'] += keyword_shifts[number]
+        records[doc_shifts[number]:doc_shifts[number + 1]] = shard_records
+        keywords[keyword_shifts[number]:keyword_shifts[number + 1]] = shard.sections['keywords'] + string_shifts[number]
+        offsets = shard.sections['string_offsets']
+        string_offsets[string_shifts[number]:string_shifts[number + 1] + 1] = offsets + byte_shifts[number]
+        string_data[byte_shifts[number]:byte_shifts[number + 1]] = shard.sections['string_data']
+        # Each merged term keeps the string of the first shard that has it
+        new_terms = ~assigned[term_map]
+        vocabulary_ids[term_map[new_terms]] = shard.sections['vocabulary'][new_terms] + string_shifts[number]
+        assigned[term_map] = True
+        np.add.at(doc_freqs, term_map, shard.sections['doc_freqs'])
+
+    # Field postings hold document ids and lengths per document; passage postings the same per passage
+    posting_sets = [(field, 'docs', doc_shifts) for field in INDEXED_FIELDS] + [('passages', 'ids', passage_shifts)]
+    for prefix, ids_name, id_shifts in posting_sets:
+        counts = np.zeros(len(vocabulary), dtype=np.uint64)
+        for shard, term_map in zip(shards, term_maps):
+            np.add.at(counts, term_map, np.diff(shard.sections[f'{prefix}.indptr']))
+        indptr = output(f'{prefix}.indptr')
+        indptr[0] = 0
+        np.cumsum(counts, out=indptr[1:])
+        ids, frequencies, lengths = output(f'{prefix}.{ids_name}'), output(f'{prefix}.freqs'), output(f'{prefix}.lengths')
+        # Shards are in document order, so appending each shard's block per term keeps posting lists sorted
+        filled = np.zeros(len(vocabulary), dtype=np.uint64)
+        for number, (shard, term_map) in enumerate(zip(shards, term_maps)):
+            shard_indptr = shard.sections[f'{prefix}.indptr']
+            shard_counts = np.diff(shard_indptr).astype(np.int64)
+            block_starts = np.asarray(indptr[:-1])[term_map] + filled[term_map]
+            filled[term_map] += shard_counts.astype(np.uint64)
+            within_block = np.arange(int(shard_indptr[-1]), dtype=np.uint64) - np.repeat(shard_indptr[:-1], shard_counts)
+            destinations = np.repeat(block_starts, shard_counts) + within_block
+            ids[destinations] = shard.sections[f'{prefix}.{ids_name}'] + np.uint32(id_shifts[number])
+            frequencies[destinations] = shard.sections[f'{prefix}.freqs']
+            lengths[id_shifts[number]:id_shifts[number + 1]] = shard.sections[f'{prefix}.lengths']
+        for array in (indptr, ids, frequencies, lengths):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    passage_offsets, passage_bounds = output('passages.offsets'), output('passages.bounds')
+    passage_offsets[0] = 0
+    for number, shard in enumerate(shards):
+        passage_offsets[doc_shifts[number] + 1:doc_shifts[number + 1] + 1] = \
+            shard.sections['passages.offsets'][1:] + np.uint32(passage_shifts[number])
+        # Bounds are offsets within each document's own text and need no shift
+        passage_bounds[2 * passage_shifts[number]:2 * passage_shifts[number + 1]] = shard.sections['passages.bounds']
+    for array in (passage_offsets, passage_bounds):
+        if isinstance(array, np.memmap):
+            array.flush()
+
+    for array in (records, keywords, string_offsets, string_data, vocabulary_ids, doc_freqs):
+        if isinstance(array, np.memmap):
+            array.flush()
+    del records, keywords, string_offsets, string_data, vocabulary_ids, doc_freqs
+    os.replace(temporary_path, path)
+    return {'path': path, 'documents': num_documents, 'terms': len(vocabulary), 'strings': num_strings,
+            'shards': len(shards), 'bytes': os.path.getsize(path)}
+
+
+@contextmanager
+def compile_lock(path: str):
+    """Exclusive lock next to the compiled file, held by whichever process is (re)compiling it"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(f"{path}.lock", 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def is_compiled_current(path: str, sources: List[str]) -> bool:
+    """True when path holds a readable compiled knowledge base built from these sources"""
+    try:
+        return KnowledgeBaseFile(path).is_current(sources)
+    except (OSError, ValueError, KeyError):
+        return False
+
+
+class KnowledgeBaseFile:
+    """
+    Read-only view of a compiled knowledge base.
+
+    The file is memory-mapped and every section is a zero-copy NumPy view;
+    document fields are decoded from the string table only when accessed.
+    """
+
+    def __init__(self, path: str = DEFAULT_KB_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = self._mmap
+        if buffer[:len(MAGIC)] != MAGIC:
+            raise KnowledgeBaseFormatError(f"{path} is not a compiled knowledge base (or has another version)")
+        header_length = int.from_bytes(buffer[len(MAGIC):len(MAGIC) + 8], 'little')
+        header_end = len(MAGIC) + 8 + header_length
+        self.header = json.loads(buffer[len(MAGIC) + 8:header_end].decode('utf-8'))
+        data_start = -(-header_end // ALIGNMENT) * ALIGNMENT
+
+        self.sections: Dict[str, np.ndarray] = {}
+        for name, section in self.header['sections'].items():
+            dtype = section['dtype']
+            dtype = np.dtype([tuple(field) for field in dtype]) if isinstance(dtype, list) else np.dtype(dtype)
+            count = int(np.prod(section['shape'])) if section['shape'] else 1
+            if data_start + section['offset'] + count * dtype.itemsize > len(buffer):
+                raise KnowledgeBaseFormatError(f"{path} is truncated (section '{name}')")
+            self.sections[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                                offset=data_start + section['offset']).reshape(section['shape'])
+
+        self.records = self.sections['records']
+        self._string_offsets = self.sections['string_offsets']
+        self._string_data = self.sections['string_data']
+        num_course_content = self.header['num_course_content']
+        self.documents = KBDocuments(self, 0, len(self.records))
+        self.course_content = KBRecords(self, 0, num_course_content)
+        self.discourse_posts = KBRecords(self, num_course_content, len(self.records))
+
+    def string(self, string_id: int) -> str:
+        start, end = self._string_offsets[string_id], self._string_offsets[string_id + 1]
+        return self._string_data[start:end].tobytes().decode('utf-8')
+
+    def strings(self, string_ids: np.ndarray) -> List[str]:
+        return [self.string(string_id) for string_id in string_ids.tolist()]
+
+    def is_current(self, sources: List[str]) -> bool:
+        """True when the file was compiled from exactly these source files, unchanged since"""
+        try:
+            return self.header['sources'] == source_signature(sources)
+        except OSError:
+            return False
+
+    def search_index(self) -> SearchIndex:
+        """SearchIndex whose posting lists and statistics are views into the file"""
+        return SearchIndex.from_arrays(
+            documents=self.documents,
+            vocabulary=self.strings(self.sections['vocabulary']),
+            postings={field: (self.sections[f'{field}.indptr'], self.sections[f'{field}.docs'],
+                              self.sections[f'{field}.freqs']) for field in INDEXED_FIELDS},
+            field_lengths={field: self.sections[f'{field}.lengths'] for field in INDEXED_FIELDS},
+            doc_freqs=self.sections['doc_freqs'],
+            search_texts=KBSearchTexts(self),
+            passages=tuple(self.sections[f'passages.{name}']
+                           for name in ('offsets', 'bounds', 'indptr', 'ids', 'freqs', 'lengths')),
+        )
+
+
+class KBRecord(Mapping):
+    """Lazy, read-only document dict backed by one fixed-width record"""
+
+    __slots__ = ('_kb', '_row')
+
+    def __init__(self, kb: KnowledgeBaseFile, row: int):
+        self._kb = kb
+        self._row = row
+
+    def _record(self):
+        return self._kb.records[self._row]
+
+    def __getitem__(self, key: str) -> Any:
+        record = self._record()
+        if key in STRING_FIELDS:
+            string_id = int(record[key])
+            if string_id == MISSING:
+                raise KeyError(key)
+            return self._kb.string(string_id)
+        if key == 'keywords':
+            count = int(record['keywords_count'])
+            if count == MISSING:
+                raise KeyError(key)
+            start = int(record['keywords_start'])
+            return self._kb.strings(self._kb.sections['keywords'][start:start + count])
+        if key == 'id' and int(record['id']) != NO_TOPIC_ID:
+            return int(record['id'])
+        raise KeyError(key)
+
+    def _keys(self) -> List[str]:
+        record = self._record()
+        keys = [field for field in STRING_FIELDS if int(record[field]) != MISSING]
+        if int(record['keywords_count']) != MISSING:
+            keys.append('keywords')
+        if int(record['id']) != NO_TOPIC_ID:
+            keys.append('id')
+        return keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys())
+
+    def __len__(self) -> int:
+        return len(self._keys())
+
+    def __repr__(self) -> str:
+        return f"KBRecord({dict(self)!r})"
+
+
+class KBRecords(Sequence):
+    """Lazy list of KBRecord for a contiguous range of documents"""
+
+    def __init__(self, kb: KnowledgeBaseFile, start: int, stop: int):
+        self._kb = kb
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(position)
+        return KBRecord(self._kb, self._start + position)
+
+
+class KBDocuments(KBRecords):
+    """Lazy SearchIndex.documents: {'type': ..., 'data': KBRecord} per document"""
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        record = super().__getitem__(position)
+        return {'type': DOCUMENT_TYPES[int(self._kb.records[record._row]['type'])], 'data': record}
+
+
+class KBSearchTexts(Sequence):
+    """Lazy SearchIndex.search_texts decoded from the string table"""
+
+    def __init__(self, kb: KnowledgeBaseFile):
+        self._kb = kb
+        self._ids = kb.records['search_text']
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __getitem__(self, doc_id: int) -> str:
+        return self._kb.string(int(self._ids[doc_id]))
@@ -0,0 +1,182 @@
+import os
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, Any, Optional, Union
+
+
+class OCRBackend:
+    """Extracts text from raw image bytes"""
+
+    name = 'base'
+
+    def extract_text(self, image_bytes: bytes) -> str:
+        raise NotImplementedError
+
+
+class TesseractBackend(OCRBackend):
+    """Runs the local `tesseract` binary; no Python packages required"""
+
+    name = 'tesseract'
+
+    def __init__(self, command: Optional[str] = None, language: Optional[str] = None,
+                 timeout_seconds: float = 30.0):
+        self.command = command or os.getenv('TESSERACT_CMD', 'tesseract')
+        self.language = language or os.getenv('OCR_LANGUAGE', 'eng')
+        self.timeout_seconds = timeout_seconds
+        if shutil.which(self.command) is None:
+            raise RuntimeError(f"OCR backend 'tesseract' needs the '{self.command}' binary on PATH")
+
+    def extract_text(self, image_bytes: bytes) -> str:
+        result = subprocess.run(
+            [self.command, 'stdin', 'stdout', '-l', self.language],
+            input=image_bytes, capture_output=True, timeout=self.timeout_seconds, check=True
+        )
+        return result.stdout.decode('utf-8', errors='replace')
+
+
+class CallableOCRBackend(OCRBackend):
+    """Adapts a plain ``bytes -> text`` function, e.g. a deterministic test double"""
+
+    def __init__(self, function: Callable[[bytes], str], name: str = 'callable'):
+        self.function = function
+        self.name = name
+
+    def extract_text(self, image_bytes: bytes) -> str:
+        return self.function(image_bytes)
+
+
+OCR_BACKENDS = {
+    TesseractBackend.name: TesseractBackend,
+}
+
+
+def create_ocr_backend(backend: Union[None, str, OCRBackend, Callable] = None) -> Optional[OCRBackend]:
+    """
+    Resolve an OCR backend from an instance, a callable, a backend name, or the
+    OCR_BACKEND environment variable (default: none, OCR disabled)
+    """
+    if isinstance(backend, OCRBackend):
+        return backend
+    if callable(backend):
+        return CallableOCRBackend(backend)
+    name = (backend or os.getenv('OCR_BACKEND', 'none')).lower()
+    if name == 'none':
+        return None
+    if name not in OCR_BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}'. Available: none, {', '.join(sorted(OCR_BACKENDS))}")
+    return OCR_BACKENDS[name]()
+
+
+class OCRStage:
+    """
+    Cached, time-boxed OCR for attached images.
+
+    Results are cached by image content hash (LRU). Extraction runs on a small
+    thread pool and the caller waits at most timeout_seconds; a slow image
+    degrades to a text-only answer while its extraction keeps running in the
+    background and fills the cache for the next request with the same image.
+    Concurrent requests for the same image share one extraction.
+    """
+
+    def __init__(self, backend: Union[None, str, OCRBackend, Callable] = None, cache_size: Optional[int] = None,
+                 timeout_seconds: Optional[float] = None, max_workers: Optional[int] = None):
+        self.backend = create_ocr_backend(backend)
+        self.cache_size = cache_size if cache_size is not None else int(os.getenv('OCR_CACHE_SIZE', 256))
+        self.timeout_seconds = (timeout_seconds if timeout_seconds is not None
+                                else float(os.getenv('OCR_TIMEOUT', 2.0)))
+        self.max_workers = max_workers or int(os.getenv('OCR_WORKERS', 2))
+        self.max_pending = self.max_workers * 4
+        self._cache: 'OrderedDict[str, str]' = OrderedDict()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self.hits = 0
+        self.misses = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.skipped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def extract(self, image_key: str, load_image: Callable[[], bytes]) -> Optional[str]:
+        """
+        Text in the image identified by image_key (its sha256), or None when OCR
+        is disabled, failed or did not finish in time. load_image is only called
+        on a cache miss, before this call returns.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            if image_key in self._cache:
+                self._cache.move_to_end(image_key)
+                self.hits += 1
+                return self._cache[image_key]
+            self.misses += 1
+            future = self._in_flight.get(image_key)
+            if future is None and len(self._in_flight) >= self.max_pending:
+                self.skipped += 1
+                return None
+        try:
+            if future is None:
+                future = self._submit(image_key, load_image)
+            return future.result(timeout=self.timeout_seconds)
+        except FutureTimeoutError:
+            with self._lock:
+                self.timeouts += 1
+            return None
+        except Exception:
+            # Failures of a submitted job are counted by the job itself; this is load_image failing
+            if future is None:
+                with self._lock:
+                    self.errors += 1
+            return None
+
+    def _submit(self, image_key: str, load_image: Callable[[], bytes]) -> Future:
+        image_bytes = load_image()
+        with self._lock:
+            future = self._in_flight.get(image_key)
+            if future is None:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ta-ocr')
+                future = self._pool.submit(self._run, image_key, image_bytes)
+                self._in_flight[image_key] = future
+            return future
+
+    def _run(self, image_key: str, image_bytes: bytes) -> str:
+        try:
+            text = ' '.join(self.backend.extract_text(image_bytes).split())
+        except Exception:
+            with self._lock:
+                self.errors += 1
+                self._in_flight.pop(image_key, None)
+            raise
+        with self._lock:
+            self._in_flight.pop(image_key, None)
+            if self.cache_size > 0:
+                self._cache[image_key] = text
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return text
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'backend': self.backend.name if self.backend else None,
+                'entries': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'skipped': self.skipped,
+                'in_flight': len(self._in_flight),
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
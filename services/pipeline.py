@@ -0,0 +1,213 @@
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Any, Hashable, List, Optional
+
+from services.question_processor import ProcessedQuestion, QuestionProcessor
+from services.answer_generator import AnswerGenerator
+from services.answer_cache import AnswerCache, SemanticAnswerCache, make_cache_key
+from services.image_ingest import decode_base64, ingest_base64
+from services.ocr import OCRStage
+from services.synthesis import SynthesisStage
+from services.kb_manager import KnowledgeBaseManager
+from services.timing import StageTimings
+
+
+@dataclass
+class PendingSynthesis:
+    """An extractive answer waiting for LLM synthesis, with what is needed to cache the result"""
+    question: str
+    context: List[Dict[str, str]]
+    processed_question: ProcessedQuestion
+    search_options: Optional[Dict[str, Any]]
+    cache_key: Hashable
+    cacheable: bool
+    timings: StageTimings
+    kb_version: int
+
+
+class AnswerPipeline:
+    """
+    Question -> answer path used by the API: exact answer cache lookup,
+    question processing, OCR of any attached image, near-duplicate cache
+    lookup, answer generation and optional LLM synthesis.
+    """
+
+    def __init__(self, question_processor: QuestionProcessor, answer_generator: AnswerGenerator,
+                 answer_cache: Optional[AnswerCache] = None, semantic_cache: Optional[SemanticAnswerCache] = None,
+                 ocr_stage: Optional[OCRStage] = None, synthesis_stage: Optional[SynthesisStage] = None):
+        self.question_processor = question_processor
+        self.answer_generator = answer_generator
+        self.answer_cache = answer_cache if answer_cache is not None else AnswerCache()
+        self.semantic_cache = semantic_cache if semantic_cache is not None else SemanticAnswerCache()
+        self.ocr_stage = ocr_stage if ocr_stage is not None else OCRStage()
+        self.synthesis_stage = synthesis_stage if synthesis_stage is not None else SynthesisStage()
+        # Cached answers are only valid for the knowledge base they came from
+        self._cache_lock = threading.Lock()
+        self.answer_generator.add_reload_listener(self._clear_caches)
+
+    def answer(self, question: str, image_b64: Optional[str] = None,
+               search_options: Optional[Dict[str, Any]] = None,
+               timings: Optional[StageTimings] = None, defer_synthesis: bool = False) -> Dict[str, Any]:
+        """Return answer data ('answer', 'links', 'timings'); see answer_ingested for defer_synthesis"""
+        timings = timings if timings is not None else StageTimings()
+
+        # Streaming decode: validates the image and yields its content hash for the cache key
+        image_info = None
+        if image_b64:
+            with timings.measure('image'):
+                image_info = ingest_base64(image_b64).to_dict()
+        return self.answer_ingested(question, image_info, search_options, timings,
+                                    load_image=lambda: decode_base64(image_b64), defer_synthesis=defer_synthesis)
+
+    def answer_ingested(self, question: str, image_info: Optional[Dict[str, Any]] = None,
+                        search_options: Optional[Dict[str, Any]] = None,
+                        timings: Optional[StageTimings] = None,
+                        load_image: Optional[Callable[[], bytes]] = None,
+                        defer_synthesis: bool = False) -> Dict[str, Any]:
+        """
+        Answer a question whose image (if any) has already been ingested;
+        load_image returns the image bytes and is only called on an OCR cache miss.
+
+        With LLM synthesis enabled, a contextual answer is synthesized here
+        (blocking), or with defer_synthesis=True returned extractive under
+        'synthesis' for the caller to complete with finish_synthesis() on its
+        event loop.
+        """
+        timings = timings if timings is not None else StageTimings()
+        # Answers are only cached while the knowledge base they were built from is current
+        kb_version = self.answer_generator.kb_version
+
+        with timings.measure('cache'):
+            normalized_question = self.question_processor.clean_question(question).lower()
+            image_key = image_info['sha256'] if image_info else ''
+            cache_key = make_cache_key(normalized_question, image_key, search_options)
+            cached = self.answer_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, 'timings': timings.as_dict()}
+
+        with timings.measure('process'):
+            processed_question = self.question_processor.process_question(question, image_info=image_info)
+
+        # Text in the screenshot joins the query; a timed-out OCR answers text-only
+        # and is kept out of the exact cache so a later request can use the OCR result
+        cacheable = True
+        if image_info and load_image is not None and self.ocr_stage.enabled:
+            with timings.measure('ocr'):
+                image_text = self.ocr_stage.extract(image_info['sha256'], load_image)
+            self.question_processor.add_image_text(processed_question, image_text)
+            cacheable = image_text is not None
+
+        # A rule answer is exact and cheap; the near-duplicate tier only stands in for
+        # retrieval, so it is neither consulted nor filled for questions a rule answers
+        with timings.measure('semantic_cache'):
+            ruled = self.answer_generator.get_predefined_answer(
+                processed_question.question_type, processed_question.keywords,
+                processed_question.original_question, processed_question.matched_phrases) is not None
+            cached = None if ruled else self.semantic_cache.get(processed_question, search_options)
+        if cached is not None:
+            if cacheable:
+                with self._cache_lock:
+                    if self.answer_generator.kb_version == kb_version:
+                        self.answer_cache.put(cache_key, cached)
+            return {**cached, 'timings': timings.as_dict()}
+
+        answer_data = self.answer_generator.generate_answer(processed_question, search_options, timings)
+        context = answer_data.pop('context', None)
+        if context and self.synthesis_stage.enabled:
+            pending = PendingSynthesis(question, context, processed_question, search_options, cache_key, cacheable,
+                                       timings, kb_version)
+            if defer_synthesis:
+                return {**answer_data, 'synthesis': pending}
+            with timings.measure('synthesis'):
+                text = self.synthesis_stage.synthesize(question, context)
+            return self._synthesized(answer_data, pending, text)
+        self._store(answer_data, processed_question, search_options, cache_key, cacheable, kb_version,
+                    semantic=not ruled)
+        return answer_data
+
+    async def finish_synthesis(self, answer_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Complete an answer returned with defer_synthesis=True; other answers pass through"""
+        pending = answer_data.pop('synthesis', None)
+        if pending is None:
+            return answer_data
+        with pending.timings.measure('synthesis'):
+            text = await self.synthesis_stage.synthesize_async(pending.question, pending.context)
+        return self._synthesized(answer_data, pending, text)
+
+    def _synthesized(self, answer_data: Dict[str, Any], pending: PendingSynthesis, text: Optional[str]) -> Dict[str, Any]:
+        """
+        The synthesized answer, cached like a generated one. Without text
+        (timeout, error) the extractive answer is returned uncached, so a later
+        request can still get a synthesized one.
+        """
+        answer_data = {**answer_data, 'timings': pending.timings.as_dict()}
+        if text is None:
+            return answer_data
+        answer_data['answer'] = text
+        self._store(answer_data, pending.processed_question, pending.search_options, pending.cache_key,
+                    pending.cacheable, pending.kb_version)
+        return answer_data
+
+    def _store(self, answer_data: Dict[str, Any], processed_question: ProcessedQuestion,
+               search_options: Optional[Dict[str, Any]], cache_key: Hashable, cacheable: bool, kb_version: int,
+               semantic: bool = True):
+        """
+        Cache an answer (in the near-duplicate tier too, if semantic) unless the
+        knowledge base was reloaded since kb_version, when it was started. The check and the puts hold the lock the reload
+        listener clears under, so a reload either skips them or clears after.
+        """
+        cached = {'answer': answer_data['answer'], 'links': answer_data['links']}
+        generation_ms = sum(elapsed for stage, elapsed in answer_data['timings'].items()
+                            if stage in ('predefined', 'search', 'generate', 'synthesis'))
+        with self._cache_lock:
+            if self.answer_generator.kb_version != kb_version:
+                return
+            if cacheable:
+                self.answer_cache.put(cache_key, cached)
+            if semantic:
+                self.semantic_cache.put(processed_question, cached, generation_ms, search_options)
+
+    def _clear_caches(self, *_):
+        """Reload listener: drop every cached answer"""
+        with self._cache_lock:
+            self.answer_cache.clear()
+            self.semantic_cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {'answer_cache': self.answer_cache.stats(), 'semantic_cache': self.semantic_cache.stats(),
+                'ocr': self.ocr_stage.stats(), 'synthesis': self.synthesis_stage.stats()}
+
+
+# Pipeline (and knowledge-base watcher) owned by a worker process when request
+# handling runs in a process pool
+_worker_pipeline: Optional[AnswerPipeline] = None
+_worker_kb_manager: Optional[KnowledgeBaseManager] = None
+
+
+def init_worker_pipeline():
+    """Process-pool initializer: build this worker's own pipeline"""
+    global _worker_pipeline, _worker_kb_manager
+    _worker_pipeline = AnswerPipeline(QuestionProcessor(), AnswerGenerator())
+    _worker_pipeline.answer_generator.warm_up()
+    if os.getenv('KB_WATCH', 'true').lower() == 'true':
+        _worker_kb_manager = KnowledgeBaseManager(_worker_pipeline.answer_generator)
+        _worker_kb_manager.start()
+
+
+def answer_in_worker(question: str, image_b64: Optional[str] = None,
+                     search_options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Picklable entry point for process-pool workers"""
+    if _worker_pipeline is None:
+        init_worker_pipeline()
+    return _worker_pipeline.answer(question, image_b64, search_options)
+
+
+def answer_ingested_in_worker(question: str, image_info: Optional[Dict[str, Any]] = None,
+                              search_options: Optional[Dict[str, Any]] = None,
+                              image_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+    """Picklable entry point for requests whose image was ingested by the web process"""
+    if _worker_pipeline is None:
+        init_worker_pipeline()
+    load_image = (lambda: image_bytes) if image_bytes is not None else None
+    return _worker_pipeline.answer_ingested(question, image_info, search_options, load_image=load_image)
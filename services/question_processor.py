@@ -1,117 +1,145 @@
-import base64
-import json
-from io import BytesIO
 import re
-from typing import Optional, List, Dict, Any
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, FrozenSet, Tuple
+
+from services.rule_engine import RuleEngine, load_rule_engine
+from services.search_index import TOKEN_RE
+from services.image_ingest import ingest_base64
+
+
+# Patterns are compiled once at import
+WHITESPACE_RE = re.compile(r'\s+')
+GPT35_TURBO_RE = re.compile(r'gpt-?3\.?5-?turbo-?0125', re.IGNORECASE)
+GPT4O_MINI_RE = re.compile(r'gpt-?4o-?mini', re.IGNORECASE)
+MODEL_PATTERNS = (
+    GPT35_TURBO_RE,
+    GPT4O_MINI_RE,
+    re.compile(r'gpt-?4', re.IGNORECASE),
+    re.compile(r'gpt-?3\.?5', re.IGNORECASE),
+)
+ASSIGNMENT_RE = re.compile(r'ga\d+', re.IGNORECASE)
+
+
+@dataclass(slots=True)
+class ProcessedQuestion:
+    """Result of the single tokenization pass, handed unchanged to retrieval"""
+    original_question: str
+    cleaned_question: str
+    # Lowercased cleaned question and its whitespace terms / alphanumeric tokens
+    normalized_question: str
+    terms: Tuple[str, ...]
+    tokens: Tuple[str, ...]
+    keywords: List[str]
+    question_type: str
+    matched_phrases: FrozenSet[str]
+    has_image: bool = False
+    image_info: Optional[Dict[str, Any]] = None
+    # Text extracted from the attached image by OCR, already merged into terms/tokens
+    image_text: Optional[str] = None
 
 
 class QuestionProcessor:
-    def __init__(self):
-        self.common_tds_keywords = [
-            'gpt', 'openai', 'ai-proxy', 'docker', 'podman', 'ga4', 'ga5', 
-            'graded assignment', 'dashboard', 'bonus', 'end-term', 'exam',
-            'discourse', 'tds', 'tools in data science', 'anand', 'professor'
-        ]
+    def __init__(self, rule_engine: Optional[RuleEngine] = None):
+        # Keyword and question-type phrases are loaded from data/rules.json
+        self.rule_engine = rule_engine or load_rule_engine()
+        self.common_tds_keywords = self.rule_engine.keywords
     
-    def process_question(self, question: str, image_b64: Optional[str] = None) -> Dict[str, Any]:
+    def process_question(self, question: str, image_b64: Optional[str] = None,
+                         image_info: Optional[Dict[str, Any]] = None) -> ProcessedQuestion:
         """
-        Process the incoming question and extract relevant information
+        Process the incoming question and extract relevant information.
+        
+        The question is lowercased once; one automaton pass finds every rule
+        phrase, and the model/assignment regexes only run when their literal
+        prefix is present. Pass image_info when the image was already ingested.
         """
-        processed = {
-            'original_question': question,
-            'cleaned_question': self.clean_question(question),
-            'keywords': self.extract_keywords(question),
-            'question_type': self.classify_question(question),
-            'has_image': image_b64 is not None,
-            'image_info': None
-        }
+        question_lower = question.lower()
+        matched_phrases = self.rule_engine.match(question_lower)
+        cleaned_question = self.clean_question(question, question_lower)
+        normalized_question = cleaned_question.lower()
         
-        if image_b64:
-            processed['image_info'] = self.process_image(image_b64)
+        processed = ProcessedQuestion(
+            original_question=question,
+            cleaned_question=cleaned_question,
+            normalized_question=normalized_question,
+            terms=tuple(normalized_question.split()),
+            tokens=tuple(TOKEN_RE.findall(normalized_question)),
+            keywords=self.extract_keywords(question, matched_phrases, question_lower),
+            question_type=self.classify_question(question, matched_phrases),
+            matched_phrases=matched_phrases,
+            has_image=image_b64 is not None or image_info is not None,
+            image_info=image_info
+        )
         
+        if image_b64 and image_info is None:
+            processed.image_info = self.process_image(image_b64)
+        
+        return processed
+    
+    def add_image_text(self, processed: ProcessedQuestion, image_text: Optional[str]) -> ProcessedQuestion:
+        """
+        Merge OCR text from the attached image into the retrieval terms and tokens
+        """
+        if not image_text:
+            return processed
+        normalized_text = image_text.lower()
+        processed.image_text = image_text
+        existing_terms = set(processed.terms)
+        processed.terms = processed.terms + tuple(
+            term for term in dict.fromkeys(normalized_text.split()) if term not in existing_terms
+        )
+        processed.tokens = processed.tokens + tuple(TOKEN_RE.findall(normalized_text))
         return processed
     
-    def clean_question(self, question: str) -> str:
+    def clean_question(self, question: str, question_lower: Optional[str] = None) -> str:
         """
         Clean and normalize the question text
         """
         # Remove extra whitespace
-        cleaned = re.sub(r'\s+', ' ', question.strip())
+        cleaned = WHITESPACE_RE.sub(' ', question.strip())
         
         # Normalize common terms
-        cleaned = re.sub(r'gpt-?3\.?5-?turbo-?0125', 'gpt-3.5-turbo-0125', cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r'gpt-?4o-?mini', 'gpt-4o-mini', cleaned, flags=re.IGNORECASE)
+        if 'gpt' in (question_lower if question_lower is not None else question.lower()):
+            cleaned = GPT35_TURBO_RE.sub('gpt-3.5-turbo-0125', cleaned)
+            cleaned = GPT4O_MINI_RE.sub('gpt-4o-mini', cleaned)
         
         return cleaned
     
-    def extract_keywords(self, question: str) -> List[str]:
+    def extract_keywords(self, question: str, matched_phrases: Optional[FrozenSet[str]] = None,
+                         question_lower: Optional[str] = None) -> List[str]:
         """
         Extract relevant keywords from the question
         """
-        keywords = []
-        question_lower = question.lower()
-        
-        for keyword in self.common_tds_keywords:
-            if keyword.lower() in question_lower:
-                keywords.append(keyword)
+        if question_lower is None:
+            question_lower = question.lower()
+        if matched_phrases is None:
+            matched_phrases = self.rule_engine.match(question_lower)
+        keywords = self.rule_engine.matched_keywords(matched_phrases)
         
         # Extract model names
-        model_patterns = [
-            r'gpt-?3\.?5-?turbo-?0125',
-            r'gpt-?4o-?mini',
-            r'gpt-?4',
-            r'gpt-?3\.?5'
-        ]
-        
-        for pattern in model_patterns:
-            matches = re.findall(pattern, question, flags=re.IGNORECASE)
-            keywords.extend(matches)
+        if 'gpt' in question_lower:
+            for pattern in MODEL_PATTERNS:
+                keywords.extend(pattern.findall(question))
         
         # Extract assignment references
-        assignment_matches = re.findall(r'ga\d+', question, flags=re.IGNORECASE)
-        keywords.extend(assignment_matches)
+        if 'ga' in question_lower:
+            keywords.extend(ASSIGNMENT_RE.findall(question))
         
         return list(set(keywords))  # Remove duplicates
     
-    def classify_question(self, question: str) -> str:
+    def classify_question(self, question: str, matched_phrases: Optional[FrozenSet[str]] = None) -> str:
         """
-        Classify the type of question being asked
+        Classify the type of question being asked (first matching rule in data/rules.json)
         """
-        question_lower = question.lower()
-        
-        # Course information questions
-        if any(phrase in question_lower for phrase in ['what is tds', 'tds full form', 'stands for', 'about tds', 'tools in data science']):
-            return 'course_info'
-        # Grading and deadline questions
-        elif any(word in question_lower for word in ['grade', 'grading', 'deadline', 'due date', 'project 01', 'project 1', 's grade']):
-            return 'grading_system'
-        # Model usage questions
-        elif any(word in question_lower for word in ['gpt', 'model', 'ai-proxy', 'openai']):
-            return 'model_usage'
-        elif any(word in question_lower for word in ['docker', 'podman', 'container']):
-            return 'environment_setup'
-        elif any(word in question_lower for word in ['ga4', 'ga5', 'graded assignment', 'assignment']):
-            return 'assignment_help'
-        elif any(word in question_lower for word in ['dashboard', 'score', 'marks', 'bonus']):
-            return 'grading_system'
-        elif any(word in question_lower for word in ['exam', 'end-term', 'when is']):
-            return 'schedule_inquiry'
-        else:
-            return 'general'
+        if matched_phrases is None:
+            matched_phrases = self.rule_engine.match(question.lower())
+        return self.rule_engine.question_type(matched_phrases)
     
-    def process_image(self, image_b64: str) -> Optional[Dict[str, Any]]:
+    def process_image(self, image_b64: str) -> Dict[str, Any]:
         """
-        Process base64 encoded image and extract basic information
+        Validate a base64 encoded image and extract basic information
+        (size, format, dimensions and content hash) without holding a decoded copy.
+        
+        Raises ImageError (InvalidImageError / ImageTooLargeError) for rejected images.
         """
-        try:
-            # Decode base64 image to get basic info
-            image_data = base64.b64decode(image_b64)
-            
-            return {
-                'size_bytes': len(image_data),
-                'format': 'base64_decoded',
-                'note': 'Image received but detailed processing not available'
-            }
-        except Exception as e:
-            print(f"Error processing image: {e}")
-            return None
\ No newline at end of file
+        return ingest_base64(image_b64).to_dict()
@@ -0,0 +1,433 @@
+import os
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+
+from services.search_index import SearchIndex, INDEXED_FIELDS
+from services.question_processor import ProcessedQuestion
+from services.embeddings import EmbeddingIndex, create_embedder, load_or_build_index
+from services.timing import StageTimings
+
+
+# Default BM25F field weights: titles and curated summaries carry more signal than raw content
+DEFAULT_FIELD_WEIGHTS = {
+    'title': 3.0,
+    'answer_summary': 2.0,
+    'keywords': 2.0,
+    'content': 1.0,
+}
+
+
+# Pool running the two legs of hybrid searches, shared by every HybridRanker since rankers
+# are rebuilt with each knowledge-base snapshot and index segment; created on first use
+_hybrid_pool: Optional[ThreadPoolExecutor] = None
+_hybrid_pool_lock = threading.Lock()
+
+
+def hybrid_pool() -> ThreadPoolExecutor:
+    global _hybrid_pool
+    if _hybrid_pool is None:
+        with _hybrid_pool_lock:
+            if _hybrid_pool is None:
+                _hybrid_pool = ThreadPoolExecutor(thread_name_prefix='hybrid-search')
+    return _hybrid_pool
+
+
+class Ranker:
+    """Base class for ranking engines over a SearchIndex"""
+
+    name = 'base'
+
+    def __init__(self, index: SearchIndex):
+        self.index = index
+
+    @classmethod
+    def from_options(cls, index: SearchIndex, **options) -> 'Ranker':
+        """Build from generic AnswerGenerator options, ignoring those that do not apply"""
+        return cls(index)
+
+    def rank(self, processed_question: ProcessedQuestion, k: int) -> List[Tuple[int, float]]:
+        """Return up to k (doc_id, score) pairs, best first"""
+        raise NotImplementedError
+
+    @staticmethod
+    def top_k(scores: Dict[int, float], k: int) -> List[Tuple[int, float]]:
+        """Sort by score descending, ties keep corpus order"""
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+
+class LegacyRanker(Ranker):
+    """
+    Original scorer: +2 per extracted keyword and +1 per question term longer
+    than 3 characters found as a substring of the document search text.
+    """
+
+    name = 'legacy'
+
+    def rank(self, processed_question: ProcessedQuestion, k: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+
+        # Keyword matches are worth 2 points each
+        for keyword in processed_question.keywords:
+            for doc_id in self.index.matching_docs(keyword):
+                scores[doc_id] = scores.get(doc_id, 0) + 2
+
+        # Question terms are worth 1 point each
+        for term in processed_question.terms:
+            if len(term) > 3:
+                for doc_id in self.index.matching_docs(term):
+                    scores[doc_id] = scores.get(doc_id, 0) + 1
+
+        return self.top_k(scores, k)
+
+
+class BM25Ranker(Ranker):
+    """
+    Okapi BM25 over the concatenation of all indexed fields.
+
+    Length normalisation factors are precomputed per document at construction,
+    so a query only touches the posting lists of its own terms.
+    """
+
+    name = 'bm25'
+
+    def __init__(self, index: SearchIndex, k1: float = 1.2, b: float = 0.75):
+        super().__init__(index)
+        self.k1 = k1
+        self.b = b
+        avg_length = index.avg_doc_length or 1.0
+        self.doc_norms = array('d', [
+            (1 - b) + b * length / avg_length for length in index.doc_lengths
+        ])
+
+    def query_terms(self, processed_question: ProcessedQuestion) -> List[int]:
+        """Term ids of the distinct question tokens present in the vocabulary"""
+        term_ids = []
+        for token in dict.fromkeys(processed_question.tokens):
+            term_id = self.index.term_ids.get(token)
+            if term_id is not None:
+                term_ids.append(term_id)
+        return term_ids
+
+    def term_frequencies(self, token: str) -> Dict[int, float]:
+        """Document term frequency summed across fields"""
+        tfs: Dict[int, float] = {}
+        for field in INDEXED_FIELDS:
+            doc_ids = self.index.postings[field].get(token)
+            if doc_ids is None:
+                continue
+            for doc_id, tf in zip(doc_ids, self.index.frequencies[field][token]):
+                tfs[doc_id] = tfs.get(doc_id, 0.0) + tf
+        return tfs
+
+    def saturate(self, doc_id: int, tf: float) -> float:
+        return tf * (self.k1 + 1) / (tf + self.k1 * self.doc_norms[doc_id])
+
+    def rank(self, processed_question: ProcessedQuestion, k: int) -> List[Tuple[int, float]]:
+        scores: Dict[int, float] = {}
+        for term_id in self.query_terms(processed_question):
+            token = self.index.vocabulary[term_id]
+            idf = self.index.idf[term_id]
+            for doc_id, tf in self.term_frequencies(token).items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * self.saturate(doc_id, tf)
+        return self.top_k(scores, k)
+
+
+class BM25FRanker(BM25Ranker):
+    """
+    BM25F: per-field term frequencies are length-normalised with their own
+    field norms and combined with field weights before saturation.
+    """
+
+    name = 'bm25f'
+
+    def __init__(self, index: SearchIndex, k1: float = 1.2, b: float = 0.75,
+                 field_weights: Optional[Dict[str, float]] = None):
+        super().__init__(index, k1=k1, b=b)
+        self.field_weights = dict(DEFAULT_FIELD_WEIGHTS)
+        if field_weights:
+            self.field_weights.update(field_weights)
+        self.field_norms: Dict[str, array] = {}
+        for field in INDEXED_FIELDS:
+            avg_length = index.avg_field_lengths[field] or 1.0
+            self.field_norms[field] = array('d', [
+                (1 - b) + b * length / avg_length for length in index.field_lengths[field]
+            ])
+
+    def term_frequencies(self, token: str) -> Dict[int, float]:
+        """Weighted, field-normalised pseudo term frequency"""
+        tfs: Dict[int, float] = {}
+        for field in INDEXED_FIELDS:
+            weight = self.field_weights.get(field, 0.0)
+            doc_ids = self.index.postings[field].get(token)
+            if not weight or doc_ids is None:
+                continue
+            norms = self.field_norms[field]
+            for doc_id, tf in zip(doc_ids, self.index.frequencies[field][token]):
+                tfs[doc_id] = tfs.get(doc_id, 0.0) + weight * tf / norms[doc_id]
+        return tfs
+
+    def saturate(self, doc_id: int, tf: float) -> float:
+        return tf * (self.k1 + 1) / (tf + self.k1)
+
+
+class SparseRanker(BM25FRanker):
+    """
+    Vectorized BM25F over a CSR term-document matrix.
+
+    BM25F saturation does not depend on the query, so each (term, doc) impact
+    idf * tf~ * (k1 + 1) / (tf~ + k1) is precomputed at startup into one
+    float32 CSR matrix covering course content and discourse topics. A query is
+    then a sparse dot product with its binary term vector (a bincount over the
+    concatenated rows) followed by an argpartition for the top-k.
+    """
+
+    name = 'sparse'
+
+    def __init__(self, index: SearchIndex, k1: float = 1.2, b: float = 0.75,
+                 field_weights: Optional[Dict[str, float]] = None):
+        super().__init__(index, k1=k1, b=b, field_weights=field_weights)
+        self.num_docs = len(index)
+        self.indptr, self.indices, self.data = self._build_matrix()
+
+    def _build_matrix(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        term_parts, doc_parts, tf_parts = [], [], []
+        for field in INDEXED_FIELDS:
+            weight = self.field_weights.get(field, 0.0)
+            if not weight:
+                continue
+            norms = np.frombuffer(self.field_norms[field], dtype=np.float64)
+            for token, doc_ids in self.index.postings[field].items():
+                doc_ids = np.frombuffer(doc_ids, dtype=np.uint32)
+                tfs = np.frombuffer(self.index.frequencies[field][token], dtype=np.uint32)
+                term_parts.append(np.full(len(doc_ids), self.index.term_ids[token], dtype=np.int64))
+                doc_parts.append(doc_ids.astype(np.int64))
+                tf_parts.append(weight * tfs / norms[doc_ids])
+
+        num_terms = len(self.index.vocabulary)
+        if not term_parts:
+            return np.zeros(num_terms + 1, dtype=np.int64), np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+
+        terms = np.concatenate(term_parts)
+        docs = np.concatenate(doc_parts)
+        tfs = np.concatenate(tf_parts)
+
+        # Merge the per-field entries of each (term, doc) pair
+        keys = terms * max(self.num_docs, 1) + docs
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        tfs = np.add.reduceat(tfs[order], starts)
+        terms = terms[order][starts]
+        docs = docs[order][starts]
+
+        idf = np.frombuffer(self.index.idf, dtype=np.float64)
+        impacts = idf[terms] * tfs * (self.k1 + 1) / (tfs + self.k1)
+
+        indptr = np.zeros(num_terms + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=num_terms), out=indptr[1:])
+        return indptr, docs.astype(np.int32), impacts.astype(np.float32)
+
+    def score_terms(self, term_ids: List[int]) -> np.ndarray:
+        """Dense score vector for a bag of distinct term ids"""
+        if not term_ids:
+            return np.zeros(self.num_docs, dtype=np.float32)
+        rows = [slice(self.indptr[t], self.indptr[t + 1]) for t in term_ids]
+        indices = np.concatenate([self.indices[row] for row in rows])
+        data = np.concatenate([self.data[row] for row in rows])
+        return np.bincount(indices, weights=data, minlength=self.num_docs)
+
+    def rank(self, processed_question: ProcessedQuestion, k: int) -> List[Tuple[int, float]]:
+        scores = self.score_terms(self.query_terms(processed_question))
+        if k <= 0 or not len(scores):
+            return []
+        kth_score = self.kth_largest(scores, k)
+        # Keep every doc tied with the k-th score so ties still break on corpus order
+        candidates = np.flatnonzero(scores >= max(kth_score, np.finfo(scores.dtype).tiny))
+        ranked = sorted(((int(doc_id), float(scores[doc_id])) for doc_id in candidates),
+                        key=lambda item: (-item[1], item[0]))
+        return ranked[:k]
+
+    @staticmethod
+    def kth_largest(scores: np.ndarray, k: int) -> float:
+        """k-th largest score; repeated argmax beats argpartition for the small k used here"""
+        if k >= len(scores):
+            return float(scores.min())
+        if k > 8:
+            return float(np.partition(scores, len(scores) - k)[len(scores) - k])
+        masked = []
+        for _ in range(k):
+            doc_id = int(np.argmax(scores))
+            masked.append((doc_id, scores[doc_id]))
+            scores[doc_id] = -np.inf
+        kth_score = float(masked[-1][1])
+        for doc_id, score in masked:
+            scores[doc_id] = score
+        return kth_score
+
+
+class SemanticRanker(Ranker):
+    """
+    Nearest-neighbour search over precomputed document embeddings. The only
+    embedding call at query time is for the question itself.
+    """
+
+    name = 'semantic'
+
+    def __init__(self, index: SearchIndex, embedder=None, embedding_index: Optional[EmbeddingIndex] = None,
+                 vector_search: Optional[str] = None, nprobe: int = 8, min_similarity: float = 0.2):
+        super().__init__(index)
+        self.embedder = create_embedder(embedder)
+        self.embedding_index = embedding_index or load_or_build_index(index, self.embedder)
+        # 'exact' brute-force matmul or 'ivf' approximate search (VECTOR_SEARCH env var)
+        self.vector_search = (vector_search or os.getenv('VECTOR_SEARCH', 'exact')).lower()
+        self.nprobe = nprobe
+        self.min_similarity = min_similarity
+
+    @classmethod
+    def from_options(cls, index: SearchIndex, **options) -> 'SemanticRanker':
+        return cls(index, embedder=options.get('embedder'), vector_search=options.get('vector_search'))
+
+    def rank(self, processed_question: ProcessedQuestion, k: int) -> List[Tuple[int, float]]:
+        if self.embedding_index is None:
+            return []
+        text = processed_question.cleaned_question
+        if processed_question.image_text:
+            text = f"{text} {processed_question.image_text}"
+        query = self.embedder.embed([text])[0]
+        hits = self.embedding_index.search(query, k, mode=self.vector_search, nprobe=self.nprobe)
+        return [(doc_id, score) for doc_id, score in hits if score >= self.min_similarity]
+
+
+class HybridRanker(Ranker):
+    """
+    Hybrid lexical + semantic retrieval.
+
+    Both engines run in parallel over the same documents and return a deeper
+    candidate list. The lists are fused with reciprocal-rank fusion or a
+    weighted sum of min-max normalised scores, walking them in lockstep and
+    stopping as soon as no unseen or partially seen document can still enter
+    the top-k.
+    """
+
+    name = 'hybrid'
+
+    def __init__(self, index: SearchIndex, lexical: Ranker, semantic: Ranker, fusion: Optional[str] = None,
+                 lexical_weight: float = 1.0, semantic_weight: float = 1.0, rrf_k: int = 60, depth: int = 50):
+        super().__init__(index)
+        self.lexical = lexical
+        self.semantic = semantic
+        # 'rrf' or 'weighted' (HYBRID_FUSION env var)
+        self.fusion = (fusion or os.getenv('HYBRID_FUSION', 'rrf')).lower()
+        self.lexical_weight = lexical_weight
+        self.semantic_weight = semantic_weight
+        self.rrf_k = rrf_k
+        self.depth = depth
+
+    @classmethod
+    def from_options(cls, index: SearchIndex, **options) -> 'HybridRanker':
+        lexical = create_ranker(index, options.get('lexical_ranker') or os.getenv('HYBRID_LEXICAL', SparseRanker.name))
+        semantic = SemanticRanker.from_options(index, **options)
+        return cls(index, lexical, semantic)
+
+    def _timed_rank(self, stage: str, ranker: Ranker, processed_question: ProcessedQuestion,
+                    depth: int, timings: StageTimings) -> List[Tuple[int, float]]:
+        with timings.measure(stage):
+            return ranker.rank(processed_question, depth)
+
+    def _contribution(self, fusion: str, ranked: List[Tuple[int, float]], position: int, weight: float) -> float:
+        """Fused score a document at ``position`` of a ranked list receives (0 past the end)"""
+        if position >= len(ranked) or not weight:
+            return 0.0
+        if fusion == 'rrf':
+            return weight / (self.rrf_k + position + 1)
+        best, worst = ranked[0][1], ranked[-1][1]
+        if best == worst:
+            return weight
+        return weight * (ranked[position][1] - worst) / (best - worst)
+
+    def fuse(self, ranked_lists: List[List[Tuple[int, float]]], weights: List[float], k: int,
+             fusion: str) -> Tuple[List[Tuple[int, float]], int]:
+        """Fuse ranked lists; returns the top-k and the depth at which fusion stopped"""
+        if fusion not in ('rrf', 'weighted'):
+            raise ValueError(f"Unknown fusion method '{fusion}'. Use 'rrf' or 'weighted'")
+        fused: Dict[int, float] = {}
+        seen_in: Dict[int, set] = {}
+        max_depth = max((len(ranked) for ranked in ranked_lists), default=0)
+        depth = 0
+        while depth < max_depth:
+            for list_id, (ranked, weight) in enumerate(zip(ranked_lists, weights)):
+                if depth < len(ranked):
+                    doc_id = ranked[depth][0]
+                    fused[doc_id] = fused.get(doc_id, 0.0) + self._contribution(fusion, ranked, depth, weight)
+                    seen_in.setdefault(doc_id, set()).add(list_id)
+            depth += 1
+
+            if len(fused) < k:
+                continue
+            # Largest contribution any list can still hand out below the current depth
+            remaining = [self._contribution(fusion, ranked, depth, weight) for ranked, weight in zip(ranked_lists, weights)]
+            top = self.top_k(fused, k)
+            kth_score = top[-1][1]
+            if sum(remaining) > kth_score:
+                continue
+            top_ids = {doc_id for doc_id, _ in top}
+            if all(score + sum(r for list_id, r in enumerate(remaining) if list_id not in seen_in[doc_id]) <= kth_score
+                   for doc_id, score in fused.items() if doc_id not in top_ids):
+                break
+
+        # The top-k set is final; complete the scores of members not yet reached in every list
+        top = self.top_k(fused, k)
+        for list_id, (ranked, weight) in enumerate(zip(ranked_lists, weights)):
+            missing = {doc_id for doc_id, _ in top if list_id not in seen_in[doc_id]}
+            for position in range(depth, len(ranked)):
+                if not missing:
+                    break
+                doc_id = ranked[position][0]
+                if doc_id in missing:
+                    fused[doc_id] += self._contribution(fusion, ranked, position, weight)
+                    missing.discard(doc_id)
+        return self.top_k({doc_id: fused[doc_id] for doc_id, _ in top}, k), depth
+
+    def rank(self, processed_question: ProcessedQuestion, k: int, fusion: Optional[str] = None,
+             lexical_weight: Optional[float] = None, semantic_weight: Optional[float] = None,
+             timings: Optional[StageTimings] = None) -> List[Tuple[int, float]]:
+        timings = timings if timings is not None else StageTimings()
+        depth = max(self.depth, k * 10)
+        pool = hybrid_pool()
+        lexical_future = pool.submit(self._timed_rank, 'search.lexical', self.lexical, processed_question, depth, timings)
+        semantic_future = pool.submit(self._timed_rank, 'search.semantic', self.semantic, processed_question, depth, timings)
+        ranked_lists = [lexical_future.result(), semantic_future.result()]
+
+        weights = [
+            self.lexical_weight if lexical_weight is None else lexical_weight,
+            self.semantic_weight if semantic_weight is None else semantic_weight,
+        ]
+        with timings.measure('search.fusion'):
+            fused, _ = self.fuse(ranked_lists, weights, k, (fusion or self.fusion).lower())
+        return fused
+
+
+RANKERS = {
+    LegacyRanker.name: LegacyRanker,
+    BM25Ranker.name: BM25Ranker,
+    BM25FRanker.name: BM25FRanker,
+    SparseRanker.name: SparseRanker,
+    SemanticRanker.name: SemanticRanker,
+    HybridRanker.name: HybridRanker,
+}
+
+
+def create_ranker(index: SearchIndex, name: Optional[str] = None, **options) -> Ranker:
+    """
+    Build the ranking engine selected by name, or by the SEARCH_RANKER
+    environment variable (default: legacy). Options such as ``embedder`` and
+    ``vector_search`` are passed to engines that use them.
+    """
+    name = (name or os.getenv('SEARCH_RANKER', LegacyRanker.name)).lower()
+    if name not in RANKERS:
+        raise ValueError(f"Unknown ranker '{name}'. Available: {', '.join(sorted(RANKERS))}")
+    return RANKERS[name].from_options(index, **options)
@@ -0,0 +1,143 @@
+import json
+import os
+from collections import deque
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Iterable, Set, FrozenSet, Tuple
+
+
+# Resolved from this file, so the app can start from any working directory
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'rules.json')
+
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher. All patterns are found in one pass over
+    the text, with the same semantics as ``pattern in text`` for each pattern.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self.patterns: List[str] = list(dict.fromkeys(patterns))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+
+        outputs: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                node = next_node
+            outputs[node].append(pattern_id)
+
+        # Breadth-first construction of failure links, merging outputs along them.
+        # Failure transitions are then folded into each node's table (a DFA), so
+        # matching does one dict lookup per character.
+        delta: List[Dict[str, int]] = [dict(self._goto[0])]
+        delta.extend({} for _ in range(1, len(self._goto)))
+        queue = deque(self._goto[0].values())
+        order = []
+        while queue:
+            node = queue.popleft()
+            order.append(node)
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                outputs[child].extend(outputs[self._fail[child]])
+        for node in order:
+            delta[node] = {**delta[self._fail[node]], **self._goto[node]}
+        self._delta = delta
+        self._output = [tuple(ids) for ids in outputs]
+
+    def find_all(self, text: str) -> Set[str]:
+        """Return every pattern that occurs in text"""
+        delta, output = self._delta, self._output
+        root = delta[0]
+        found: Set[int] = set()
+        node = 0
+        for char in text:
+            node = delta[node].get(char, 0) if node else root.get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return {self.patterns[pattern_id] for pattern_id in found}
+
+
+class RuleSet:
+    """
+    Ordered phrase rules. A rule fires when every one of its phrase groups has
+    at least one matched phrase; the first firing rule wins.
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules: List[Tuple[str, Tuple[FrozenSet[str], ...]]] = [
+            (rule['intent'], tuple(frozenset(phrase.lower() for phrase in group) for group in rule['all']))
+            for rule in rules
+        ]
+
+        # phrase -> indexes of the rules that mention it, so only touched rules are checked
+        self._rules_by_phrase: Dict[str, List[int]] = {}
+        for rule_id, (_, groups) in enumerate(self.rules):
+            for phrase in set().union(*groups):
+                self._rules_by_phrase.setdefault(phrase, []).append(rule_id)
+
+    @property
+    def phrases(self) -> Set[str]:
+        return set(self._rules_by_phrase)
+
+    def first_match(self, found: Set[str]) -> Optional[str]:
+        candidates = set()
+        for phrase in found:
+            candidates.update(self._rules_by_phrase.get(phrase, ()))
+        for rule_id in sorted(candidates):
+            intent, groups = self.rules[rule_id]
+            if len(groups) == 1 or all(not group.isdisjoint(found) for group in groups):
+                return intent
+        return None
+
+
+class RuleEngine:
+    """
+    Predefined-answer, question-type and keyword rules compiled into a single
+    Aho-Corasick automaton, so one scan of the lowercased question serves all three.
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.answer_rules = RuleSet(config.get('answer_rules', []))
+        self.question_types = RuleSet(config.get('question_types', []))
+        self.default_question_type = config.get('default_question_type', 'general')
+        self.keywords: List[str] = [keyword.lower() for keyword in config.get('keywords', [])]
+        self.automaton = AhoCorasick(sorted(
+            self.answer_rules.phrases | self.question_types.phrases | set(self.keywords)
+        ))
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_RULES_PATH) -> 'RuleEngine':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def match(self, question_lower: str) -> FrozenSet[str]:
+        """All rule phrases found in the lowercased question"""
+        return frozenset(self.automaton.find_all(question_lower))
+
+    def answer_intent(self, found: Set[str]) -> Optional[str]:
+        return self.answer_rules.first_match(found)
+
+    def question_type(self, found: Set[str]) -> str:
+        return self.question_types.first_match(found) or self.default_question_type
+
+    def matched_keywords(self, found: Set[str]) -> List[str]:
+        return [keyword for keyword in self.keywords if keyword in found]
+
+
+@lru_cache(maxsize=None)
+def load_rule_engine(path: str = DEFAULT_RULES_PATH) -> RuleEngine:
+    """Compile the rules file once per process"""
+    return RuleEngine.load(path)
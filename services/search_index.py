@@ -0,0 +1,350 @@
+import math
+import re
+from array import array
+from collections import Counter, defaultdict
+from collections.abc import Mapping
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+
+# Token pattern used for posting lists: runs of lowercase letters and digits
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Fields that get their own posting lists
+INDEXED_FIELDS = ('title', 'answer_summary', 'keywords', 'content')
+
+# Field an answer is quoted from, per document type; it is also split into passages
+ANSWER_FIELDS = {'course_content': 'content', 'discourse': 'answer_summary'}
+
+# Target passage size in characters; a single longer sentence becomes a passage of its own
+PASSAGE_CHARS = 400
+
+PARAGRAPH_BREAK_RE = re.compile(r'\n\s*\n')
+SENTENCE_BREAK_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Split lowercased text into alphanumeric tokens"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def field_text(data: Dict[str, Any], field: str) -> str:
+    """Return the raw text of a document field ('keywords' is joined with spaces)"""
+    if field == 'keywords':
+        return ' '.join(data.get('keywords', []))
+    return data.get(field, '') or ''
+
+
+def answer_text(document: Dict[str, Any]) -> str:
+    """Text of the document's answer field (content for course pages, answer_summary for topics)"""
+    return field_text(document['data'], ANSWER_FIELDS[document['type']])
+
+
+def _stripped_spans(text: str, separator: re.Pattern, start: int, end: int) -> List[Tuple[int, int]]:
+    """(start, end) offsets of the non-blank pieces of text[start:end] between separator matches"""
+    spans = []
+    for match in [*separator.finditer(text, start, end), None]:
+        piece_end = match.start() if match else end
+        left, right = start, piece_end
+        while left < right and text[left].isspace():
+            left += 1
+        while right > left and text[right - 1].isspace():
+            right -= 1
+        if left < right:
+            spans.append((left, right))
+        if match:
+            start = match.end()
+    return spans
+
+
+def sentence_spans(text: str, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int]]:
+    """Offsets of the sentences (or lines) in text[start:end]"""
+    return _stripped_spans(text, SENTENCE_BREAK_RE, start, len(text) if end is None else end)
+
+
+def passage_spans(text: str, max_chars: int = PASSAGE_CHARS) -> List[Tuple[int, int]]:
+    """
+    Split text into passages of at most max_chars: consecutive paragraphs are
+    packed together while they fit, longer paragraphs are split between
+    sentences. Passages never break a sentence, so one longer than max_chars
+    is a passage by itself. Returns character offsets into text.
+    """
+    passages: List[Tuple[int, int]] = []
+    for units in (
+        [paragraph] if paragraph[1] - paragraph[0] <= max_chars else sentence_spans(text, *paragraph)
+        for paragraph in _stripped_spans(text, PARAGRAPH_BREAK_RE, 0, len(text))
+    ):
+        for unit_start, unit_end in units:
+            if passages and unit_end - passages[-1][0] <= max_chars:
+                passages[-1] = (passages[-1][0], unit_end)
+            else:
+                passages.append((unit_start, unit_end))
+    return passages
+
+
+class SearchIndex:
+    """
+    Token-level inverted index over course content and discourse topics.
+
+    Documents are numbered in the same order the legacy linear scan visited
+    them (course content first, then discourse topics), so sorting by doc id
+    reproduces the legacy tie-breaking.
+
+    Each document's answer field is also split into passages (see
+    passage_spans), numbered consecutively across documents, with posting
+    lists of their own so a query can score the passages of a few documents.
+    """
+
+    def __init__(self, course_content: List[Dict[str, Any]], discourse_posts: List[Dict[str, Any]]):
+        self.documents: List[Dict[str, Any]] = []
+        for content in course_content:
+            self.documents.append({'type': 'course_content', 'data': content})
+        for post_topic in discourse_posts:
+            self.documents.append({'type': 'discourse', 'data': post_topic})
+
+        # field -> token -> sorted doc ids, with the matching term frequencies alongside
+        postings: Dict[str, Dict[str, array]] = {field: defaultdict(lambda: array('I')) for field in INDEXED_FIELDS}
+        frequencies: Dict[str, Dict[str, array]] = {field: defaultdict(lambda: array('I')) for field in INDEXED_FIELDS}
+        # field -> token count per document
+        self.field_lengths: Dict[str, array] = {field: array('I') for field in INDEXED_FIELDS}
+        # Lowercased text the legacy scorer matched against, built once
+        self.search_texts: List[str] = []
+        # Passages of document d are ids passage_offsets[d]:passage_offsets[d + 1]; passage p covers
+        # answer-text characters passage_bounds[2p]:passage_bounds[2p + 1]
+        self.passage_offsets = array('I', [0])
+        self.passage_bounds = array('I')
+        self.passage_lengths = array('I')
+        passage_postings: Dict[str, array] = defaultdict(lambda: array('I'))
+        passage_frequencies: Dict[str, array] = defaultdict(lambda: array('I'))
+
+        for doc_id, doc in enumerate(self.documents):
+            data = doc['data']
+            for field in INDEXED_FIELDS:
+                tokens = tokenize(field_text(data, field))
+                self.field_lengths[field].append(len(tokens))
+                for token, count in Counter(tokens).items():
+                    postings[field][token].append(doc_id)
+                    frequencies[field][token].append(count)
+            self.search_texts.append(self._legacy_search_text(doc))
+
+            text = answer_text(doc)
+            for start, end in passage_spans(text):
+                passage_id = len(self.passage_lengths)
+                tokens = tokenize(text[start:end])
+                self.passage_bounds.extend((start, end))
+                self.passage_lengths.append(len(tokens))
+                for token, count in Counter(tokens).items():
+                    passage_postings[token].append(passage_id)
+                    passage_frequencies[token].append(count)
+            self.passage_offsets.append(len(self.passage_lengths))
+
+        self.passage_postings: Dict[str, array] = dict(passage_postings)
+        self.passage_frequencies: Dict[str, array] = dict(passage_frequencies)
+        self.postings: Dict[str, Dict[str, array]] = {field: dict(tokens) for field, tokens in postings.items()}
+        self.frequencies: Dict[str, Dict[str, array]] = {field: dict(tokens) for field, tokens in frequencies.items()}
+        self.vocabulary: List[str] = sorted({token for tokens in self.postings.values() for token in tokens})
+
+        self._compute_term_statistics()
+        self._trigram_map: Optional[Dict[str, Set[str]]] = None
+        self._substring_cache: Dict[str, List[int]] = {}
+
+    @classmethod
+    def from_arrays(cls, documents: Sequence[Dict[str, Any]], vocabulary: List[str],
+                    postings: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]],
+                    field_lengths: Dict[str, np.ndarray], doc_freqs: np.ndarray,
+                    search_texts: Sequence[str],
+                    passages: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+                    ) -> 'SearchIndex':
+        """
+        Index over precomputed arrays (e.g. a compiled knowledge-base file).
+
+        postings maps each field to CSR arrays over term ids: (indptr, doc ids,
+        term frequencies). passages holds (passage offsets, passage bounds,
+        indptr, passage ids, term frequencies, passage lengths), the passage
+        posting lists laid out the same way. Nothing is tokenized; posting
+        lists stay views.
+        """
+        index = cls.__new__(cls)
+        index.documents = documents
+        index.vocabulary = vocabulary
+        index.term_ids = {token: term_id for term_id, token in enumerate(vocabulary)}
+        index.postings = {}
+        index.frequencies = {}
+        for field, (indptr, doc_ids, tfs) in postings.items():
+            index.postings[field] = PostingsView(index.term_ids, vocabulary, indptr, doc_ids)
+            index.frequencies[field] = PostingsView(index.term_ids, vocabulary, indptr, tfs)
+        index.field_lengths = field_lengths
+        index.search_texts = search_texts
+        offsets, bounds, indptr, passage_ids, tfs, lengths = passages
+        index.passage_offsets = offsets
+        index.passage_bounds = bounds
+        index.passage_lengths = lengths
+        index.passage_postings = PostingsView(index.term_ids, vocabulary, indptr, passage_ids)
+        index.passage_frequencies = PostingsView(index.term_ids, vocabulary, indptr, tfs)
+        index.avg_passage_length = float(lengths.sum()) / len(lengths) if len(lengths) else 0.0
+
+        num_docs = len(documents)
+        index.doc_lengths = sum(lengths.astype(np.int64) for lengths in field_lengths.values()) \
+            if field_lengths else np.zeros(num_docs, dtype=np.int64)
+        index.avg_field_lengths = {field: (float(lengths.sum()) / num_docs) if num_docs else 0.0
+                                   for field, lengths in field_lengths.items()}
+        index.avg_doc_length = (float(index.doc_lengths.sum()) / num_docs) if num_docs else 0.0
+        index.doc_freqs = doc_freqs
+        df = doc_freqs.astype(np.float64)
+        index.idf = np.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+        index._trigram_map = None
+        index._substring_cache = {}
+        return index
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @property
+    def _trigrams(self) -> Dict[str, Set[str]]:
+        """Trigram -> vocabulary tokens, used to resolve substring lookups without scanning the vocabulary"""
+        if self._trigram_map is None:
+            trigrams: Dict[str, Set[str]] = defaultdict(set)
+            for token in self.vocabulary:
+                for i in range(len(token) - 2):
+                    trigrams[token[i:i + 3]].add(token)
+            self._trigram_map = dict(trigrams)
+        return self._trigram_map
+
+    def _compute_term_statistics(self):
+        """Precompute document lengths, document frequencies and IDF for ranking"""
+        num_docs = len(self.documents)
+        self.doc_lengths = array('I', [0] * num_docs)
+        self.avg_field_lengths: Dict[str, float] = {}
+        for field in INDEXED_FIELDS:
+            lengths = self.field_lengths[field]
+            self.avg_field_lengths[field] = (sum(lengths) / num_docs) if num_docs else 0.0
+            for doc_id, length in enumerate(lengths):
+                self.doc_lengths[doc_id] += length
+        self.avg_doc_length = (sum(self.doc_lengths) / num_docs) if num_docs else 0.0
+        num_passages = len(self.passage_lengths)
+        self.avg_passage_length = (sum(self.passage_lengths) / num_passages) if num_passages else 0.0
+
+        # Vocabulary position doubles as term id for the statistic arrays
+        self.term_ids: Dict[str, int] = {token: term_id for term_id, token in enumerate(self.vocabulary)}
+        self.doc_freqs = array('I', [0] * len(self.vocabulary))
+        self.idf = array('d', [0.0] * len(self.vocabulary))
+        for term_id, token in enumerate(self.vocabulary):
+            df = len(self.docs_with_token(token))
+            self.doc_freqs[term_id] = df
+            self.idf[term_id] = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+
+    def use_collection_statistics(self, num_docs: int, doc_freq: Callable[[str], int],
+                                  avg_field_lengths: Dict[str, float], avg_doc_length: float):
+        """
+        Score with statistics of a larger collection this index is one segment
+        of: IDF from the collection-wide document count and frequencies, length
+        normalisation against the collection averages. Call before building rankers.
+        """
+        self.idf = array('d', [
+            math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            for df in (doc_freq(token) for token in self.vocabulary)
+        ])
+        self.avg_field_lengths = dict(avg_field_lengths)
+        self.avg_doc_length = avg_doc_length
+
+    def passages(self, doc_id: int) -> range:
+        """Ids of the document's passages"""
+        return range(int(self.passage_offsets[doc_id]), int(self.passage_offsets[doc_id + 1]))
+
+    def passage_span(self, passage_id: int) -> Tuple[int, int]:
+        """(start, end) of the passage within its document's answer text"""
+        return int(self.passage_bounds[2 * passage_id]), int(self.passage_bounds[2 * passage_id + 1])
+
+    def locate(self, doc_id: int) -> Tuple['SearchIndex', int]:
+        """The index holding the document and its id there (itself, for a single index)"""
+        return self, doc_id
+
+    @staticmethod
+    def _legacy_search_text(doc: Dict[str, Any]) -> str:
+        data = doc['data']
+        if doc['type'] == 'course_content':
+            return (data.get('content', '') + ' ' + ' '.join(data.get('keywords', []))).lower()
+        title_text = data.get('title', '').lower()
+        summary_text = data.get('answer_summary', '').lower()
+        keywords_text = ' '.join(data.get('keywords', [])).lower()
+        return f"{title_text} {summary_text} {keywords_text}"
+
+    def docs_with_token(self, token: str) -> Set[int]:
+        """Doc ids that contain the exact token in any indexed field"""
+        docs: Set[int] = set()
+        for tokens in self.postings.values():
+            docs.update(tokens.get(token, ()))
+        return docs
+
+    def _vocabulary_containing(self, fragment: str) -> Iterable[str]:
+        if len(fragment) < 3:
+            return [token for token in self.vocabulary if fragment in token]
+        grams = [fragment[i:i + 3] for i in range(len(fragment) - 2)]
+        candidates = None
+        for gram in sorted(set(grams), key=lambda g: len(self._trigrams.get(g, ()))):
+            tokens = self._trigrams.get(gram)
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates & tokens
+        return [token for token in candidates if fragment in token]
+
+    def candidates(self, term: str) -> List[int]:
+        """
+        Doc ids whose search text may contain ``term`` as a substring.
+
+        Any occurrence of the term contains its longest alphanumeric run inside a
+        single indexed token, so the posting lists of vocabulary tokens containing
+        that run form a superset of the matches. Terms without an alphanumeric run
+        fall back to every document.
+        """
+        term = term.lower()
+        cached = self._substring_cache.get(term)
+        if cached is not None:
+            return cached
+
+        fragments = TOKEN_RE.findall(term)
+        if not fragments:
+            result = list(range(len(self.documents)))
+        else:
+            fragment = max(fragments, key=len)
+            docs: Set[int] = set()
+            for token in self._vocabulary_containing(fragment):
+                docs |= self.docs_with_token(token)
+            result = sorted(docs)
+
+        if len(self._substring_cache) > 4096:
+            self._substring_cache.clear()
+        self._substring_cache[term] = result
+        return result
+
+    def matching_docs(self, term: str) -> List[int]:
+        """Doc ids whose legacy search text contains ``term`` as a substring"""
+        term = term.lower()
+        return [doc_id for doc_id in self.candidates(term) if term in self.search_texts[doc_id]]
+
+
+class PostingsView(Mapping):
+    """Read-only token -> posting list mapping over CSR arrays indexed by term id"""
+
+    def __init__(self, term_ids: Dict[str, int], vocabulary: List[str], indptr: np.ndarray, values: np.ndarray):
+        self._term_ids = term_ids
+        self._vocabulary = vocabulary
+        self._indptr = indptr
+        self._values = values
+
+    def __getitem__(self, token: str) -> np.ndarray:
+        term_id = self._term_ids.get(token)
+        if term_id is None:
+            raise KeyError(token)
+        start, end = int(self._indptr[term_id]), int(self._indptr[term_id + 1])
+        if start == end:
+            raise KeyError(token)
+        return self._values[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        non_empty = np.flatnonzero(np.diff(self._indptr))
+        return (self._vocabulary[term_id] for term_id in non_empty.tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(np.diff(self._indptr)))
@@ -0,0 +1,357 @@
+import bisect
+import os
+from collections.abc import Sequence as SequenceABC
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.embeddings import EmbeddingIndex, document_key
+from services.question_processor import ProcessedQuestion
+from services.ranking import Ranker, HybridRanker
+from services.search_index import SearchIndex
+
+
+# Compaction thresholds (see SegmentedIndex.compaction_needed)
+MAX_SEGMENTS = int(os.getenv('KB_MAX_SEGMENTS', 8))
+COMPACT_DELETED_RATIO = float(os.getenv('KB_COMPACT_DELETED_RATIO', 0.2))
+COMPACT_DELTA_RATIO = float(os.getenv('KB_COMPACT_DELTA_RATIO', 0.25))
+
+# Builds the leaf rankers of a segment, optionally reusing already computed vectors
+LeafBuilder = Callable[[SearchIndex, Optional[EmbeddingIndex]], Dict[str, Ranker]]
+
+
+def topic_key(topic_id: Any) -> str:
+    """The document_key() of a discourse topic with this id"""
+    return f"discourse:{topic_id}"
+
+
+def average_lengths(indexes: Sequence[SearchIndex]) -> Tuple[Dict[str, float], float]:
+    """Per-field and whole-document average token counts across indexes"""
+    num_docs = sum(len(index) for index in indexes)
+    if not num_docs:
+        return {}, 0.0
+    avg_field_lengths = {
+        field: sum(index.avg_field_lengths[field] * len(index) for index in indexes) / num_docs
+        for field in indexes[0].avg_field_lengths
+    }
+    avg_doc_length = sum(index.avg_doc_length * len(index) for index in indexes) / num_docs
+    return avg_field_lengths, avg_doc_length
+
+
+def leaf_rankers(ranker: Ranker) -> Dict[str, Ranker]:
+    """Per-segment engines of a ranker: a hybrid splits into its lexical and semantic halves"""
+    if isinstance(ranker, HybridRanker):
+        return {'lexical': ranker.lexical, 'semantic': ranker.semantic}
+    return {ranker.name: ranker}
+
+
+class IndexSegment:
+    """One immutable SearchIndex, its leaf rankers and the global id of its first document"""
+
+    __slots__ = ('index', 'rankers', 'offset')
+
+    def __init__(self, index: SearchIndex, rankers: Dict[str, Ranker], offset: int = 0):
+        self.index = index
+        self.rankers = rankers
+        self.offset = offset
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def embedding_index(self) -> Optional[EmbeddingIndex]:
+        semantic = self.rankers.get('semantic')
+        return getattr(semantic, 'embedding_index', None)
+
+
+class SegmentedDocuments(SequenceABC):
+    """Global doc id -> document across segments"""
+
+    def __init__(self, segmented: 'SegmentedIndex'):
+        self._segmented = segmented
+
+    def __len__(self) -> int:
+        return self._segmented.total_documents
+
+    def __getitem__(self, doc_id: int) -> Dict[str, Any]:
+        segment = self._segmented.segment_of(doc_id)
+        return segment.index.documents[doc_id - segment.offset]
+
+
+class LiveDiscoursePosts(SequenceABC):
+    """
+    Live discourse topics of a SegmentedIndex. The length is known up front;
+    the list itself is only built on first access, so snapshots swapped in by
+    single-topic updates do not decode every stored document.
+    """
+
+    def __init__(self, segmented: 'SegmentedIndex'):
+        self._segmented = segmented
+        self._posts: Optional[List[Dict[str, Any]]] = None
+
+    def __len__(self) -> int:
+        return self._segmented.live_discourse
+
+    def _materialized(self) -> List[Dict[str, Any]]:
+        if self._posts is None:
+            self._posts = self._segmented.discourse_posts()
+        return self._posts
+
+    def __getitem__(self, position):
+        return self._materialized()[position]
+
+    def __iter__(self):
+        return iter(self._materialized())
+
+
+class SegmentedIndex:
+    """
+    Knowledge-base index made of immutable segments plus deletion tombstones,
+    in the style of a log-structured (Lucene-like) index.
+
+    The base segment is the index built at load time. Every upsert adds a small
+    delta segment indexing (and embedding) only the new topics, and tombstones
+    the previous version of each topic, keyed by the topic ``id``. Deletes only
+    add tombstones. Nothing is modified in place: each operation returns a new
+    SegmentedIndex sharing the untouched segments, so requests holding the old
+    one are unaffected.
+
+    Delta segments score with the collection statistics (document count,
+    document frequencies, average lengths) current when they were written;
+    older segments keep theirs until compaction merges segments and drops
+    tombstoned documents, which also restores exact statistics.
+
+    Global doc ids follow segment order, so topics added later sort after
+    the corpus they were added to when scores tie.
+    """
+
+    def __init__(self, segments: Sequence[IndexSegment], deleted: FrozenSet[int] = frozenset(),
+                 live_keys: Optional[Dict[str, int]] = None, live_discourse: Optional[int] = None):
+        offset = 0
+        self.segments: Tuple[IndexSegment, ...] = tuple(segments)
+        for segment in self.segments:
+            segment.offset = offset
+            offset += len(segment)
+        self.total_documents = offset
+        self.deleted = deleted
+        self._offsets = [segment.offset for segment in self.segments]
+        self._deleted_counts = [0] * len(self.segments)
+        for doc_id in deleted:
+            self._deleted_counts[bisect.bisect_right(self._offsets, doc_id) - 1] += 1
+        self.documents = SegmentedDocuments(self)
+        # Topic key -> live global doc id, and the number of live topics; updates carry both over
+        if live_keys is None or live_discourse is None:
+            live_keys, live_discourse = {}, 0
+            for doc_id, document in self.live_documents():
+                if document['type'] == 'discourse':
+                    live_keys[document_key(document)] = doc_id
+                    live_discourse += 1
+        self.live_keys = live_keys
+        self.live_discourse = live_discourse
+
+    @classmethod
+    def from_index(cls, index: SearchIndex, ranker: Ranker) -> 'SegmentedIndex':
+        """Wrap a freshly built index and its ranker as the single base segment"""
+        return cls([IndexSegment(index, leaf_rankers(ranker))])
+
+    def __len__(self) -> int:
+        """Live (not deleted) documents"""
+        return self.total_documents - len(self.deleted)
+
+    def segment_of(self, doc_id: int) -> IndexSegment:
+        if not 0 <= doc_id < self.total_documents:
+            raise IndexError(doc_id)
+        return self.segments[bisect.bisect_right(self._offsets, doc_id) - 1]
+
+    def locate(self, doc_id: int) -> Tuple[SearchIndex, int]:
+        """The segment index holding the document and its id there"""
+        segment = self.segment_of(doc_id)
+        return segment.index, doc_id - segment.offset
+
+    def deleted_in(self, position: int) -> int:
+        """Tombstones in the segment at this position"""
+        return self._deleted_counts[position]
+
+    def live_documents(self, segments: Optional[Sequence[IndexSegment]] = None) -> List[Tuple[int, Dict[str, Any]]]:
+        """(global id, document) of every live document in the given segments, in id order"""
+        live = []
+        for segment in segments if segments is not None else self.segments:
+            for local_id in range(len(segment)):
+                doc_id = segment.offset + local_id
+                if doc_id not in self.deleted:
+                    live.append((doc_id, segment.index.documents[local_id]))
+        return live
+
+    def course_content(self) -> List[Dict[str, Any]]:
+        return [document['data'] for _, document in self.live_documents() if document['type'] == 'course_content']
+
+    def discourse_posts(self) -> List[Dict[str, Any]]:
+        return [document['data'] for _, document in self.live_documents() if document['type'] == 'discourse']
+
+    # Collection statistics over every stored document, tombstoned ones included
+
+    def _doc_freq_with(self, index: SearchIndex) -> Callable[[str], int]:
+        """Document frequency across these segments plus ``index``"""
+        return lambda token: self.doc_freq(token) + int(index.doc_freqs[index.term_ids[token]])
+
+    def doc_freq(self, token: str) -> int:
+        total = 0
+        for segment in self.segments:
+            term_id = segment.index.term_ids.get(token)
+            if term_id is not None:
+                total += int(segment.index.doc_freqs[term_id])
+        return total
+
+    # Copy-on-write updates
+
+    def upsert(self, topics: Iterable[Dict[str, Any]], build_leaves: LeafBuilder) -> 'SegmentedIndex':
+        """Add topics as a new delta segment, replacing earlier versions with the same id"""
+        # The last occurrence of a repeated id wins
+        latest: Dict[str, Dict[str, Any]] = {}
+        for topic in topics:
+            if topic.get('id') is None:
+                raise ValueError("Discourse topics need an 'id' to be upserted")
+            key = topic_key(topic['id'])
+            latest.pop(key, None)
+            latest[key] = topic
+        if not latest:
+            return self
+
+        delta = SearchIndex([], list(latest.values()))
+        delta.use_collection_statistics(self.total_documents + len(delta), self._doc_freq_with(delta),
+                                        *average_lengths([segment.index for segment in self.segments] + [delta]))
+        segment = IndexSegment(delta, build_leaves(delta, None))
+
+        deleted = set(self.deleted)
+        live_keys = dict(self.live_keys)
+        live_discourse = self.live_discourse + len(latest)
+        for local_id, key in enumerate(latest):
+            previous = live_keys.get(key)
+            if previous is not None:
+                deleted.add(previous)
+                live_discourse -= 1
+            live_keys[key] = self.total_documents + local_id
+        return SegmentedIndex(self.segments + (segment,), frozenset(deleted), live_keys, live_discourse)
+
+    def delete(self, topic_ids: Iterable[Any]) -> 'SegmentedIndex':
+        """Tombstone the topics with these ids; unknown ids are ignored"""
+        deleted = set(self.deleted)
+        live_keys = dict(self.live_keys)
+        for topic_id in topic_ids:
+            doc_id = live_keys.pop(topic_key(topic_id), None)
+            if doc_id is not None:
+                deleted.add(doc_id)
+        if len(deleted) == len(self.deleted):
+            return self
+        return SegmentedIndex(self.segments, frozenset(deleted), live_keys,
+                              self.live_discourse - (len(deleted) - len(self.deleted)))
+
+    # Compaction
+
+    def compaction_needed(self) -> Optional[str]:
+        """
+        'full' when tombstones or deltas have grown large relative to the base
+        (stale statistics, wasted postings), 'deltas' when there are too many
+        small segments to search, otherwise None.
+        """
+        if len(self.segments) < 2 and not self.deleted:
+            return None
+        delta_docs = self.total_documents - len(self.segments[0])
+        if (len(self.deleted) > COMPACT_DELETED_RATIO * self.total_documents
+                or delta_docs > COMPACT_DELTA_RATIO * len(self.segments[0])):
+            return 'full'
+        if len(self.segments) > MAX_SEGMENTS:
+            return 'deltas'
+        return None
+
+    def compact(self, build_leaves: LeafBuilder, full: bool = True) -> 'SegmentedIndex':
+        """
+        Merge segments into one, dropping tombstoned documents. full=True
+        rebuilds everything (exact statistics again); otherwise only the delta
+        segments are merged and the base keeps its tombstones. Stored vectors
+        are reused rather than re-embedded.
+        """
+        start = 0 if full else 1
+        merging = self.segments[start:]
+        if not merging:
+            return self
+        live = self.live_documents(merging)
+        course_content = [document['data'] for _, document in live if document['type'] == 'course_content']
+        discourse_posts = [document['data'] for _, document in live if document['type'] == 'discourse']
+        merged = SearchIndex(course_content, discourse_posts)
+        kept = SegmentedIndex(self.segments[:start], self.deleted_before(merging[0].offset), {})
+        if kept.segments:
+            merged.use_collection_statistics(kept.total_documents + len(merged), kept._doc_freq_with(merged),
+                                             *average_lengths([segment.index for segment in kept.segments] + [merged]))
+        # SearchIndex puts course content first; keep the vectors in that order too
+        order = [doc_id for doc_id, document in live if document['type'] == 'course_content'] + \
+                [doc_id for doc_id, document in live if document['type'] == 'discourse']
+        segment = IndexSegment(merged, build_leaves(merged, self.merged_embeddings(order)))
+        return SegmentedIndex(kept.segments + (segment,), kept.deleted)
+
+    def deleted_before(self, offset: int) -> FrozenSet[int]:
+        return frozenset(doc_id for doc_id in self.deleted if doc_id < offset)
+
+    def merged_embeddings(self, doc_ids: Sequence[int]) -> Optional[EmbeddingIndex]:
+        """Stored vectors of these documents as one index, or None if any segment has none"""
+        indexes = [segment.embedding_index() for segment in self.segments]
+        if not doc_ids or any(index is None for index in indexes):
+            return None
+        doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        positions = np.searchsorted(self._offsets, doc_ids, side='right') - 1
+        vectors = np.zeros((len(doc_ids), indexes[0].dim), dtype=np.float32)
+        for position, (segment, index) in enumerate(zip(self.segments, indexes)):
+            rows = np.flatnonzero(positions == position)
+            if not len(rows):
+                continue
+            local_ids = doc_ids[rows] - segment.offset
+            vectors[rows] = np.asarray(index.vectors[local_ids], dtype=np.float32)
+            if index.scales is not None:
+                vectors[rows] *= index.scales[local_ids, None]
+        keys = [document_key(self.documents[int(doc_id)]) for doc_id in doc_ids]
+        merged = EmbeddingIndex(vectors, keys, indexes[0].embedder_name)
+        merged.train_ivf()
+        if any(index.scales is not None for index in indexes):
+            merged.quantize()
+        return merged
+
+
+class SegmentedRanker(Ranker):
+    """
+    Runs one leaf engine over every segment and merges the results in global
+    doc ids. Each segment is asked for k plus its tombstone count, so
+    filtering deleted documents never leaves fewer than k live results.
+    """
+
+    def __init__(self, index: SegmentedIndex, leaf: str):
+        super().__init__(index)
+        self.leaf = leaf
+        self.name = index.segments[0].rankers[leaf].name
+
+    def rank(self, processed_question: ProcessedQuestion, k: int) -> List[Tuple[int, float]]:
+        merged: List[Tuple[int, float]] = []
+        for position, segment in enumerate(self.index.segments):
+            ranker = segment.rankers[self.leaf]
+            for local_id, score in ranker.rank(processed_question, k + self.index.deleted_in(position)):
+                doc_id = segment.offset + local_id
+                if doc_id not in self.index.deleted:
+                    merged.append((doc_id, score))
+        return sorted(merged, key=lambda item: (-item[1], item[0]))[:k]
+
+
+def segmented_ranker(index: SegmentedIndex, template: Ranker) -> Ranker:
+    """
+    A ranker over all segments shaped like ``template`` (the previous ranker).
+    A single segment without tombstones is ranked directly, with no merging.
+    """
+    if len(index.segments) == 1 and not index.deleted:
+        segment = index.segments[0]
+        leaf = lambda name: segment.rankers[name]
+        search_index = segment.index
+    else:
+        leaf = lambda name: SegmentedRanker(index, name)
+        search_index = index
+    if isinstance(template, HybridRanker):
+        return HybridRanker(search_index, leaf('lexical'), leaf('semantic'),
+                            fusion=template.fusion, lexical_weight=template.lexical_weight,
+                            semantic_weight=template.semantic_weight, rrf_k=template.rrf_k, depth=template.depth)
+    return leaf(template.name)
@@ -0,0 +1,124 @@
+"""
+Passage scoring and answer snippets.
+
+SearchIndex splits each document's answer text into passages at index
+time. For the few documents a query retrieves, rank_passages scores only
+the passages containing a query token: the passage posting list of each
+token is bisected to the document's range of passage ids, so the work
+grows with the matching passages rather than with document length.
+scored_sentences then scores the sentences of the best_passages, and
+compose_snippet quotes the best of them, in reading order, within a
+character budget.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Set, Tuple
+
+from services.search_index import SearchIndex, sentence_spans, tokenize
+
+
+# Passages per document whose sentences are candidates for the answer
+PASSAGES_PER_DOCUMENT = 2
+
+# BM25 parameters for passages, as in services/ranking.py
+K1 = 1.2
+B = 0.75
+
+ELLIPSIS = '...'
+
+
+def query_weights(index: SearchIndex, tokens: Sequence[str]) -> Dict[str, float]:
+    """IDF of each distinct query token the index knows"""
+    weights = {}
+    for token in dict.fromkeys(tokens):
+        term_id = index.term_ids.get(token)
+        if term_id is not None:
+            weights[token] = float(index.idf[term_id])
+    return weights
+
+
+def rank_passages(index: SearchIndex, doc_id: int, weights: Dict[str, float]) -> List[Tuple[int, float]]:
+    """(passage id, BM25 score) of the document's passages that contain a query token, best first"""
+    first, last = int(index.passage_offsets[doc_id]), int(index.passage_offsets[doc_id + 1])
+    average_length = index.avg_passage_length or 1.0
+    scores: Dict[int, float] = {}
+    for token, weight in weights.items():
+        passage_ids = index.passage_postings.get(token)
+        if passage_ids is None:
+            continue
+        start = bisect_left(passage_ids, first)
+        end = bisect_left(passage_ids, last, start)
+        if start == end:
+            continue
+        frequencies = index.passage_frequencies[token]
+        for position in range(start, end):
+            passage_id = int(passage_ids[position])
+            tf = int(frequencies[position])
+            norm = 1 - B + B * int(index.passage_lengths[passage_id]) / average_length
+            scores[passage_id] = scores.get(passage_id, 0.0) + weight * tf * (K1 + 1) / (tf + K1 * norm)
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+def best_passages(index: SearchIndex, doc_id: int, weights: Dict[str, float],
+                  limit: int = PASSAGES_PER_DOCUMENT) -> List[Tuple[int, int]]:
+    """
+    (start, end) of the document's best passages, in text order. Without any
+    matching passage the document's first passage stands in.
+    """
+    best = [passage_id for passage_id, _ in rank_passages(index, doc_id, weights)[:limit]]
+    if not best and len(index.passages(doc_id)):
+        best = [index.passages(doc_id)[0]]
+    return [index.passage_span(passage_id) for passage_id in sorted(best)]
+
+
+def scored_sentences(text: str, passages: Sequence[Tuple[int, int]],
+                     weights: Dict[str, float]) -> List[Tuple[int, int, float]]:
+    """
+    (start, end, score) of the sentences in the passages, in text order. A
+    sentence scores the IDF of the distinct query tokens it contains, also
+    as the start of a longer word.
+    """
+    sentences = []
+    for passage_start, passage_end in passages:
+        for start, end in sentence_spans(text, passage_start, passage_end):
+            present = set(tokenize(text[start:end]))
+            sentences.append((start, end, sum(weight for token, weight in weights.items()
+                                              if token_in(token, present))))
+    return sentences
+
+
+def token_in(token: str, words: Set[str]) -> bool:
+    """The token is one of the words or, from 3 characters, begins one (evaluation, evaluations)"""
+    return token in words or (len(token) >= 3 and any(word.startswith(token) for word in words))
+
+
+def compose_snippet(documents: Sequence[Tuple[str, Sequence[Tuple[int, int, float]]]], budget: int) -> str:
+    """
+    Quote the highest-scoring sentences of the documents (text and
+    scored_sentences each, in rank order) within budget characters. Ties go
+    to the better-ranked document, then the earlier sentence. Sentences
+    without a query token are only used when no sentence has one. Chosen
+    sentences are joined in document and text order; sentences are never
+    cut, unless not even the best one fits, which is then shortened at a
+    word boundary.
+    """
+    candidates = sorted(
+        ((score, rank, start, end) for rank, (_, sentences) in enumerate(documents) for start, end, score in sentences),
+        key=lambda candidate: (-candidate[0], candidate[1], candidate[2])
+    )
+    if candidates and candidates[0][0] > 0:
+        candidates = [candidate for candidate in candidates if candidate[0] > 0]
+    chosen = []
+    used = -1
+    for candidate in candidates:
+        length = candidate[3] - candidate[2]
+        if used + 1 + length <= budget:
+            chosen.append(candidate)
+            used += 1 + length
+    if not chosen:
+        if not candidates:
+            return ''
+        _, rank, start, end = candidates[0]
+        cut = documents[rank][0][start:start + budget - len(ELLIPSIS)]
+        return (cut.rsplit(None, 1)[0] if ' ' in cut.strip() else cut).rstrip() + ELLIPSIS
+    chosen.sort(key=lambda candidate: (candidate[1], candidate[2]))
+    return ' '.join(documents[rank][0][start:end] for _, rank, start, end in chosen)
@@ -0,0 +1,265 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+
+import httpx
+
+
+SYSTEM_PROMPT = (
+    "You are a teaching assistant for the Tools in Data Science (TDS) course at IIT Madras. "
+    "Answer the student's question using only the numbered context passages. "
+    "If they do not contain the answer, say so briefly and point to the course site or the Discourse forum. "
+    "Be concise: at most about 120 words, no preamble."
+)
+
+
+def build_messages(question: str, context: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """Chat messages asking for an answer to question from the retrieved passages"""
+    passages = '\n\n'.join(
+        f"[{number}] {item.get('title', '')} ({item.get('url', '')})\n{item['text']}"
+        for number, item in enumerate(context, 1)
+    )
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': f"Context:\n{passages}\n\nQuestion: {question}"},
+    ]
+
+
+class SynthesisProvider:
+    """Turns chat messages into an answer, through the stage's shared HTTP client"""
+
+    name = 'base'
+
+    async def complete(self, client: httpx.AsyncClient, messages: List[Dict[str, str]]) -> str:
+        raise NotImplementedError
+
+
+class ChatCompletionsProvider(SynthesisProvider):
+    """
+    Any OpenAI-compatible `/chat/completions` endpoint: the OpenAI API, the
+    AI Proxy, or a local fake server (LLM_BASE_URL)
+    """
+
+    name = 'openai'
+
+    def __init__(self, base_url: Optional[str] = None, api_key: Optional[str] = None, model: Optional[str] = None,
+                 max_tokens: int = 300, temperature: float = 0.2):
+        self.base_url = (base_url or os.getenv('LLM_BASE_URL') or os.getenv('OPENAI_BASE_URL')
+                         or 'https://api.openai.com/v1').rstrip('/')
+        self.api_key = api_key if api_key is not None else os.getenv('OPENAI_API_KEY', '')
+        self.model = model or os.getenv('LLM_MODEL', 'gpt-4o-mini')
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+
+    async def complete(self, client: httpx.AsyncClient, messages: List[Dict[str, str]]) -> str:
+        headers = {'Authorization': f"Bearer {self.api_key}"} if self.api_key else {}
+        response = await client.post(f"{self.base_url}/chat/completions", headers=headers, json={
+            'model': self.model,
+            'messages': messages,
+            'max_tokens': self.max_tokens,
+            'temperature': self.temperature,
+        })
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
+
+
+class CallableSynthesisProvider(SynthesisProvider):
+    """Adapts a plain ``messages -> text`` function (sync or async), e.g. a deterministic test double"""
+
+    def __init__(self, function: Callable[[List[Dict[str, str]]], Union[str, Awaitable[str]]], name: str = 'callable'):
+        self.function = function
+        self.name = name
+
+    async def complete(self, client: httpx.AsyncClient, messages: List[Dict[str, str]]) -> str:
+        result = self.function(messages)
+        return await result if asyncio.iscoroutine(result) else result
+
+
+SYNTHESIS_PROVIDERS = {
+    ChatCompletionsProvider.name: ChatCompletionsProvider,
+}
+
+
+def create_synthesis_provider(provider: Union[None, str, SynthesisProvider, Callable] = None) -> Optional[SynthesisProvider]:
+    """
+    Resolve a provider from an instance, a callable, a provider name, or the
+    LLM_PROVIDER environment variable (default: none, synthesis disabled)
+    """
+    if isinstance(provider, SynthesisProvider):
+        return provider
+    if callable(provider):
+        return CallableSynthesisProvider(provider)
+    name = (provider or os.getenv('LLM_PROVIDER', 'none')).lower()
+    if name == 'none':
+        return None
+    if name not in SYNTHESIS_PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}'. Available: none, {', '.join(sorted(SYNTHESIS_PROVIDERS))}")
+    return SYNTHESIS_PROVIDERS[name]()
+
+
+class _Call:
+    """A submitted synthesis call; started once it holds a slot and is sent to the provider"""
+
+    __slots__ = ('future', 'started', 'abandoned')
+
+    def __init__(self):
+        self.future: Optional[Future] = None
+        self.started = False
+        self.abandoned = False
+
+
+class SynthesisStage:
+    """
+    Optional LLM answer synthesis over the retrieved passages.
+
+    Every call, from any thread or event loop, runs on one background event
+    loop that owns a single pooled httpx.AsyncClient, so connections are
+    reused across requests. At most max_concurrency calls are in flight;
+    beyond max_pending submitted calls, new ones are skipped at once. A caller
+    waits at most timeout_seconds, slot included, and gets None on timeout,
+    error or overload so it can keep the extractive answer. A call the caller
+    gave up on is dropped if it is still waiting for a slot; once sent, it
+    runs to completion in its slot, so the provider never sees more than
+    max_concurrency requests and the pooled connection is kept.
+    """
+
+    def __init__(self, provider: Union[None, str, SynthesisProvider, Callable] = None,
+                 timeout_seconds: Optional[float] = None, max_concurrency: Optional[int] = None):
+        self.provider = create_synthesis_provider(provider)
+        self.timeout_seconds = (timeout_seconds if timeout_seconds is not None
+                                else float(os.getenv('LLM_TIMEOUT', 5.0)))
+        self.max_concurrency = max_concurrency or int(os.getenv('LLM_MAX_CONCURRENCY', 16))
+        self.max_pending = self.max_concurrency * 4
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.calls = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.skipped = 0
+        self.total_ms = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.provider is not None
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        """Background loop and its client, created on first use"""
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='ta-llm', daemon=True).start()
+
+                async def setup():
+                    limits = httpx.Limits(max_connections=self.max_concurrency,
+                                          max_keepalive_connections=self.max_concurrency)
+                    # The caller's deadline is enforced around the whole call; this only bounds a stuck socket
+                    self._client = httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(self.timeout_seconds * 2))
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+                asyncio.run_coroutine_threadsafe(setup(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, question: str, context: List[Dict[str, str]]) -> Optional[_Call]:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.skipped += 1
+                return None
+            self._pending += 1
+            self.calls += 1
+        call = _Call()
+        call.future = asyncio.run_coroutine_threadsafe(self._call(build_messages(question, context), call),
+                                                       self._start())
+        return call
+
+    async def _call(self, messages: List[Dict[str, str]], call: _Call) -> Optional[str]:
+        started = time.perf_counter()
+        try:
+            async with self._semaphore:
+                with self._lock:
+                    if call.abandoned:
+                        return None
+                    call.started = True
+                text = (await self.provider.complete(self._client, messages)).strip()
+        except Exception:
+            # Also reached by calls whose caller is gone, so nothing is left to raise to
+            with self._lock:
+                self.errors += 1
+            return None
+        finally:
+            with self._lock:
+                self._pending -= 1
+        with self._lock:
+            self.completed += 1
+            self.total_ms += (time.perf_counter() - started) * 1000
+        return text
+
+    def _abandon(self, call: _Call):
+        # The caller has given up. Drop a call still waiting for a slot; cancelling a
+        # sent one would free its slot and close its connection while the provider works on
+        with self._lock:
+            self.timeouts += 1
+            if call.started:
+                return
+            call.abandoned = True
+        call.future.cancel()
+
+    def synthesize(self, question: str, context: List[Dict[str, str]]) -> Optional[str]:
+        """Blocking: the synthesized answer, or None when disabled, failed, overloaded or too slow"""
+        if not self.enabled or not context:
+            return None
+        call = self._submit(question, context)
+        if call is None:
+            return None
+        try:
+            return call.future.result(timeout=self.timeout_seconds) or None
+        except FutureTimeoutError:
+            self._abandon(call)
+            return None
+        except Exception:
+            return None
+
+    async def synthesize_async(self, question: str, context: List[Dict[str, str]]) -> Optional[str]:
+        """synthesize() for callers on an event loop: waits without holding a thread"""
+        if not self.enabled or not context:
+            return None
+        call = self._submit(question, context)
+        if call is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(call.future)), self.timeout_seconds) or None
+        except asyncio.TimeoutError:
+            self._abandon(call)
+            return None
+        except Exception:
+            return None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'provider': self.provider.name if self.provider else None,
+                'calls': self.calls,
+                'completed': self.completed,
+                'timeouts': self.timeouts,
+                'errors': self.errors,
+                'skipped': self.skipped,
+                'in_flight': self._pending,
+                'avg_ms': round(self.total_ms / self.completed, 1) if self.completed else None,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+        if self._client is not None:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=5)
+            self._client = None
+        loop.call_soon_threadsafe(loop.stop)
@@ -0,0 +1,62 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+
+class StageTimings:
+    """Per-request wall-clock timings, in milliseconds, keyed by stage name"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, stage: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000)
+
+    def record(self, stage: str, elapsed_ms: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed_ms
+
+    def as_dict(self) -> Dict[str, float]:
+        return {stage: round(elapsed, 3) for stage, elapsed in self.stages.items()}
+
+    def server_timing_header(self) -> str:
+        return server_timing_header(self.stages)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format stage timings as an HTTP Server-Timing header value"""
+    return ', '.join(f"{stage.replace('.', '-')};dur={elapsed:.3f}" for stage, elapsed in timings.items())
+
+
+class TimingStats:
+    """Thread-safe running count / mean / max per stage, for /api/stats"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+
+    def add(self, timings: Optional[Dict[str, float]]):
+        if not timings:
+            return
+        with self._lock:
+            for stage, elapsed in timings.items():
+                entry = self._stages.setdefault(stage, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                entry['count'] += 1
+                entry['total_ms'] += elapsed
+                entry['max_ms'] = max(entry['max_ms'], elapsed)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                stage: {
+                    'count': int(entry['count']),
+                    'mean_ms': round(entry['total_ms'] / entry['count'], 3),
+                    'max_ms': round(entry['max_ms'], 3),
+                }
+                for stage, entry in self._stages.items()
+            }
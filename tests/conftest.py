@@ -0,0 +1,21 @@
+"""
+Offline test setup: the app is imported without the background warm-up,
+the knowledge-base watcher or an LLM provider, and every test runs from the
+repository root, where the services find data/ and scraped_data/.
+"""
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+os.environ.setdefault('KB_WARMUP', 'false')
+os.environ.setdefault('KB_WATCH', 'false')
+os.environ.setdefault('LLM_PROVIDER', 'none')
+
+
+@pytest.fixture(autouse=True)
+def repo_root(monkeypatch):
+    monkeypatch.chdir(REPO_ROOT)
@@ -0,0 +1,107 @@
+"""Embedding index: exact and IVF search, int8 quantization and the saved index, with local embedders"""
+import copy
+
+import numpy as np
+import pytest
+
+from benchmarks.corpus import load_seed_documents, synthetic_corpus
+from services.embeddings import CallableEmbedder, EmbeddingIndex, HashingEmbedder, load_or_build_index
+from services.question_processor import QuestionProcessor
+from services.ranking import create_ranker
+from services.search_index import SearchIndex
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    course_seed, discourse_seed = load_seed_documents()
+    course_content, discourse_posts = synthetic_corpus(400, 20)
+    return course_seed + course_content, discourse_seed + discourse_posts
+
+
+@pytest.fixture(scope='module')
+def index(corpus):
+    return SearchIndex(*corpus)
+
+
+@pytest.fixture(scope='module')
+def embedder():
+    return HashingEmbedder()
+
+
+@pytest.fixture(scope='module')
+def embedding_index(index, embedder):
+    return EmbeddingIndex.build(index, embedder)
+
+
+@pytest.fixture(scope='module')
+def queries(index, embedder):
+    titles = [index.documents[doc_id]['data'].get('title', '') for doc_id in range(0, len(index), 17)]
+    return embedder.embed(titles)
+
+
+def brute_force(embedding_index, query, k):
+    scores = np.asarray(embedding_index.vectors, dtype=np.float32) @ query
+    return [int(doc_id) for doc_id in np.argsort(-scores, kind='stable')[:k]]
+
+
+def test_exact_search_is_brute_force(embedding_index, queries):
+    for query in queries:
+        assert [doc_id for doc_id, _ in embedding_index.search(query, 5)] == brute_force(embedding_index, query, 5)
+
+
+def test_ivf_probing_every_list_is_exact(embedding_index, queries):
+    num_lists = len(embedding_index.centroids)
+    assert num_lists > 1
+    for query in queries:
+        assert embedding_index.search(query, 5, mode='ivf', nprobe=num_lists) == embedding_index.search(query, 5)
+
+
+def test_ivf_and_int8_keep_recall(index, embedder, embedding_index, queries):
+    quantized = EmbeddingIndex.build(index, embedder, quantize=True)
+    assert quantized.quantization == 'int8' and quantized.vectors.dtype == np.int8
+    exact = [set(brute_force(embedding_index, query, 10)) for query in queries]
+    for approximate in (lambda query: embedding_index.search(query, 10, mode='ivf'),
+                        lambda query: quantized.search(query, 10)):
+        found = sum(len(expected & {doc_id for doc_id, _ in approximate(query)})
+                    for expected, query in zip(exact, queries))
+        assert found / sum(len(expected) for expected in exact) >= 0.8
+
+
+def test_saved_index_round_trip(tmp_path, index, embedder, embedding_index, queries):
+    directory = str(tmp_path / 'embeddings')
+    embedding_index.save(directory)
+    loaded = EmbeddingIndex.load(directory)
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.matches(index, embedder)
+    for query in queries:
+        assert loaded.search(query, 5) == embedding_index.search(query, 5)
+        assert loaded.search(query, 5, mode='ivf') == embedding_index.search(query, 5, mode='ivf')
+    assert load_or_build_index(index, embedder, directory) is not None
+    assert EmbeddingIndex.load(str(tmp_path / 'missing')) is None
+
+
+def test_saved_index_is_stale_after_edits_or_another_embedder(tmp_path, corpus, index, embedder, embedding_index):
+    directory = str(tmp_path / 'embeddings')
+    embedding_index.save(directory)
+    loaded = EmbeddingIndex.load(directory)
+    assert not loaded.matches(index, HashingEmbedder(dim=128))
+
+    course_content, discourse_posts = corpus
+    edited = copy.deepcopy(discourse_posts)
+    edited[0]['answer_summary'] = 'A rewritten summary with the same topic id'
+    edited_index = SearchIndex(course_content, edited)
+    assert not loaded.matches(edited_index, embedder)
+    # A local embedder rebuilds in memory for the edited corpus
+    rebuilt = load_or_build_index(edited_index, embedder, directory)
+    assert rebuilt.matches(edited_index, embedder)
+
+
+def test_semantic_ranker_with_plugged_in_embedder(index):
+    """A deterministic texts -> vectors function plugs in and finds a topic by its title"""
+    hashing = HashingEmbedder(dim=64)
+    ranker = create_ranker(index, 'semantic', embedder=CallableEmbedder(hashing.embed, name='test'))
+    assert ranker.embedding_index.embedder_name == 'test'
+    topic_id = len(index) - 1
+    title = index.documents[topic_id]['data']['title']
+    ranked = ranker.rank(QuestionProcessor().process_question(title), 3)
+    assert ranked[0][0] == topic_id
@@ -0,0 +1,95 @@
+"""Compiled knowledge base: what comes back out of the file equals the in-memory SearchIndex"""
+import json
+
+import pytest
+
+from benchmarks.corpus import load_seed_documents, sample_questions, synthetic_corpus
+from services.kb_store import (STRING_FIELDS, KnowledgeBaseFile, KnowledgeBaseFormatError, merge_knowledge_bases,
+                               write_knowledge_base)
+from services.question_processor import QuestionProcessor
+from services.ranking import create_ranker
+from services.search_index import SearchIndex
+
+LEXICAL_RANKERS = ('legacy', 'bm25', 'bm25f', 'sparse')
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    course_seed, discourse_seed = load_seed_documents()
+    course_content, discourse_posts = synthetic_corpus(200, 20)
+    return course_seed + course_content, discourse_seed + discourse_posts
+
+
+@pytest.fixture(scope='module')
+def questions():
+    processor = QuestionProcessor()
+    return [processor.process_question(question) for question in sample_questions(100)]
+
+
+def expected_fields(data):
+    """The part of a source document the compiled file keeps"""
+    kept = {field: data[field] for field in STRING_FIELDS if isinstance(data.get(field), str)}
+    if data.get('keywords') is not None:
+        kept['keywords'] = list(data['keywords'])
+    if isinstance(data.get('id'), int):
+        kept['id'] = data['id']
+    return kept
+
+
+def assert_same_index(compiled: SearchIndex, index: SearchIndex, questions):
+    assert len(compiled) == len(index)
+    for doc_id, document in enumerate(index.documents):
+        assert compiled.documents[doc_id]['type'] == document['type']
+        assert dict(compiled.documents[doc_id]['data']) == expected_fields(document['data'])
+        assert compiled.search_texts[doc_id] == index.search_texts[doc_id]
+        passages = list(index.passages(doc_id))
+        assert list(compiled.passages(doc_id)) == passages
+        assert [compiled.passage_span(p) for p in passages] == [index.passage_span(p) for p in passages]
+    for name in LEXICAL_RANKERS:
+        compiled_ranker, ranker = create_ranker(compiled, name), create_ranker(index, name)
+        for processed_question in questions:
+            assert compiled_ranker.rank(processed_question, 5) == ranker.rank(processed_question, 5), \
+                (name, processed_question.original_question)
+
+
+def test_round_trip(tmp_path, corpus, questions):
+    path = str(tmp_path / 'knowledge_base.bin')
+    write_knowledge_base(*corpus, path)
+    kb = KnowledgeBaseFile(path)
+    assert len(kb.course_content) == len(corpus[0])
+    assert len(kb.discourse_posts) == len(corpus[1])
+    assert_same_index(kb.search_index(), SearchIndex(*corpus), questions)
+
+
+def test_merged_shards_equal_single_file(tmp_path, corpus, questions):
+    course_content, discourse_posts = corpus
+    shards = [(course_content[:7], []), (course_content[7:], discourse_posts[:50]), ([], discourse_posts[50:])]
+    shard_paths = []
+    for number, shard in enumerate(shards):
+        shard_paths.append(str(tmp_path / f'shard-{number}.bin'))
+        write_knowledge_base(*shard, shard_paths[-1])
+    path = str(tmp_path / 'knowledge_base.bin')
+    merge_knowledge_bases(shard_paths, path)
+    assert_same_index(KnowledgeBaseFile(path).search_index(), SearchIndex(*corpus), questions)
+
+
+def test_is_current_tracks_sources(tmp_path, corpus):
+    source = tmp_path / 'enhanced_discourse_posts.json'
+    source.write_text(json.dumps(corpus[1]))
+    path = str(tmp_path / 'knowledge_base.bin')
+    write_knowledge_base(*corpus, path, sources=[str(source)])
+    assert KnowledgeBaseFile(path).is_current([str(source)])
+    source.write_text(json.dumps(corpus[1][1:]))
+    assert not KnowledgeBaseFile(path).is_current([str(source)])
+
+
+def test_rejects_foreign_and_truncated_files(tmp_path, corpus):
+    path = tmp_path / 'knowledge_base.bin'
+    write_knowledge_base(*corpus, str(path))
+    content = path.read_bytes()
+    path.write_bytes(content[:len(content) // 2])
+    with pytest.raises(KnowledgeBaseFormatError):
+        KnowledgeBaseFile(str(path))
+    path.write_bytes(b'{"not": "a knowledge base"}' + content[32:])
+    with pytest.raises(KnowledgeBaseFormatError):
+        KnowledgeBaseFile(str(path))
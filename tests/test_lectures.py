@@ -0,0 +1,57 @@
+"""Lecture scraper context pool against the local course site (needs Playwright with Chromium)"""
+import asyncio
+import csv
+
+import pytest
+
+pytest.importorskip('playwright.async_api')
+
+from benchmarks.course_site_stub import StubCourseSite, write_course_site  # noqa: E402
+from scraper.lectures import lecture_links, scrape_lectures_async  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def site(tmp_path_factory):
+    root = str(tmp_path_factory.mktemp('site'))
+    return root, write_course_site(root, num_lectures=6, render_delay_ms=200)
+
+
+def scrape(stub, output, **options):
+    return asyncio.run(scrape_lectures_async(output, dashboard_url=stub.base_url + '/', site_url=stub.base_url,
+                                             timeout=10, **options))
+
+
+def scraped_rows(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return {title: content for title, content in list(csv.reader(f))[1:]}
+
+
+def test_lecture_links_keeps_site_links_once():
+    links = [('/lectures/unit-1.html', 'Unit 1 '), ('#/2025-01', 'Dashboard'), ('/lectures/unit-1.html', 'Again'),
+             ('https://example.com/topic/2', 'Topic 2'), (None, 'No link'), ('/about', '')]
+    assert lecture_links(links, 'https://tds.example') == [
+        ('Unit 1', 'https://tds.example/lectures/unit-1.html'), ('Topic 2', 'https://example.com/topic/2')]
+
+
+def test_pool_scrapes_every_lecture_after_it_renders(site, tmp_path):
+    root, lectures = site
+    output = str(tmp_path / 'lectures.csv')
+    with StubCourseSite(root, latency=0.005, analytics_latency=0.05) as stub:
+        summary = scrape(stub, output, contexts=3)
+        served = dict(stub.requests)
+    rows = scraped_rows(output)
+    assert summary['failed'] == 0 and summary['empty'] == 0
+    for title, _ in lectures:
+        # Client-side rendered: the article is empty until the page script fills it
+        assert rows[title].startswith(title)
+    assert 'image' not in served and 'font' not in served and 'analytics' not in served
+    assert summary['blocked_requests'] > 0
+
+
+def test_same_rows_without_blocking(site, tmp_path):
+    root, _ = site
+    with StubCourseSite(root, latency=0.005, analytics_latency=0.05) as stub:
+        scrape(stub, str(tmp_path / 'blocked.csv'), contexts=2)
+        scrape(stub, str(tmp_path / 'unblocked.csv'), contexts=2, block_resources=False)
+        assert stub.requests.get('image', 0) > 0
+    assert scraped_rows(str(tmp_path / 'blocked.csv')) == scraped_rows(str(tmp_path / 'unblocked.csv'))
@@ -0,0 +1,79 @@
+"""Ranking engines against the original scorer and each other, on the shipped data"""
+import pytest
+
+from benchmarks.corpus import load_seed_documents, sample_questions
+from services.question_processor import QuestionProcessor
+from services.ranking import RANKERS, create_ranker
+from services.search_index import SearchIndex
+
+K = 3
+
+
+@pytest.fixture(scope='module')
+def documents():
+    return load_seed_documents()
+
+
+@pytest.fixture(scope='module')
+def index(documents):
+    return SearchIndex(*documents)
+
+
+@pytest.fixture(scope='module')
+def questions():
+    processor = QuestionProcessor()
+    return [processor.process_question(question) for question in sample_questions(150)]
+
+
+def original_scores(course_content, discourse_posts, processed_question):
+    """The substring scorer search_enhanced_content used before the ranking engines, as (doc_id, score)"""
+    question_terms = processed_question.cleaned_question.lower().split()
+    texts = [(content.get('content', '') + ' ' + ' '.join(content.get('keywords', []))).lower()
+             for content in course_content]
+    texts += [f"{topic.get('title', '').lower()} {topic.get('answer_summary', '').lower()} "
+              f"{' '.join(topic.get('keywords', [])).lower()}" for topic in discourse_posts]
+    scored = []
+    for doc_id, text in enumerate(texts):
+        score = sum(2 for keyword in processed_question.keywords if keyword.lower() in text)
+        score += sum(1 for term in question_terms if len(term) > 3 and term in text)
+        if score > 0:
+            scored.append((doc_id, score))
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:K]
+
+
+def test_legacy_ranker_matches_original_scorer(documents, index, questions):
+    ranker = create_ranker(index, 'legacy')
+    for processed_question in questions:
+        assert ranker.rank(processed_question, K) == original_scores(*documents, processed_question), \
+            processed_question.original_question
+
+
+def test_sparse_ranker_matches_bm25f(index, questions):
+    bm25f = create_ranker(index, 'bm25f')
+    sparse = create_ranker(index, 'sparse')
+    for processed_question in questions:
+        expected = bm25f.rank(processed_question, K)
+        ranked = sparse.rank(processed_question, K)
+        assert [doc_id for doc_id, _ in ranked] == [doc_id for doc_id, _ in expected], \
+            processed_question.original_question
+        assert [score for _, score in ranked] == pytest.approx([score for _, score in expected], rel=1e-5)
+
+
+@pytest.mark.parametrize('name', sorted(set(RANKERS) - {'semantic', 'hybrid'}))
+def test_lexical_rankers_return_top_k_in_score_order(index, questions, name):
+    ranker = create_ranker(index, name)
+    for processed_question in questions:
+        ranked = ranker.rank(processed_question, K)
+        assert len(ranked) <= K
+        assert all(0 <= doc_id < len(index) for doc_id, _ in ranked)
+        assert [score for _, score in ranked] == sorted((score for _, score in ranked), reverse=True)
+
+
+def test_bm25_matches_whole_tokens_only():
+    """'exam' matches the topic about the exam, not the one that only contains 'example' (legacy matches both)"""
+    index = SearchIndex([], [{'title': 'Worked example for GA2', 'answer_summary': 'See the example notebook'},
+                             {'title': 'End-term exam date', 'answer_summary': 'The exam is on 15 December'}])
+    processed_question = QuestionProcessor().process_question('exam')
+    assert [doc_id for doc_id, _ in create_ranker(index, 'bm25').rank(processed_question, K)] == [1]
+    assert sorted(doc_id for doc_id, _ in create_ranker(index, 'legacy').rank(processed_question, K)) == [0, 1]
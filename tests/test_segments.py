@@ -0,0 +1,85 @@
+"""Incremental topic upserts and deletes, and segment compaction, through AnswerGenerator"""
+import copy
+
+import pytest
+
+from benchmarks.corpus import sample_questions, scraped_data_workdir, synthetic_corpus
+from services.answer_generator import AnswerGenerator
+from services.question_processor import QuestionProcessor
+from services.ranking import create_ranker
+from services.search_index import SearchIndex
+
+
+@pytest.fixture(scope='module')
+def corpus():
+    return synthetic_corpus(300, 20)
+
+
+@pytest.fixture
+def generator(corpus, monkeypatch):
+    with scraped_data_workdir(*corpus) as workdir:
+        monkeypatch.chdir(workdir)
+        generator = AnswerGenerator(ranker='bm25f', kb_path='')
+        generator.warm_up()
+        yield generator
+
+
+@pytest.fixture(scope='module')
+def questions():
+    processor = QuestionProcessor()
+    return [processor.process_question(question) for question in sample_questions(100)]
+
+
+def search(generator, question, top_k=3):
+    processed_question = QuestionProcessor().process_question(question)
+    return generator.search_enhanced_content(processed_question, {'top_k': top_k})
+
+
+def test_upsert_replaces_topic_with_same_id(generator, corpus):
+    topic = corpus[1][10]
+    edited = dict(copy.deepcopy(topic), title='Zyxwv quorbl schedule announcement')
+    snapshot = generator.upsert_topics([edited])
+    assert len(snapshot.discourse_posts) == len(corpus[1])
+    assert snapshot.stats()['segments'] == 2
+
+    results = search(generator, 'zyxwv quorbl')
+    assert results[0]['data']['id'] == topic['id']
+    assert results[0]['data']['title'] == edited['title']
+    assert [post['id'] for post in snapshot.discourse_posts].count(topic['id']) == 1
+
+
+def test_upsert_new_topic_and_delete(generator, corpus):
+    new_topic = dict(copy.deepcopy(corpus[1][0]), id=10 ** 9, title='Zyxwv quorbl office hours')
+    snapshot = generator.upsert_topics([new_topic])
+    assert len(snapshot.discourse_posts) == len(corpus[1]) + 1
+    assert search(generator, 'zyxwv quorbl')[0]['data']['id'] == new_topic['id']
+
+    snapshot = generator.delete_topics([new_topic['id'], corpus[1][0]['id'], 'no such topic'])
+    assert len(snapshot.discourse_posts) == len(corpus[1]) - 1
+    assert len(snapshot.search_index.deleted) == 2
+    found = {result['data'].get('id') for result in search(generator, corpus[1][0]['title'], top_k=20)}
+    assert not found & {new_topic['id'], corpus[1][0]['id']}
+
+
+def test_full_compaction_equals_fresh_index(generator, corpus, questions):
+    course_content, discourse_posts = corpus
+    edited = [dict(copy.deepcopy(topic), title=topic['title'] + ' (edited)') for topic in discourse_posts[:40]]
+    added = [dict(copy.deepcopy(topic), id=10 ** 9 + i) for i, topic in enumerate(discourse_posts[-20:])]
+    deleted = [topic['id'] for topic in discourse_posts[100:160]]
+    generator.upsert_topics(edited)
+    generator.upsert_topics(added)
+    generator.delete_topics(deleted)
+    assert generator.compaction_needed() == 'full'
+
+    snapshot = generator.compact()
+    assert generator.compaction_needed() is None
+    assert snapshot.stats()['segments'] == 1 and snapshot.stats()['deleted'] == 0
+
+    # Compaction keeps live documents in id order: untouched topics, then each upsert batch
+    live = [topic for topic in discourse_posts[40:] if topic['id'] not in deleted] + edited + added
+    assert [topic['id'] for topic in snapshot.discourse_posts] == [topic['id'] for topic in live]
+    fresh = create_ranker(SearchIndex(course_content, live), 'bm25f')
+    for processed_question in questions:
+        expected = [doc_id for doc_id, _ in fresh.rank(processed_question, 3)]
+        assert [doc_id for doc_id, _ in snapshot.ranker.rank(processed_question, 3)] == expected, \
+            processed_question.original_question
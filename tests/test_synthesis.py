@@ -0,0 +1,93 @@
+"""LLM synthesis against the local OpenAI-compatible stub: answers, timeout and error fallback"""
+import asyncio
+import time
+
+import pytest
+
+from benchmarks.openai_stub import StubChatCompletions
+from services.answer_generator import AnswerGenerator
+from services.pipeline import AnswerPipeline
+from services.question_processor import QuestionProcessor
+from services.synthesis import ChatCompletionsProvider, SynthesisStage
+
+CONTEXT = [{'title': 'Deployment', 'url': 'https://example.com/deploy',
+            'text': 'Deploy the FastAPI app on Vercel with a vercel.json that routes every path to app.py.'}]
+# Answered by retrieval rather than a predefined rule, so it has passages to synthesize from
+QUESTION = 'How do I deploy a FastAPI app on Vercel?'
+
+
+def stage(stub: StubChatCompletions, timeout_seconds: float) -> SynthesisStage:
+    return SynthesisStage(ChatCompletionsProvider(base_url=stub.base_url, api_key=''), timeout_seconds=timeout_seconds)
+
+
+def wait_for(condition, seconds: float = 5.0):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert condition()
+
+
+@pytest.fixture(scope='module')
+def answer_generator():
+    generator = AnswerGenerator(kb_path='')
+    generator.warm_up()
+    return generator
+
+
+def test_synthesizes_through_provider():
+    with StubChatCompletions(latency=0) as stub:
+        synthesis = stage(stub, timeout_seconds=5)
+        assert synthesis.synthesize(QUESTION, CONTEXT).startswith('From the course material: Deploy the FastAPI app')
+        assert asyncio.run(synthesis.synthesize_async(QUESTION, CONTEXT)).startswith('From the course material')
+        assert synthesis.stats()['completed'] == 2
+        synthesis.shutdown()
+
+
+def test_timeout_returns_none_and_call_finishes_in_its_slot():
+    # Slower than the caller waits, faster than the client's own socket timeout (twice as long)
+    with StubChatCompletions(latency=0.15) as stub:
+        synthesis = stage(stub, timeout_seconds=0.1)
+        started = time.perf_counter()
+        assert synthesis.synthesize(QUESTION, CONTEXT) is None
+        assert time.perf_counter() - started < 0.15
+        assert asyncio.run(synthesis.synthesize_async(QUESTION, CONTEXT)) is None
+        assert synthesis.stats()['timeouts'] == 2
+        # Sent calls are not cancelled: both complete and release their slots
+        wait_for(lambda: synthesis.stats()['completed'] == 2)
+        assert synthesis.stats()['in_flight'] == 0 and synthesis.stats()['errors'] == 0
+        assert stub.requests == 2
+        synthesis.shutdown()
+
+
+def test_provider_error_returns_none():
+    with StubChatCompletions(latency=0, fail_every=1) as stub:
+        synthesis = stage(stub, timeout_seconds=5)
+        assert synthesis.synthesize(QUESTION, CONTEXT) is None
+        assert synthesis.stats()['errors'] == 1
+        synthesis.shutdown()
+
+
+def test_pipeline_keeps_extractive_answer_on_timeout(answer_generator):
+    extractive = AnswerPipeline(QuestionProcessor(), answer_generator,
+                                synthesis_stage=SynthesisStage(provider=None)).answer(QUESTION)
+    with StubChatCompletions(latency=0.15) as stub:
+        synthesis = stage(stub, timeout_seconds=0.1)
+        pipeline = AnswerPipeline(QuestionProcessor(), answer_generator, synthesis_stage=synthesis)
+        answer = pipeline.answer(QUESTION)
+        assert (answer['answer'], answer['links']) == (extractive['answer'], extractive['links'])
+        # The fallback is not cached, so the next request tries synthesis again
+        pipeline.answer(QUESTION)
+        assert synthesis.stats()['calls'] == 2
+        assert pipeline.stats()['answer_cache']['entries'] == 0
+        synthesis.shutdown()
+
+
+def test_pipeline_caches_synthesized_answer(answer_generator):
+    with StubChatCompletions(latency=0) as stub:
+        synthesis = stage(stub, timeout_seconds=5)
+        pipeline = AnswerPipeline(QuestionProcessor(), answer_generator, synthesis_stage=synthesis)
+        answer = pipeline.answer(QUESTION)
+        assert answer['answer'].startswith('From the course material')
+        assert pipeline.answer(QUESTION)['answer'] == answer['answer']
+        assert synthesis.stats()['calls'] == 1
+        synthesis.shutdown()
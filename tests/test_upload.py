@@ -0,0 +1,68 @@
+"""Error codes of POST /api/upload (multipart and octet-stream)"""
+import struct
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00\x00\x00\rIHDR' + struct.pack('>II', 10, 10) + b'\x00' * 32
+
+
+@pytest.fixture(scope='module')
+def client():
+    with TestClient(app.app) as test_client:
+        yield test_client
+
+
+def test_multipart_upload_answers(client):
+    response = client.post('/api/upload', data={'question': 'How do I submit GA1?'},
+                           files={'image': ('screenshot.png', PNG, 'image/png')})
+    assert response.status_code == 200
+    assert response.json()['answer']
+
+
+def test_octet_stream_upload_answers(client):
+    response = client.post('/api/upload', params={'question': 'How do I submit GA1?'}, content=PNG,
+                           headers={'Content-Type': 'application/octet-stream'})
+    assert response.status_code == 200
+
+
+def test_multipart_without_boundary_is_400(client):
+    response = client.post('/api/upload', content=b'question=hi',
+                           headers={'Content-Type': 'multipart/form-data'})
+    assert response.status_code == 400
+
+
+def test_garbage_multipart_body_is_400(client):
+    response = client.post('/api/upload', content=b'\x00\x01 not multipart at all \r\n--',
+                           headers={'Content-Type': 'multipart/form-data; boundary=xyz'})
+    assert response.status_code == 400
+
+
+def test_extra_file_part_is_400(client):
+    response = client.post('/api/upload', files={
+        'question': ('question.txt', b'How do I submit GA1?', 'text/plain'),
+        'image': ('screenshot.png', PNG, 'image/png'),
+    })
+    assert response.status_code == 400
+
+
+def test_missing_question_is_400(client):
+    response = client.post('/api/upload', files={'image': ('screenshot.png', PNG, 'image/png')})
+    assert response.status_code == 400
+
+
+def test_oversized_upload_is_413(client, monkeypatch):
+    monkeypatch.setenv('MAX_IMAGE_BYTES', '1000')
+    response = client.post('/api/upload', data={'question': 'hi'},
+                           files={'image': ('big.png', PNG + b'\x00' * 100_000, 'image/png')})
+    assert response.status_code == 413
+
+    def chunks():
+        for _ in range(20):
+            yield PNG + b'\x00' * 8192
+
+    response = client.post('/api/upload', params={'question': 'hi'}, content=chunks(),
+                           headers={'Content-Type': 'application/octet-stream'})
+    assert response.status_code == 413